@@ -1,5 +1,4 @@
 import asyncio
-from collections import deque
 import datetime
 import hashlib
 import json
@@ -13,15 +12,33 @@ from typing import Any
 
 from dotenv import load_dotenv
 import tornado.ioloop
+import tornado.iostream
 import tornado.web
 
-from .storage import Storage, safe_env
+from .sqlite_storage import SqliteStorage, is_sqlite_url
+from .storage import MESSAGES_CHANNEL, PIPELINE_RUNS_CHANNEL, PIPELINE_STATE_CHANNEL, Storage, safe_env
 from .pipeline_parser import ParseError, parse_aaps_v1
 from .pipeline_shell_import import ShellImportError, import_shell_annotated_to_ir
-from .llm_assisted_parse import LlmParseError, build_prompt, extract_aaps, make_request_id, run_codex_to_jsonl, write_artifacts
+from .llm_assisted_parse import (
+    PARSE_PROMPT,
+    LlmParseError,
+    build_prompt,
+    extract_aaps,
+    make_request_id,
+    run_codex_to_jsonl,
+    write_artifacts,
+)
 from .autopilot_store import AutopilotStore, extract_aaps_artifacts
-from .codex_api import CodexJobError, CodexJobManager
+from .codex_api import FINAL_STATUSES, CodexJobError, CodexJobManager
+from .codex_cache import CodexResultCache, SingleFlight, cache_enabled, cache_key
+from .codex_retention import CodexRetention, codex_retention_from_env
+from .event_hub import EventHub
+from .log_buffer import LogBuffer
+from .log_search import LogSearchError, LogSearchIndex
+from .log_store import RunLogStore, run_log_store_from_env
+from .log_tail import FileLogTailer, LogWatcher, read_tail_lines
 from .studio_chat import StudioChatStore, normalize_mode
+from .studio_chat_index import ChatIndexError, StudioChatIndex
 from .action_registry import ActionRegistryError, validate_action_create, validate_action_update
 from .builtin_actions import get_builtin_action, is_builtin_action_id, list_builtin_action_summaries
 from .update_readme_action import (
@@ -67,37 +84,40 @@ def _infer_outbox_role_from_name(name: str) -> str:
     return _parse_outbox_role(m.group(1))
 
 
-async def _ingest_outbox_files(*, storage: Storage, runtime_dir: Path, max_files: int = 50) -> None:
-    outbox = runtime_dir / "outbox"
-    outbox.mkdir(parents=True, exist_ok=True)
-    processed = outbox / "processed"
-    processed.mkdir(parents=True, exist_ok=True)
-
+def _collect_outbox_batch(outbox: Path, max_files: int) -> list[tuple[Path, str, str, str]]:
+    """Up to `max_files` outbox notes as (path, role, content, ingest_key); runs off the IOLoop."""
     try:
         items = sorted([p for p in outbox.iterdir() if p.is_file()])
     except Exception:
-        return
-
-    n = 0
+        return []
+    batch: list[tuple[Path, str, str, str]] = []
     for p in items:
-        if n >= max_files:
+        if len(batch) >= max_files:
             break
         if p.name.startswith("."):
             continue
         if p.suffix.lower() not in (".md", ".txt"):
             continue
-        role = _infer_outbox_role_from_name(p.name)
         try:
+            st = p.stat()
             txt = p.read_text("utf-8", errors="replace")
         except Exception:
             continue
-        content = txt.strip()
-        if content:
-            await storage.add_outbox_message(role, content[:10_000])
+        content = txt.strip()[:10_000]
+        # The same file re-read after a crash keeps its inode and mtime, so it gets the same key and
+        # is not stored twice; a later file that reuses the name (and text) is a new message.
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+        key = f"{p.name}:{st.st_ino}:{st.st_mtime_ns}:{digest}"
+        batch.append((p, _infer_outbox_role_from_name(p.name), content, key))
+    return batch
+
+
+def _move_outbox_files(paths: list[Path], processed: Path) -> None:
+    for p in paths:
         # Move to processed to prevent re-ingest.
         dest = processed / p.name
         if dest.exists():
-            ts = int(asyncio.get_event_loop().time() * 1000)
+            ts = int(datetime.datetime.now().timestamp() * 1000)
             dest = processed / f"{p.stem}_{ts}{p.suffix}"
         try:
             p.replace(dest)
@@ -107,7 +127,29 @@ async def _ingest_outbox_files(*, storage: Storage, runtime_dir: Path, max_files
                 p.unlink()
             except Exception:
                 pass
-        n += 1
+
+
+async def _ingest_outbox_files(
+    *, storage: Storage, runtime_dir: Path, max_files: int = 50, events: EventHub | None = None
+) -> None:
+    outbox = runtime_dir / "outbox"
+    outbox.mkdir(parents=True, exist_ok=True)
+    processed = outbox / "processed"
+    processed.mkdir(parents=True, exist_ok=True)
+
+    loop = asyncio.get_running_loop()
+    batch = await loop.run_in_executor(None, _collect_outbox_batch, outbox, max_files)
+    if not batch:
+        return
+    rows = [(role, content, key) for _p, role, content, key in batch if content]
+    # One write for the whole batch; if it fails the files stay put and are retried next tick.
+    inserted = await storage.add_outbox_messages(rows)
+    if events is not None:
+        for role, content, key in rows:
+            if key in inserted:
+                events.publish("outbox", {"role": role, "content": content})
+    # Only after the rows are committed; keys make a crash before this point harmless.
+    await loop.run_in_executor(None, _move_outbox_files, [p for p, *_ in batch], processed)
 
 
 class BaseHandler(tornado.web.RequestHandler):
@@ -135,91 +177,6 @@ def _read_json_body(handler: tornado.web.RequestHandler) -> dict[str, Any] | Non
     return body if isinstance(body, dict) else None
 
 
-class LogBuffer:
-    def __init__(self, max_entries: int = 2000):
-        self._max_entries = max(100, int(max_entries))
-        self._items: deque[dict[str, Any]] = deque(maxlen=self._max_entries)
-        self._next_id = 1
-
-    def append(self, *, source: str, line: str) -> int:
-        lid = self._next_id
-        self._next_id += 1
-        self._items.append(
-            {
-                "id": lid,
-                "ts": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-                "source": source,
-                "line": line,
-            }
-        )
-        return lid
-
-    def since(self, *, since_id: int, limit: int, source: str | None = None) -> list[dict[str, Any]]:
-        lim = max(1, min(2000, int(limit)))
-        out: list[dict[str, Any]] = []
-        for it in self._items:
-            if int(it.get("id", 0)) <= since_id:
-                continue
-            if source and it.get("source") != source:
-                continue
-            out.append(it)
-            if len(out) >= lim:
-                break
-        return out
-
-    def latest_id(self, *, source: str | None = None) -> int:
-        last = 0
-        for it in self._items:
-            if source and it.get("source") != source:
-                continue
-            try:
-                last = max(last, int(it.get("id", 0)))
-            except Exception:
-                pass
-        return last
-
-
-class FileLogTailer:
-    def __init__(self, *, source: str, path: Path, buf: LogBuffer):
-        self.source = source
-        self.path = path
-        self.buf = buf
-        self._offset = 0
-        self._partial = ""
-
-    def poll(self) -> None:
-        if not self.path.exists():
-            return
-        try:
-            size = self.path.stat().st_size
-        except Exception:
-            return
-        if size < self._offset:
-            # Log rotated/truncated.
-            self._offset = 0
-            self._partial = ""
-        try:
-            with self.path.open("rb") as f:
-                f.seek(self._offset)
-                data = f.read()
-                self._offset = f.tell()
-        except Exception:
-            return
-        if not data:
-            return
-        text = data.decode("utf-8", errors="replace")
-        if self._partial:
-            text = self._partial + text
-            self._partial = ""
-        lines = text.splitlines(keepends=True)
-        for ln in lines:
-            if ln.endswith("\n") or ln.endswith("\r\n"):
-                self.buf.append(source=self.source, line=ln.rstrip("\r\n"))
-            else:
-                # Partial final line; keep for next poll.
-                self._partial = ln
-
-
 class HealthHandler(BaseHandler):
     def initialize(self, storage: Storage) -> None:
         self.storage = storage
@@ -559,9 +516,11 @@ class ScriptsImportShellHandler(BaseHandler):
 
 
 class ScriptsParseLlmHandler(BaseHandler):
-    def initialize(self, storage: Storage, runtime_dir: Path) -> None:
+    def initialize(self, storage: Storage, runtime_dir: Path, cache: CodexResultCache, flights: SingleFlight) -> None:
         self.storage = storage
         self.runtime_dir = runtime_dir
+        self.cache = cache
+        self.flights = flights
 
     async def post(self) -> None:
         if safe_env("AUTOAPPDEV_ENABLE_LLM_PARSE", "0").strip() != "1":
@@ -595,6 +554,11 @@ class ScriptsParseLlmHandler(BaseHandler):
             self.write_json({"ok": False, "error": "invalid_save"}, status=400)
             return
 
+        req_cache = body.get("cache")
+        if req_cache is not None and not isinstance(req_cache, bool):
+            self.write_json({"ok": False, "error": "invalid_cache"}, status=400)
+            return
+
         title = str(body.get("title") or "").strip()
 
         req_model = body.get("model")
@@ -633,6 +597,7 @@ class ScriptsParseLlmHandler(BaseHandler):
             "reasoning": reasoning,
             "timeout_s": timeout_s,
             "source_format": source_format,
+            "prompt_template": PARSE_PROMPT.describe(),
             "source_sha256": hashlib.sha256(source_text.encode("utf-8", errors="replace")).hexdigest(),
         }
 
@@ -649,23 +614,46 @@ class ScriptsParseLlmHandler(BaseHandler):
         }
 
         assistant_text = ""
-        codex_jsonl = ""
         codex_stderr = ""
         rc = 0
         script_text: str | None = None
+        # Same prompt/model/reasoning -> same AAPS; the key covers everything Codex sees.
+        flight_key = cache_key("parse_llm", prompt, model, reasoning, "aaps_v1")
+        ckey = flight_key if cache_enabled(req_cache) else ""
+        cached = self.cache.get(ckey) if ckey else None
 
         try:
-            assistant_text, codex_jsonl, codex_stderr, rc = await run_codex_to_jsonl(
-                prompt=prompt,
-                model=model,
-                reasoning=reasoning,
-                timeout_s=timeout_s,
-                cwd=artifacts_dir,
-                skip_git_check=skip_git_check,
-            )
-            provenance["codex_exit_code"] = rc
-            if rc != 0:
-                warnings.append("codex_nonzero_exit")
+            if cached is not None and isinstance(cached.get("value"), str):
+                assistant_text = cached["value"]
+                meta = cached.get("meta") if isinstance(cached.get("meta"), dict) else {}
+                provenance["cache"] = {"hit": True, "key": ckey, "source_request": meta.get("request_id")}
+            else:
+
+                async def _run() -> tuple[str, str, int, str]:
+                    text, err, code = await run_codex_to_jsonl(
+                        prompt=prompt,
+                        model=model,
+                        reasoning=reasoning,
+                        timeout_s=timeout_s,
+                        cwd=artifacts_dir,
+                        jsonl_path=artifacts_dir / "codex.jsonl",
+                        stderr_path=artifacts_dir / "codex.stderr.log",
+                        skip_git_check=skip_git_check,
+                    )
+                    return text, err, code, req_id
+
+                # Concurrent identical requests share one codex exec (and its JSONL artifact).
+                (assistant_text, codex_stderr, rc, leader_id), shared = await self.flights.run(flight_key, _run)
+                if shared:
+                    provenance["coalesced"] = {
+                        "request_id": leader_id,
+                        "codex_jsonl": str(artifacts_dir.parent / leader_id / "codex.jsonl"),
+                    }
+                provenance["codex_exit_code"] = rc
+                if rc != 0:
+                    warnings.append("codex_nonzero_exit")
+                if ckey:
+                    provenance["cache"] = {"hit": False, "key": ckey}
             if not assistant_text.strip():
                 tail = (codex_stderr or "").strip().splitlines()[-5:]
                 hint = "\n".join(tail).strip()
@@ -677,6 +665,8 @@ class ScriptsParseLlmHandler(BaseHandler):
 
             ir = parse_aaps_v1(script_text)
             provenance["ok"] = True
+            if ckey and cached is None and rc == 0 and "coalesced" not in provenance:
+                self.cache.put(ckey, assistant_text, meta={"request_id": req_id})
             provenance["warnings"] = warnings
         except ParseError as e:
             provenance["ok"] = False
@@ -686,8 +676,8 @@ class ScriptsParseLlmHandler(BaseHandler):
                 artifacts_dir=artifacts_dir,
                 source_text=source_text,
                 prompt=prompt,
-                codex_jsonl=codex_jsonl,
-                codex_stderr=codex_stderr,
+                codex_jsonl=None,
+                codex_stderr=None,
                 assistant_text=assistant_text,
                 script_text=script_text,
                 provenance=provenance,
@@ -702,8 +692,8 @@ class ScriptsParseLlmHandler(BaseHandler):
                 artifacts_dir=artifacts_dir,
                 source_text=source_text,
                 prompt=prompt,
-                codex_jsonl=codex_jsonl,
-                codex_stderr=codex_stderr,
+                codex_jsonl=None,
+                codex_stderr=None,
                 assistant_text=assistant_text,
                 script_text=script_text,
                 provenance=provenance,
@@ -717,8 +707,8 @@ class ScriptsParseLlmHandler(BaseHandler):
             artifacts_dir=artifacts_dir,
             source_text=source_text,
             prompt=prompt,
-            codex_jsonl=codex_jsonl,
-            codex_stderr=codex_stderr,
+            codex_jsonl=None,
+            codex_stderr=None,
             assistant_text=assistant_text,
             script_text=script_text,
             provenance=provenance,
@@ -1019,9 +1009,10 @@ class ActionCloneHandler(BaseHandler):
 
 
 class ChatHandler(BaseHandler):
-    def initialize(self, storage: Storage, runtime_dir: Path) -> None:
+    def initialize(self, storage: Storage, runtime_dir: Path, events: EventHub) -> None:
         self.storage = storage
         self.runtime_dir = runtime_dir
+        self.events = events
 
     async def get(self) -> None:
         limit = int(self.get_query_argument("limit", "50"))
@@ -1036,13 +1027,15 @@ class ChatHandler(BaseHandler):
             return
         await self.storage.add_chat_message("user", content)
         _write_inbox_message(self.runtime_dir, content)
+        self.events.publish("chat", {"role": "user", "content": content})
         self.write_json({"ok": True})
 
 
 class InboxHandler(BaseHandler):
-    def initialize(self, storage: Storage, runtime_dir: Path) -> None:
+    def initialize(self, storage: Storage, runtime_dir: Path, events: EventHub) -> None:
         self.storage = storage
         self.runtime_dir = runtime_dir
+        self.events = events
 
     async def get(self) -> None:
         limit = int(self.get_query_argument("limit", "50"))
@@ -1063,12 +1056,14 @@ class InboxHandler(BaseHandler):
             return
         await self.storage.add_inbox_message("user", content)
         _write_inbox_message(self.runtime_dir, content)
+        self.events.publish("inbox", {"role": "user", "content": content})
         self.write_json({"ok": True})
 
 
 class OutboxHandler(BaseHandler):
-    def initialize(self, storage: Storage) -> None:
+    def initialize(self, storage: Storage, events: EventHub) -> None:
         self.storage = storage
+        self.events = events
 
     async def get(self) -> None:
         limit = int(self.get_query_argument("limit", "50"))
@@ -1089,6 +1084,7 @@ class OutboxHandler(BaseHandler):
             return
         role = _parse_outbox_role(body.get("role"))
         await self.storage.add_outbox_message(role, content)
+        self.events.publish("outbox", {"role": role, "content": content})
         self.write_json({"ok": True})
 
 
@@ -1118,6 +1114,39 @@ class CodexJobsHandler(BaseHandler):
             self.write_json(e.to_dict(), status=400)
 
 
+class CodexQueueHandler(BaseHandler):
+    def initialize(self, codex: CodexJobManager) -> None:
+        self.codex = codex
+
+    async def get(self) -> None:
+        limit = max(0, min(200, int(self.get_query_argument("limit", "50"))))
+        self.write_json({"ok": True, **self.codex.scheduler.stats(include_jobs=limit)})
+
+
+class CodexCacheHandler(BaseHandler):
+    def initialize(self, codex: CodexJobManager) -> None:
+        self.codex = codex
+
+    async def get(self) -> None:
+        self.write_json({"ok": True, "cache": self.codex.cache.stats()})
+
+    async def delete(self) -> None:
+        removed = self.codex.cache.clear()
+        self.write_json({"ok": True, "removed": removed, "cache": self.codex.cache.stats()})
+
+
+class CodexRetentionHandler(BaseHandler):
+    def initialize(self, retention: CodexRetention) -> None:
+        self.retention = retention
+
+    async def get(self) -> None:
+        self.write_json({"ok": True, "retention": self.retention.stats()})
+
+    async def post(self) -> None:
+        sweep = await self.retention.sweep()
+        self.write_json({"ok": True, "sweep": sweep, "retention": self.retention.stats()})
+
+
 class CodexJobHandler(BaseHandler):
     def initialize(self, codex: CodexJobManager) -> None:
         self.codex = codex
@@ -1125,7 +1154,7 @@ class CodexJobHandler(BaseHandler):
     async def get(self) -> None:
         job_id = self.get_query_argument("id", "")
         try:
-            self.write_json({"ok": True, **self.codex.job_status(job_id, include_logs=True, include_output=True)})
+            self.write_json({"ok": True, **(await self.codex.load_job_status(job_id, include_logs=True, include_output=True))})
         except CodexJobError as e:
             self.write_json(e.to_dict(), status=404 if e.code == "unknown_job" else 400)
 
@@ -1137,7 +1166,7 @@ class CodexResultHandler(BaseHandler):
     async def get(self) -> None:
         job_id = self.get_query_argument("id", "")
         try:
-            payload = self.codex.job_status(job_id, include_logs=False, include_output=True)
+            payload = await self.codex.load_job_status(job_id, include_logs=False, include_output=True)
         except CodexJobError as e:
             self.write_json(e.to_dict(), status=404 if e.code == "unknown_job" else 400)
             return
@@ -1206,7 +1235,7 @@ async def _complete_assistant_chat_job(
     mode: str,
     job_id: str,
 ) -> None:
-    await codex.run_job(job_id)
+    await codex.start_job(job_id)
     payload = codex.job_status(job_id, include_logs=True, include_output=True)
     job = payload.get("job") if isinstance(payload.get("job"), dict) else {}
     output = payload.get("output") if isinstance(payload.get("output"), dict) else {}
@@ -1233,6 +1262,31 @@ async def _complete_assistant_chat_job(
         chat_store.append_message(session_id, role="system", content=detail, meta={"job_id": job_id, "mode": mode})
 
 
+class StudioChatsHandler(BaseHandler):
+    def initialize(self, chat_index: StudioChatIndex) -> None:
+        self.chat_index = chat_index
+
+    async def get(self) -> None:
+        mode_raw = self.get_query_argument("mode", "").strip()
+        try:
+            limit = int(self.get_query_argument("limit", "50"))
+        except ValueError:
+            self.write_json({"ok": False, "error": "invalid_limit"}, status=400)
+            return
+        try:
+            page = await self.chat_index.list_sessions(
+                mode=normalize_mode(mode_raw) if mode_raw else "",
+                q=self.get_query_argument("q", ""),
+                cursor=self.get_query_argument("cursor", ""),
+                limit=limit,
+            )
+        except ChatIndexError as e:
+            status = 503 if e.code in {"index_unavailable", "search_unavailable"} else 400
+            self.write_json(e.to_dict(), status=status)
+            return
+        self.write_json({"ok": True, **page})
+
+
 class StudioChatNewHandler(BaseHandler):
     def initialize(self, chat_store: StudioChatStore) -> None:
         self.chat_store = chat_store
@@ -1253,8 +1307,16 @@ class StudioChatHandler(BaseHandler):
         session_id = self.get_query_argument("session_id", "")
         mode = normalize_mode(self.get_query_argument("mode", "notes"))
         session = self.chat_store.get_or_create_session(session_id=session_id, mode=mode)
-        messages = self.chat_store.list_messages(str(session["id"]), limit=120)
-        self.write_json({"ok": True, "session": session, "messages": messages})
+        try:
+            limit = max(1, min(200, int(self.get_query_argument("limit", "120"))))
+        except ValueError:
+            self.write_json({"ok": False, "error": "invalid_limit"}, status=400)
+            return
+        before = self.get_query_argument("before", "")
+        # One extra message tells the client whether there is an older page.
+        messages = self.chat_store.list_messages(str(session["id"]), limit=limit + 1, before=before)
+        has_more = len(messages) > limit
+        self.write_json({"ok": True, "session": session, "messages": messages[-limit:], "has_more": has_more})
 
     async def post(self) -> None:
         body = _read_json_body(self)
@@ -1330,7 +1392,14 @@ class StudioChatHandler(BaseHandler):
             )
             assistant_job = assistant_payload.get("job") if isinstance(assistant_payload.get("job"), dict) else {}
             job_id = str(assistant_job.get("id") or "")
-            if job_id:
+            if job_id and assistant_payload.get("coalesced"):
+                # A retry of the same request: the running job will post its own result to this session.
+                notice = {
+                    "kind": "assistant_coalesced",
+                    "text": f"Identical assistant job already in progress: {job_id}",
+                    "job_id": job_id,
+                }
+            elif job_id:
                 notice = {
                     "kind": "assistant_queued",
                     "text": f"Delegated assistant job queued: {job_id}",
@@ -1430,7 +1499,7 @@ class StudioAgentStatusHandler(BaseHandler):
         for job in jobs:
             st = str(job.get("status") or "unknown")
             counts[st] = counts.get(st, 0) + 1
-        self.write_json({"ok": True, "jobs": jobs, "counts": counts})
+        self.write_json({"ok": True, "jobs": jobs, "counts": counts, "totals": self.codex.job_counts()})
 
 
 class AutopilotLoopHandler(BaseHandler):
@@ -1497,12 +1566,16 @@ class PipelineStateHandler(BaseHandler):
 
 
 class PipelineControl:
-    def __init__(self, storage: Storage, runtime_dir: Path, log_dir: Path):
+    def __init__(self, storage: Storage, runtime_dir: Path, log_dir: Path, events: EventHub, run_logs: RunLogStore):
         self.storage = storage
+        self.events = events
+        self.run_logs = run_logs
         self.proc: subprocess.Popen | None = None
         self.run_id: int | None = None
         self.log_path = log_dir / "pipeline.log"
         self.pause_flag = runtime_dir / "PAUSE"
+        self._last_published: dict[str, Any] | None = None
+        self._publish_pending = False
 
     async def refresh_from_storage(self) -> None:
         st = await self.storage.get_latest_status()
@@ -1510,6 +1583,31 @@ class PipelineControl:
             # Server restarted while pipeline is running. We do not reattach to process.
             pass
 
+    async def publish_state(self) -> None:
+        st = await self.storage.get_latest_status()
+        ps = await self.storage.get_pipeline_state()
+        data = {
+            "status": {"running": st.running, "pid": st.pid, "run_id": st.run_id, "state": st.status},
+            "pipeline": ps,
+        }
+        # Our own writes also come back through the change feed; publish each state once.
+        if data == self._last_published:
+            return
+        self._last_published = data
+        self.events.publish("pipeline", data)
+
+    def on_storage_change(self, _payload: Any = None, _local: bool = False) -> None:
+        """Change-feed callback for pipeline_state/pipeline_runs (any process); coalesced per IOLoop turn."""
+        if self._publish_pending:
+            return
+        self._publish_pending = True
+
+        async def _publish() -> None:
+            self._publish_pending = False
+            await self.publish_state()
+
+        asyncio.ensure_future(_publish())
+
     def _spawn(self, script: str, cwd: str, args: list[str]) -> subprocess.Popen:
         out = self.log_path.open("ab", buffering=0)
         try:
@@ -1535,8 +1633,12 @@ class PipelineControl:
             return {"ok": False, "error": "already_running"}
         self.log_path.parent.mkdir(parents=True, exist_ok=True)
         self.log_path.write_text("", "utf-8")
+        # pipeline.log only holds the current run; history lives in the run log store.
+        # Lines tailed before the run id is known are held and attributed once it is.
+        self.run_logs.end_run()
         self.proc = self._spawn(script=script, cwd=cwd, args=args)
         self.run_id = await self.storage.create_run(script=script, cwd=cwd, args=args, pid=self.proc.pid)
+        self.run_logs.begin_run(self.run_id)
         return {"ok": True, "pid": self.proc.pid, "run_id": self.run_id}
 
     async def stop(self) -> dict[str, Any]:
@@ -1592,6 +1694,7 @@ class PipelineControl:
         status = "completed" if rc == 0 else "failed"
         await self.storage.set_run_status(run_id, status, pid=pid)
         await self.storage.set_pipeline_state(state="stopped", pid=None, run_id=run_id, ts_kind="stop")
+        await self.publish_state()
 
 
 class PipelineStartHandler(BaseHandler):
@@ -1634,6 +1737,7 @@ class PipelineStartHandler(BaseHandler):
             await self.storage.set_pipeline_state(
                 state="running", pid=res.get("pid"), run_id=res.get("run_id"), ts_kind="start"
             )
+            await self.controller.publish_state()
         self.write_json(res, status=200 if res.get("ok") else 409)
 
 
@@ -1661,6 +1765,7 @@ class PipelineStopHandler(BaseHandler):
         if res.get("ok"):
             pid = self.controller.proc.pid if self.controller.proc else None
             await self.storage.set_pipeline_state(state="stopped", pid=None, run_id=self.controller.run_id, ts_kind="stop")
+            await self.controller.publish_state()
         self.write_json(res, status=200 if res.get("ok") else 500)
 
 
@@ -1688,6 +1793,7 @@ class PipelinePauseHandler(BaseHandler):
         if res.get("ok"):
             pid = self.controller.proc.pid if self.controller.proc else None
             await self.storage.set_pipeline_state(state="paused", pid=pid, run_id=self.controller.run_id, ts_kind="pause")
+            await self.controller.publish_state()
         self.write_json(res)
 
 
@@ -1715,6 +1821,7 @@ class PipelineResumeHandler(BaseHandler):
         if res.get("ok"):
             pid = self.controller.proc.pid if self.controller.proc else None
             await self.storage.set_pipeline_state(state="running", pid=pid, run_id=self.controller.run_id, ts_kind="resume")
+            await self.controller.publish_state()
         self.write_json(res)
 
 
@@ -1734,14 +1841,85 @@ class LogsTailHandler(BaseHandler):
         if not p:
             self.write_json({"error": "unknown_log"}, status=400)
             return
+        before_raw = self.get_query_argument("before", "")
+        try:
+            before = int(before_raw) if before_raw.strip() else None
+        except Exception:
+            self.write_json({"error": "invalid_before"}, status=400)
+            return
         if not p.exists():
             self.write_json({"lines": []})
             return
         try:
-            data = p.read_text("utf-8", errors="replace").splitlines()[-n:]
+            data, offset, size = read_tail_lines(p, n, before=before)
+        except Exception:
+            data, offset, size = [], 0, 0
+        self.write_json({"lines": data, "name": name, "offset": offset, "size": size, "has_more": offset > 0})
+
+
+class LogRunsHandler(BaseHandler):
+    def initialize(self, run_logs: RunLogStore) -> None:
+        self.run_logs = run_logs
+
+    async def get(self) -> None:
+        limit = max(1, min(200, int(self.get_query_argument("limit", "50"))))
+        self.write_json({"runs": self.run_logs.list_runs(limit=limit)})
+
+
+class LogRunHandler(BaseHandler):
+    def initialize(self, run_logs: RunLogStore) -> None:
+        self.run_logs = run_logs
+
+    async def get(self) -> None:
+        run_id = self.get_query_argument("run_id", "")
+        try:
+            since = int(self.get_query_argument("since", "0"))
+            until_raw = self.get_query_argument("until", "")
+            until = int(until_raw) if until_raw.strip() else None
+            limit = int(self.get_query_argument("limit", "500"))
         except Exception:
-            data = []
-        self.write_json({"lines": data, "name": name})
+            self.write_json({"error": "invalid_range"}, status=400)
+            return
+        from_ts = self.get_query_argument("from_ts", "") or None
+        to_ts = self.get_query_argument("to_ts", "") or None
+        try:
+            rdir = self.run_logs.run_dir(run_id)
+        except ValueError:
+            self.write_json({"error": "invalid_run_id"}, status=400)
+            return
+        if not rdir.exists():
+            self.write_json({"error": "unknown_run"}, status=404)
+            return
+        lines = self.run_logs.query(run_id, since_id=since, until_id=until, from_ts=from_ts, to_ts=to_ts, limit=limit)
+        nxt = int(lines[-1]["id"]) if lines else since
+        self.write_json({"run_id": run_id, "since": since, "next": nxt, "lines": lines})
+
+
+class LogSearchHandler(BaseHandler):
+    def initialize(self, search: LogSearchIndex) -> None:
+        self.search = search
+
+    async def get(self) -> None:
+        try:
+            limit = int(self.get_query_argument("limit", "50"))
+            context = int(self.get_query_argument("context", "0"))
+        except Exception:
+            self.write_json({"error": "invalid_limit"}, status=400)
+            return
+        try:
+            payload = await self.search.search(
+                self.get_query_argument("q", ""),
+                source=self.get_query_argument("source", ""),
+                run_id=self.get_query_argument("run_id", ""),
+                job_id=self.get_query_argument("job_id", ""),
+                limit=limit,
+                context=context,
+                raw=self.get_query_argument("syntax", "") == "fts",
+            )
+        except LogSearchError as e:
+            self.write_json(e.to_dict(), status=503 if e.code == "search_unavailable" else 400)
+            return
+        self.write_json(payload)
 
 
 class LogsSinceHandler(BaseHandler):
@@ -1752,6 +1930,9 @@ class LogsSinceHandler(BaseHandler):
         source = self.get_query_argument("source", "pipeline")
         since = int(self.get_query_argument("since", "0"))
         limit = int(self.get_query_argument("limit", "200"))
+        wait_ms = max(0, min(30_000, int(self.get_query_argument("wait_ms", "0"))))
+        if wait_ms:
+            await self.log_buffer.wait_for(since_id=since, timeout_s=wait_ms / 1000.0, source=source or None)
         items = self.log_buffer.since(since_id=since, limit=limit, source=source or None)
         nxt = since
         if items:
@@ -1762,6 +1943,54 @@ class LogsSinceHandler(BaseHandler):
         self.write_json({"source": source, "since": since, "next": nxt, "lines": items})
 
 
+class EventsHandler(BaseHandler):
+    """Server-Sent Events stream of backend changes (pipeline, logs, codex jobs, chats, outbox)."""
+
+    def initialize(self, events: EventHub) -> None:
+        self.events = events
+        self._closed = False
+
+    def on_connection_close(self) -> None:
+        self._closed = True
+
+    async def get(self) -> None:
+        raw_cursor = self.request.headers.get("Last-Event-ID", "") or self.get_query_argument("since", "")
+        try:
+            cursor = int(raw_cursor) if raw_cursor.strip() else self.events.latest_id()
+        except Exception:
+            cursor = self.events.latest_id()
+        kinds = {k.strip() for k in self.get_query_argument("types", "").split(",") if k.strip()}
+
+        self.set_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.set_header("Cache-Control", "no-cache")
+        self.set_header("X-Accel-Buffering", "no")
+        try:
+            self.write("retry: 3000\n\n")
+            await self.flush()
+            while not self._closed:
+                if self.events.missed(cursor):
+                    # Cursor fell out of the ring, or is ahead of it after a backend restart
+                    # reset the ids; the client must reload its views.
+                    cursor = self.events.latest_id()
+                    self.write(f"id: {cursor}\nevent: resync\ndata: {{}}\n\n")
+                    await self.flush()
+                items = self.events.since(since_id=cursor, limit=500)
+                if not items:
+                    if not await self.events.wait(since_id=cursor, timeout_s=15.0):
+                        self.write(": keepalive\n\n")
+                        await self.flush()
+                    continue
+                for it in items:
+                    cursor = int(it["id"])
+                    if kinds and it["type"] not in kinds:
+                        continue
+                    data = json.dumps(it["data"], ensure_ascii=False)
+                    self.write(f"id: {cursor}\nevent: {it['type']}\ndata: {data}\n\n")
+                await self.flush()
+        except tornado.iostream.StreamClosedError:
+            return
+
+
 def _load_env() -> None:
     load_dotenv(dotenv_path=REPO_ROOT / ".env", override=False)
 
@@ -1783,6 +2012,13 @@ def _require_env() -> None:
         raise SystemExit(2)
 
 
+def _env_int(key: str, default: int) -> int:
+    try:
+        return int(safe_env(key, str(default)).strip())
+    except Exception:
+        return default
+
+
 def _listen_port() -> int:
     # Prefer AUTOAPPDEV_PORT (current convention), but allow PORT as an alias.
     raw = safe_env("AUTOAPPDEV_PORT", "").strip() or safe_env("PORT", "8788").strip()
@@ -1797,7 +2033,10 @@ async def make_app(runtime_dir: Path, log_dir: Path) -> tornado.web.Application:
     port = _listen_port()
     db_url = safe_env("DATABASE_URL", "")
 
-    storage = Storage(database_url=db_url, runtime_dir=runtime_dir)
+    if is_sqlite_url(db_url):
+        storage: Storage = SqliteStorage(database_url=db_url, runtime_dir=runtime_dir)
+    else:
+        storage = Storage(database_url=db_url, runtime_dir=runtime_dir)
     await storage.start()
     schema_path = Path(__file__).with_name("schema.sql")
     await storage.ensure_schema(schema_path.read_text("utf-8"))
@@ -1808,34 +2047,112 @@ async def make_app(runtime_dir: Path, log_dir: Path) -> tornado.web.Application:
         db_time = await storage.get_server_time_iso()
         print(f"DB time: {db_time}")
 
-    controller = PipelineControl(storage=storage, runtime_dir=runtime_dir, log_dir=log_dir)
+    events = EventHub(max_events=10_000)
+    run_logs = run_log_store_from_env(log_dir / "runs")
+    controller = PipelineControl(
+        storage=storage, runtime_dir=runtime_dir, log_dir=log_dir, events=events, run_logs=run_logs
+    )
     tornado.ioloop.PeriodicCallback(lambda: asyncio.create_task(controller.maybe_collect_exit()), 500).start()
+    # Postgres change feed: pipeline changes from any process become "pipeline" events; message
+    # inserts by other processes become chat/inbox/outbox events (ours are published by the handlers).
+    storage.subscribe(PIPELINE_STATE_CHANNEL, controller.on_storage_change)
+    storage.subscribe(PIPELINE_RUNS_CHANNEL, controller.on_storage_change)
+    storage.subscribe(
+        MESSAGES_CHANNEL,
+        lambda msg, local: None
+        if local
+        else events.publish(
+            str(msg.get("table") or "").replace("_messages", ""),
+            {"id": msg.get("id"), "role": msg.get("role"), "content": msg.get("content")},
+        ),
+    )
     codex = CodexJobManager(
         repo_root=REPO_ROOT,
         runtime_dir=runtime_dir,
         prompt_path=REPO_ROOT / "prompts" / "autoappdev-codex-response.md",
         schema_path=REPO_ROOT / "schemas" / "autoappdev_codex_response.schema.json",
     )
+    parse_flights = SingleFlight()
     autopilot = AutopilotStore(repo_root=REPO_ROOT, base_dir=REPO_ROOT / "references" / "autopilot" / "loop")
-    chat_store = StudioChatStore(root=runtime_dir / "studio-chats")
-
-    log_buffer = LogBuffer(max_entries=2000)
-    tailers = [
-        FileLogTailer(source="pipeline", path=log_dir / "pipeline.log", buf=log_buffer),
-        FileLogTailer(source="backend", path=log_dir / "backend.log", buf=log_buffer),
-    ]
+    chat_store = StudioChatStore(
+        root=runtime_dir / "studio-chats",
+        max_sessions=_env_int("AUTOAPPDEV_STUDIO_CACHE_SESSIONS", 64),
+        fsync=safe_env("AUTOAPPDEV_STUDIO_FSYNC", "0").strip() == "1",
+        transcript_chars=_env_int("AUTOAPPDEV_STUDIO_TRANSCRIPT_CHARS", 12_000),
+    )
+    # session.json is written behind; messages themselves are appended immediately.
+    tornado.ioloop.PeriodicCallback(chat_store.flush, 1000).start()
+    chat_index = StudioChatIndex(db_path=chat_store.root / "index.sqlite3", root=chat_store.root)
+    if chat_index.open():
+        chat_store.add_session_listener(lambda session: chat_index.touch(str(session["id"]), session))
+        chat_store.add_listener(lambda session_id, msg: chat_index.touch(session_id, chat_store.session_meta(session_id)))
+        tornado.ioloop.PeriodicCallback(lambda: asyncio.ensure_future(chat_index.flush()), 1000).start()
+        asyncio.ensure_future(chat_index.backfill())
+    codex.add_listener(
+        lambda job: events.publish(
+            "codex_job",
+            {k: job.get(k) for k in ("id", "tool", "status", "mode", "session_id", "updated_at", "error")},
+        )
+    )
+    chat_store.add_listener(lambda session_id, msg: events.publish("studio_chat", {"session_id": session_id, "message": msg}))
+
+    def _recover_codex_jobs() -> None:
+        for action in codex.recover_jobs():
+            print(f"Codex job {action['id']} ({action['tool']}): {action['action']} after restart")
+            if action["tool"] == "assistant" and action.get("session_id"):
+                # The chat task that would have posted the result died with the old process.
+                asyncio.ensure_future(
+                    _complete_assistant_chat_job(
+                        codex=codex,
+                        chat_store=chat_store,
+                        autopilot=autopilot,
+                        session_id=str(action["session_id"]),
+                        mode=str(action.get("mode") or ""),
+                        job_id=str(action["id"]),
+                    )
+                )
 
-    def _poll_logs() -> None:
-        for t in tailers:
-            t.poll()
+    _recover_codex_jobs()
+    tornado.ioloop.PeriodicCallback(_recover_codex_jobs, 30_000).start()
+    retention = codex_retention_from_env(codex, runtime_dir / "codex-archive")
+    # Opt-in: the first sweep would archive (and delete the directories of) existing jobs.
+    if safe_env("AUTOAPPDEV_CODEX_RETENTION", "0").strip() == "1":
+        asyncio.ensure_future(retention.sweep())
+        tornado.ioloop.PeriodicCallback(lambda: asyncio.ensure_future(retention.sweep()), 3600_000).start()
+
+    log_buffer = LogBuffer(max_entries=_env_int("AUTOAPPDEV_LOG_BUFFER_LINES", 20_000))
+    log_buffer.add_listener(lambda entry: events.publish("log", entry))
+    log_buffer.add_listener(lambda entry: run_logs.append(entry) if entry.get("source") == "pipeline" else None)
+    tornado.ioloop.PeriodicCallback(run_logs.flush, 2000).start()
+    log_watcher = LogWatcher(
+        [
+            FileLogTailer(source="pipeline", path=log_dir / "pipeline.log", buf=log_buffer),
+            FileLogTailer(source="backend", path=log_dir / "backend.log", buf=log_buffer),
+        ]
+    )
+    log_watcher.start()
+    print(f"Log tailing: {log_watcher.mode}")
+
+    log_search = LogSearchIndex(db_path=log_dir / "search.sqlite3", jobs_root=codex.jobs_root)
+    if log_search.open():
+        # Registered after the initial tail so restarts do not re-index old file contents.
+        def _index_log(entry: dict[str, Any]) -> None:
+            if entry.get("source") == "pipeline" and run_logs.active_run:
+                log_search.add_line(entry, run_id=run_logs.active_run, seq=run_logs.last_id)
+            else:
+                log_search.add_line(entry, seq=entry.get("id"))
 
-    tornado.ioloop.PeriodicCallback(_poll_logs, 500).start()
+        log_buffer.add_listener(_index_log)
+        codex.add_listener(lambda job: log_search.add_job(job) if job.get("status") in FINAL_STATUSES else None)
+        tornado.ioloop.PeriodicCallback(lambda: asyncio.ensure_future(log_search.flush()), 1000).start()
+        asyncio.ensure_future(log_search.backfill_jobs())
+    print(f"Log search: {'fts5' if log_search.available else 'disabled'}")
 
     outbox_state: dict[str, Any] = {"running": False}
 
     async def _run_outbox_ingest() -> None:
         try:
-            await _ingest_outbox_files(storage=storage, runtime_dir=runtime_dir, max_files=50)
+            await _ingest_outbox_files(storage=storage, runtime_dir=runtime_dir, max_files=50, events=events)
         except Exception:
             pass
         finally:
@@ -1860,15 +2177,23 @@ async def make_app(runtime_dir: Path, log_dir: Path) -> tornado.web.Application:
             (r"/api/scripts/([0-9]+)", ScriptHandler, {"storage": storage}),
             (r"/api/scripts/parse", ScriptsParseHandler),
             (r"/api/scripts/import-shell", ScriptsImportShellHandler),
-            (r"/api/scripts/parse-llm", ScriptsParseLlmHandler, {"storage": storage, "runtime_dir": runtime_dir}),
+            (
+                r"/api/scripts/parse-llm",
+                ScriptsParseLlmHandler,
+                {"storage": storage, "runtime_dir": runtime_dir, "cache": codex.cache, "flights": parse_flights},
+            ),
             (r"/api/actions", ActionsHandler, {"storage": storage}),
             (r"/api/actions/([0-9]+)/clone", ActionCloneHandler, {"storage": storage}),
             (r"/api/actions/([0-9]+)", ActionHandler, {"storage": storage}),
             (r"/api/actions/update-readme", UpdateReadmeHandler, {"runtime_dir": runtime_dir}),
             (r"/api/codex/jobs", CodexJobsHandler, {"codex": codex}),
             (r"/api/codex/job", CodexJobHandler, {"codex": codex}),
+            (r"/api/codex/queue", CodexQueueHandler, {"codex": codex}),
+            (r"/api/codex/cache", CodexCacheHandler, {"codex": codex}),
+            (r"/api/codex/retention", CodexRetentionHandler, {"retention": retention}),
             (r"/api/codex/result", CodexResultHandler, {"codex": codex}),
             (r"/api/codex/respond", CodexRespondHandler, {"codex": codex}),
+            (r"/api/studio/chats", StudioChatsHandler, {"chat_index": chat_index}),
             (r"/api/studio/chat/new", StudioChatNewHandler, {"chat_store": chat_store}),
             (r"/api/studio/chat", StudioChatHandler, {"chat_store": chat_store, "codex": codex, "autopilot": autopilot}),
             (r"/api/studio/preview", StudioPreviewHandler, {"autopilot": autopilot, "codex": codex}),
@@ -1877,9 +2202,9 @@ async def make_app(runtime_dir: Path, log_dir: Path) -> tornado.web.Application:
             (r"/api/autopilot/loop/propose", AutopilotLoopProposeHandler, {"autopilot": autopilot}),
             (r"/api/autopilot/loop/accept", AutopilotLoopAcceptHandler, {"autopilot": autopilot}),
             (r"/api/autopilot/loop/restore", AutopilotLoopRestoreHandler, {"autopilot": autopilot}),
-            (r"/api/chat", ChatHandler, {"storage": storage, "runtime_dir": runtime_dir}),
-            (r"/api/inbox", InboxHandler, {"storage": storage, "runtime_dir": runtime_dir}),
-            (r"/api/outbox", OutboxHandler, {"storage": storage}),
+            (r"/api/chat", ChatHandler, {"storage": storage, "runtime_dir": runtime_dir, "events": events}),
+            (r"/api/inbox", InboxHandler, {"storage": storage, "runtime_dir": runtime_dir, "events": events}),
+            (r"/api/outbox", OutboxHandler, {"storage": storage, "events": events}),
             (r"/api/pipeline", PipelineStateHandler, {"storage": storage}),
             (r"/api/pipeline/status", PipelineStatusHandler, {"storage": storage}),
             (r"/api/pipeline/start", PipelineStartHandler, {"controller": controller, "storage": storage}),
@@ -1888,6 +2213,10 @@ async def make_app(runtime_dir: Path, log_dir: Path) -> tornado.web.Application:
             (r"/api/pipeline/resume", PipelineResumeHandler, {"controller": controller, "storage": storage}),
             (r"/api/logs", LogsSinceHandler, {"log_buffer": log_buffer}),
             (r"/api/logs/tail", LogsTailHandler, {"log_dir": log_dir}),
+            (r"/api/logs/search", LogSearchHandler, {"search": log_search}),
+            (r"/api/logs/runs", LogRunsHandler, {"run_logs": run_logs}),
+            (r"/api/logs/run", LogRunHandler, {"run_logs": run_logs}),
+            (r"/api/events", EventsHandler, {"events": events}),
         ],
         debug=True,
     )
@@ -6,9 +6,23 @@ import os
 import re
 import shutil
 import time
+import uuid
 from pathlib import Path
-from typing import Any
-
+from typing import Any, Callable
+
+from .codex_archive import decode_tail, read_archive_members
+from .codex_cache import cache_enabled, cache_key, codex_cache_from_env
+from .codex_job_index import CodexJobIndex
+from .codex_scheduler import PRIORITIES, CodexScheduler
+from .codex_stream import (
+    CodexOutputFollower,
+    CodexProgress,
+    probe_process,
+    read_tail_text,
+    stream_codex_exec,
+    watch_codex_process,
+)
+from .prompt_templates import PromptTemplateRegistry
 
 FINAL_STATUSES = {"succeeded", "failed"}
 REASONING_LEVELS = {"low", "medium", "high", "xhigh"}
@@ -58,14 +72,31 @@ def read_json(path: Path, default: Any = None) -> Any:
         return default
 
 
+def append_text(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(text)
+
+
 def tail_text(path: Path, max_chars: int = 8000) -> str:
-    if not path.exists():
-        return ""
+    return read_tail_text(path, max_chars)
+
+
+def parse_iso(raw: Any) -> float | None:
     try:
-        data = path.read_text("utf-8", errors="replace")
+        return datetime.datetime.fromisoformat(str(raw)).timestamp()
     except Exception:
-        return ""
-    return data[-max_chars:]
+        return None
+
+
+def pid_alive(pid: Any) -> bool:
+    try:
+        os.kill(int(pid), 0)
+    except (ProcessLookupError, ValueError, TypeError):
+        return False
+    except PermissionError:
+        return True
+    return True
 
 
 def normalize_reasoning(raw: Any, default: str) -> str:
@@ -73,6 +104,13 @@ def normalize_reasoning(raw: Any, default: str) -> str:
     return r if r in REASONING_LEVELS else default
 
 
+def _env_workers(key: str, default: int, *, minimum: int = 1) -> int:
+    try:
+        return max(minimum, int(os.environ.get(key, str(default)).strip()))
+    except Exception:
+        return default
+
+
 class CodexJobManager:
     """File-backed Codex response/job API for AutoAppDev.
 
@@ -87,12 +125,44 @@ class CodexJobManager:
         self.prompt_path = prompt_path.resolve()
         self.schema_path = schema_path.resolve()
         self.jobs_root.mkdir(parents=True, exist_ok=True)
-        self._tasks: dict[str, asyncio.Task[Any]] = {}
+        self._listeners: list[Callable[[dict[str, Any]], None]] = []
+        # job id -> (event set when the job reaches a final status, number of waiters)
+        self._final_events: dict[str, tuple[asyncio.Event, int]] = {}
+        # coalesce key -> id of the unfinished job doing that work
+        self._inflight: dict[str, str] = {}
+        # Re-read job.json this often while waiting, for jobs finished by another process.
+        self.wait_fallback_s = 5.0
+        # Identifies this manager across an in-place autoreload exec, where the pid stays the same.
+        self.instance_id = uuid.uuid4().hex[:12]
+        # A running job whose owner has not written a heartbeat for this long is considered orphaned.
+        self.heartbeat_stale_s = 60.0
+        # A response job interrupted by a restart is re-run at most this many times in total.
+        self.max_attempts = 2
+        self.templates = PromptTemplateRegistry()
+        self.templates.register_file(
+            "codex_response",
+            self.prompt_path,
+            suffix="\n\nInput JSON follows. Return only JSON matching the selected schema.\n\n",
+        )
+        self.templates.register_file("codex_response_schema", self.schema_path)
+        self.index = CodexJobIndex(self.jobs_root)
+        self.index.load()
         self.default_model = os.environ.get("AUTOAPPDEV_CODEX_MODEL", "gpt-5.5")
         self.default_response_reasoning = os.environ.get("AUTOAPPDEV_RESPONSE_REASONING", "medium")
         self.default_assistant_reasoning = os.environ.get("AUTOAPPDEV_ASSISTANT_REASONING", "high")
         self.default_timeout_s = float(os.environ.get("AUTOAPPDEV_CODEX_TIMEOUT_S", "300"))
         self.mock = os.environ.get("AUTOAPPDEV_MOCK_CODEX", "0").strip() == "1"
+        self.cache = codex_cache_from_env(self.runtime_dir / "codex-cache")
+        workers = {
+            "response": _env_workers("AUTOAPPDEV_CODEX_RESPONSE_WORKERS", 2),
+            "assistant": _env_workers("AUTOAPPDEV_CODEX_ASSISTANT_WORKERS", 1),
+        }
+        self.scheduler = CodexScheduler(
+            run=lambda job_id, waited: self.run_job(job_id, queued_seconds=waited),
+            workers=workers,
+            max_workers=_env_workers("AUTOAPPDEV_CODEX_MAX_WORKERS", sum(workers.values()), minimum=0),
+            interactive_reserve=_env_workers("AUTOAPPDEV_CODEX_INTERACTIVE_RESERVE", 1, minimum=0),
+        )
 
     def new_job_id(self, tool: str) -> str:
         ts = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
@@ -108,17 +178,48 @@ class CodexJobManager:
     def read_job(self, job_id: str) -> dict[str, Any]:
         job = read_json(self.job_path(job_id))
         if not isinstance(job, dict):
+            # Archived jobs have no directory; their summary row lives in the index.
+            row = self.index.get(safe_job_id(job_id))
+            if row is not None and row.get("archive"):
+                return row
             raise CodexJobError("unknown_job", f"unknown job: {job_id}")
         return job
 
-    def write_job(self, job_id: str, job: dict[str, Any]) -> None:
+    def add_listener(self, fn: Callable[[dict[str, Any]], None]) -> None:
+        """Register a callback invoked with the job record after every write."""
+        self._listeners.append(fn)
+
+    def write_job(self, job_id: str, job: dict[str, Any], *, index: bool = True, publish: bool = True) -> None:
+        """Persist job.json, then (unless told not to) the index row and the listeners.
+
+        Progress/heartbeat ticks pass index=False, publish=False: they only
+        matter to readers of job.json, and neither the manifest nor the
+        `codex_job` event carries them.
+        """
         atomic_write_json(self.job_path(job_id), job)
+        if not index:
+            return
+        self.index.upsert(job)
+        if str(job.get("status")) in FINAL_STATUSES:
+            ckey = str(job.get("coalesce_key") or "")
+            if ckey and self._inflight.get(ckey) == job.get("id"):
+                del self._inflight[ckey]
+            waiting = self._final_events.pop(safe_job_id(job_id), None)
+            if waiting is not None:
+                waiting[0].set()
+        if not publish:
+            return
+        for fn in self._listeners:
+            try:
+                fn(job)
+            except Exception:
+                pass
 
-    def update_job(self, job_id: str, updates: dict[str, Any]) -> dict[str, Any]:
+    def update_job(self, job_id: str, updates: dict[str, Any], *, index: bool = True, publish: bool = True) -> dict[str, Any]:
         job = self.read_job(job_id)
         job.update(updates)
         job["updated_at"] = now_iso()
-        self.write_job(job_id, job)
+        self.write_job(job_id, job, index=index, publish=publish)
         return job
 
     def normalize_tool(self, raw: Any) -> str:
@@ -145,6 +246,32 @@ class CodexJobManager:
         model = str(payload.get("model") or self.default_model).strip() or self.default_model
         reasoning = normalize_reasoning(payload.get("reasoning"), self.default_reasoning_for_tool(tool))
         allow_edits = bool(payload.get("allow_edits", tool == "assistant"))
+        # Interactive replies are served before background assistant work.
+        priority = str(payload.get("priority") or ("background" if tool == "assistant" else "interactive")).strip().lower()
+        if priority not in PRIORITIES:
+            raise CodexJobError("invalid_priority", f"priority must be one of {', '.join(PRIORITIES)}")
+
+        # An identical request that is still queued/running gets that job instead of a second codex exec.
+        ckey = ""
+        if payload.get("coalesce", True) is not False:
+            ckey = cache_key(
+                "codex_submit",
+                tool,
+                prompt,
+                payload.get("input") if isinstance(payload.get("input"), dict) else {},
+                str(payload.get("mode") or ""),
+                str(payload.get("session_id") or ""),
+                model,
+                reasoning,
+                allow_edits,
+                bool(payload.get("mock", False)),
+            )
+            leader = self._inflight.get(ckey)
+            existing = self.index.get(leader) if leader else None
+            if existing is not None and str(existing.get("status")) not in FINAL_STATUSES:
+                if start:
+                    self.start_job(str(existing["id"]))
+                return {**self.job_status(str(existing["id"]), include_logs=False, include_output=False), "coalesced": True}
 
         job_id = self.new_job_id(tool)
         job_dir = self.job_dir(job_id)
@@ -161,9 +288,13 @@ class CodexJobManager:
             "model": model,
             "reasoning": reasoning,
             "allow_edits": allow_edits,
+            "priority": priority,
             "mode": str(payload.get("mode") or ""),
             "session_id": str(payload.get("session_id") or ""),
             "prompt_preview": prompt[:240],
+            "coalesce_key": ckey,
+            "owner_pid": os.getpid(),
+            "owner_instance": self.instance_id,
             "poll_url": f"/api/codex/job?id={job_id}",
             "result_url": f"/api/codex/result?id={job_id}",
             "paths": {
@@ -177,26 +308,36 @@ class CodexJobManager:
         }
         atomic_write_json(job_dir / "input.json", payload)
         self.write_job(job_id, job)
+        if ckey:
+            self._inflight[ckey] = job_id
         if start:
             self.start_job(job_id)
         return self.job_status(job_id, include_logs=False, include_output=False)
 
-    def start_job(self, job_id: str) -> None:
+    def start_job(self, job_id: str) -> "asyncio.Future[dict[str, Any]]":
+        """Hand a job to the scheduler; the future resolves with the final job record."""
         jid = safe_job_id(job_id)
-        task = self._tasks.get(jid)
-        if task and not task.done():
-            return
-        self._tasks[jid] = asyncio.create_task(self.run_job(jid))
+        job = self.read_job(jid)
+        if str(job.get("status")) in FINAL_STATUSES and not self.scheduler.tracks(jid):
+            fut: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+            fut.set_result(job)
+            return fut
+        return self.scheduler.submit(
+            jid,
+            tool=str(job.get("tool") or "response"),
+            session_id=str(job.get("session_id") or ""),
+            priority=str(job.get("priority") or "normal"),
+        )
 
-    def build_prompt(self, job: dict[str, Any], payload: dict[str, Any]) -> str:
-        template = self.prompt_path.read_text("utf-8")
+    def _tool_input(self, job: dict[str, Any], payload: dict[str, Any]) -> dict[str, Any]:
         prompt = str(payload.get("prompt") or "").strip()
-        tool_input = {
-            "prompt": prompt,
-            "input": payload.get("input") if isinstance(payload.get("input"), dict) else {},
+        # Ordered from most to least shared so consecutive prompts keep a longer common prefix.
+        return {
             "mode": "assistant_handoff" if job.get("tool") == "assistant" else "definite_response",
             "studio_mode": str(payload.get("mode") or ""),
             "session_id": str(payload.get("session_id") or ""),
+            "input": payload.get("input") if isinstance(payload.get("input"), dict) else {},
+            "prompt": prompt,
             "api_contract": {
                 "job_id": job["id"],
                 "tool": job["tool"],
@@ -204,12 +345,26 @@ class CodexJobManager:
                 "schema_path": str(self.schema_path),
             },
         }
-        return (
-            template
-            + "\n\nInput JSON follows. Return only JSON matching the selected schema.\n\n"
-            + json.dumps(tool_input, ensure_ascii=False, indent=2)
-            + "\n"
-        )
+
+    def _render_prompt(self, tool_input: dict[str, Any]) -> str:
+        template = self.templates.get("codex_response")
+        return template.render(json.dumps(tool_input, ensure_ascii=False, indent=2) + "\n")
+
+    def _schema_digest(self) -> str:
+        try:
+            return self.templates.get("codex_response_schema").digest
+        except OSError:
+            return _sha256_text("")
+
+    def build_prompt(self, job: dict[str, Any], payload: dict[str, Any]) -> str:
+        return self._render_prompt(self._tool_input(job, payload))
+
+    def result_cache_key(self, job: dict[str, Any], payload: dict[str, Any]) -> str:
+        """Key over the prompt as Codex sees it, minus the per-job fields, plus model/reasoning/schema."""
+        tool_input = self._tool_input(job, payload)
+        tool_input.pop("api_contract", None)
+        tool_input.pop("session_id", None)
+        return cache_key("codex_job", self._render_prompt(tool_input), job.get("model"), job.get("reasoning"), self._schema_digest())
 
     def mock_result(self, job: dict[str, Any], payload: dict[str, Any]) -> dict[str, Any]:
         prompt = str(payload.get("prompt") or "")
@@ -223,15 +378,35 @@ class CodexJobManager:
             "confidence": 0.5,
         }
 
-    async def run_job(self, job_id: str) -> dict[str, Any]:
+    async def run_job(self, job_id: str, *, queued_seconds: float | None = None) -> dict[str, Any]:
         jid = safe_job_id(job_id)
         job_dir = self.job_dir(jid)
         payload = read_json(job_dir / "input.json", {})
         if not isinstance(payload, dict):
             payload = {}
+        current = self.read_job(jid)
+        if str(current.get("status")) in FINAL_STATUSES:
+            return current
+        if current.get("status") == "running" and current.get("pid"):
+            # Started by a previous backend process; follow its child instead of spawning another.
+            return await self._reattach_job(jid, current, payload)
         started = time.monotonic()
         try:
-            job = self.update_job(jid, {"status": "running", "started_at": now_iso()})
+            started_updates: dict[str, Any] = {
+                "status": "running",
+                "started_at": now_iso(),
+                "attempts": int(current.get("attempts") or 0) + 1,
+                "owner_pid": os.getpid(),
+                "owner_instance": self.instance_id,
+                "heartbeat_at": now_iso(),
+            }
+            if queued_seconds is not None:
+                started_updates["queued_seconds"] = round(queued_seconds, 2)
+            started_updates["prompt_template"] = {
+                **self.templates.get("codex_response").describe(),
+                "schema_version": self._schema_digest()[:12],
+            }
+            job = self.update_job(jid, started_updates)
             full_prompt = self.build_prompt(job, payload)
             atomic_write_text(job_dir / "prompt.txt", full_prompt)
 
@@ -248,12 +423,32 @@ class CodexJobManager:
                     },
                 )
 
+            # Only read-only answers are deterministic enough to reuse.
+            key = ""
+            if job.get("tool") == "response" and not job.get("allow_edits") and cache_enabled(payload.get("cache")):
+                key = self.result_cache_key(job, payload)
+                hit = self.cache.get(key)
+                if hit is not None and isinstance(hit.get("value"), dict):
+                    atomic_write_json(job_dir / "output.json", hit["value"])
+                    meta = hit.get("meta") if isinstance(hit.get("meta"), dict) else {}
+                    return self.update_job(
+                        jid,
+                        {
+                            "status": "succeeded",
+                            "finished_at": now_iso(),
+                            "elapsed_seconds": round(time.monotonic() - started, 2),
+                            "returncode": 0,
+                            "cache": {"hit": True, "key": key, "source_job": meta.get("job_id")},
+                        },
+                    )
+
             if not shutil.which("codex"):
                 raise CodexJobError("codex_not_found", "codex executable was not found on PATH")
 
             cmd = [
                 "codex",
                 "exec",
+                "--json",
                 "--ephemeral",
                 "--model",
                 str(job["model"]),
@@ -272,45 +467,42 @@ class CodexJobManager:
                 cmd.extend(["--sandbox", "read-only"])
             cmd.append("-")
 
-            timeout_s = float(payload.get("timeout_s") or self.default_timeout_s)
-            timeout_s = max(10.0, min(timeout_s, 3600.0))
-            proc = await asyncio.create_subprocess_exec(
-                *cmd,
-                cwd=str(self.repo_root),
-                stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=os.environ.copy(),
-            )
+            timeout_s = self._timeout_for(payload)
+            # A retried job starts with fresh logs (and no stale output); within a run they are only appended to.
+            for name in ("stdout.log", "stderr.log", "output.json"):
+                (job_dir / name).unlink(missing_ok=True)
             try:
-                out_b, err_b = await asyncio.wait_for(
-                    proc.communicate(full_prompt.encode("utf-8")), timeout=timeout_s
+                rc, progress = await stream_codex_exec(
+                    cmd,
+                    cwd=self.repo_root,
+                    stdin_data=full_prompt.encode("utf-8"),
+                    stdout_path=job_dir / "stdout.log",
+                    stderr_path=job_dir / "stderr.log",
+                    timeout_s=timeout_s,
+                    on_progress=lambda p: self._record_progress(jid, p),
+                    on_spawn=lambda pid: self.update_job(jid, {"pid": pid, "pgid": pid, "heartbeat_at": now_iso()}),
                 )
             except asyncio.TimeoutError as exc:
-                try:
-                    proc.kill()
-                except Exception:
-                    pass
-                try:
-                    await proc.wait()
-                except Exception:
-                    pass
                 raise CodexJobError("timeout", f"codex exec exceeded timeout_s={timeout_s}") from exc
 
-            atomic_write_text(job_dir / "stdout.log", out_b.decode("utf-8", errors="replace"))
-            atomic_write_text(job_dir / "stderr.log", err_b.decode("utf-8", errors="replace"))
-            status = "succeeded" if proc.returncode == 0 and (job_dir / "output.json").exists() else "failed"
+            status = "succeeded" if rc == 0 and (job_dir / "output.json").exists() else "failed"
             updates: dict[str, Any] = {
                 "status": status,
                 "finished_at": now_iso(),
                 "elapsed_seconds": round(time.monotonic() - started, 2),
-                "returncode": proc.returncode,
+                "returncode": rc,
+                "progress": progress.to_dict(),
             }
             if status == "failed":
-                updates["error"] = f"codex exec failed with returncode {proc.returncode}"
+                updates["error"] = f"codex exec failed with returncode {rc}"
+            elif key:
+                output = read_json(job_dir / "output.json")
+                if isinstance(output, dict):
+                    self.cache.put(key, output, meta={"job_id": jid})
+                updates["cache"] = {"hit": False, "key": key}
             return self.update_job(jid, updates)
         except CodexJobError as exc:
-            atomic_write_text(job_dir / "stderr.log", exc.detail + "\n")
+            append_text(job_dir / "stderr.log", exc.detail + "\n")
             return self.update_job(
                 jid,
                 {
@@ -322,7 +514,7 @@ class CodexJobManager:
                 },
             )
         except Exception as exc:
-            atomic_write_text(job_dir / "stderr.log", f"{type(exc).__name__}: {exc}\n")
+            append_text(job_dir / "stderr.log", f"{type(exc).__name__}: {exc}\n")
             return self.update_job(
                 jid,
                 {
@@ -333,15 +525,197 @@ class CodexJobManager:
                 },
             )
 
+    def _timeout_for(self, payload: dict[str, Any]) -> float:
+        timeout_s = float(payload.get("timeout_s") or self.default_timeout_s)
+        return max(10.0, min(timeout_s, 3600.0))
+
+    def _record_progress(self, job_id: str, progress: CodexProgress) -> None:
+        # Progress callbacks double as the job heartbeat (at least every 10s while running).
+        # Only job.json is rewritten; the index row and SSE listeners are left alone.
+        try:
+            self.update_job(job_id, {"progress": progress.to_dict(), "heartbeat_at": now_iso()}, index=False, publish=False)
+        except Exception:
+            pass
+
+    def _finish_orphan(self, job_id: str, job: dict[str, Any], rc: int | None, progress: CodexProgress | None) -> dict[str, Any]:
+        """Final record for a job whose codex child exited while no backend was following it."""
+        job_dir = self.job_dir(job_id)
+        output = job_dir / "output.json"
+        started = parse_iso(job.get("started_at"))
+        updates: dict[str, Any] = {
+            "finished_at": now_iso(),
+            "elapsed_seconds": round(time.time() - started, 2) if started else None,
+            "returncode": rc,
+            "recovered": True,
+        }
+        if progress is not None:
+            updates["progress"] = progress.to_dict()
+        if rc in (0, None) and output.exists() and output.stat().st_size > 0:
+            updates["status"] = "succeeded"
+        else:
+            updates["status"] = "failed"
+            updates["error"] = "backend_restarted"
+            updates["detail"] = (
+                "the backend restarted while this job was running and codex exec "
+                + (f"exited with returncode {rc}" if rc is not None else "exited without writing output.json")
+            )
+            append_text(job_dir / "stderr.log", updates["detail"] + "\n")
+        return self.update_job(job_id, updates)
+
+    async def _reattach_job(self, job_id: str, job: dict[str, Any], payload: dict[str, Any]) -> dict[str, Any]:
+        pid = int(job["pid"])
+        pgid = int(job.get("pgid") or pid)
+        job_dir = self.job_dir(job_id)
+        self.update_job(
+            job_id,
+            {"owner_pid": os.getpid(), "owner_instance": self.instance_id, "heartbeat_at": now_iso(), "reattached_at": now_iso()},
+        )
+        timeout_s = self._timeout_for(payload)
+        started = parse_iso(job.get("started_at")) or time.time()
+        follower = CodexOutputFollower(job_dir / "stdout.log", job_dir / "stderr.log")
+        try:
+            rc, progress = await watch_codex_process(
+                pid,
+                pgid,
+                follower=follower,
+                deadline=started + timeout_s,
+                on_progress=lambda p: self._record_progress(job_id, p),
+            )
+        except asyncio.TimeoutError:
+            detail = f"codex exec exceeded timeout_s={timeout_s}"
+            append_text(job_dir / "stderr.log", detail + "\n")
+            return self.update_job(
+                job_id,
+                {
+                    "status": "failed",
+                    "finished_at": now_iso(),
+                    "elapsed_seconds": round(time.time() - started, 2),
+                    "error": "timeout",
+                    "detail": detail,
+                    "recovered": True,
+                },
+            )
+        return self._finish_orphan(job_id, self.read_job(job_id), rc, progress)
+
+    def _owned_elsewhere(self, job: dict[str, Any]) -> bool:
+        """True if another live backend process is (still) responsible for the job."""
+        owner_pid = job.get("owner_pid")
+        if not owner_pid or int(owner_pid) == os.getpid():
+            return False
+        if not pid_alive(owner_pid):
+            return False
+        if job.get("status") != "running":
+            return True
+        # Heartbeats only go to job.json, so the index row may be stale.
+        fresh = read_json(self.job_path(str(job["id"])))
+        if isinstance(fresh, dict):
+            job = fresh
+        beat = parse_iso(job.get("heartbeat_at") or job.get("updated_at"))
+        return beat is not None and time.time() - beat < self.heartbeat_stale_s
+
+    def _requeue(self, job_id: str, job: dict[str, Any], reason: str) -> None:
+        self.update_job(
+            job_id,
+            {
+                "status": "queued",
+                "owner_pid": os.getpid(),
+                "owner_instance": self.instance_id,
+                "pid": None,
+                "pgid": None,
+                "started_at": None,
+                "requeued_at": now_iso(),
+                "requeue_reason": reason,
+            },
+        )
+        ckey = str(job.get("coalesce_key") or "")
+        if ckey and ckey not in self._inflight:
+            self._inflight[ckey] = job_id
+        self.start_job(job_id)
+
+    def recover_jobs(self) -> list[dict[str, Any]]:
+        """Reconcile unfinished jobs that no task in this process is driving.
+
+        Called at startup and periodically. Queued jobs go back to the
+        scheduler; running jobs whose codex child is still alive are
+        re-attached (by the pid/pgid recorded at spawn); jobs whose child is
+        gone are finished from output.json if it exists, otherwise response
+        jobs are re-queued (up to `max_attempts`) and assistant jobs, which
+        may have edited files, fail with `backend_restarted`. Jobs owned by
+        another live backend with a fresh heartbeat are left alone.
+        """
+        actions: list[dict[str, Any]] = []
+        for job in self.index.unfinished(FINAL_STATUSES):
+            jid = str(job["id"])
+            # Jobs created by this manager are driven by its own tasks (possibly about to start).
+            if job.get("owner_instance") == self.instance_id or self.scheduler.tracks(jid):
+                continue
+            if self._owned_elsewhere(job):
+                continue
+            status = str(job.get("status") or "")
+            if status == "queued":
+                self._requeue(jid, job, "backend_restarted")
+                action = "requeued"
+            elif status == "running":
+                alive, rc = (False, None)
+                if job.get("pid"):
+                    alive, rc = probe_process(int(job["pid"]), int(job.get("pgid") or job["pid"]))
+                if alive:
+                    self.start_job(jid)
+                    action = "reattached"
+                elif (self.job_dir(jid) / "output.json").exists() and rc in (0, None):
+                    follower = CodexOutputFollower(self.job_dir(jid) / "stdout.log", self.job_dir(jid) / "stderr.log")
+                    self._finish_orphan(jid, job, rc, follower.finish())
+                    action = "recovered"
+                elif job.get("tool") == "response" and int(job.get("attempts") or 1) < self.max_attempts:
+                    self._requeue(jid, job, "backend_restarted")
+                    action = "requeued"
+                else:
+                    self._finish_orphan(jid, job, rc, None)
+                    action = "failed"
+            else:
+                continue
+            actions.append(
+                {
+                    "id": jid,
+                    "tool": job.get("tool"),
+                    "mode": job.get("mode"),
+                    "session_id": job.get("session_id"),
+                    "action": action,
+                }
+            )
+        return actions
+
     async def wait_job(self, job_id: str, timeout_s: float = 120.0) -> dict[str, Any]:
+        """Wait until the job is final (or the timeout passes) and return its record.
+
+        Woken directly by write_job; job.json is only re-read every
+        `wait_fallback_s` in case the job is finished by another process.
+        """
+        jid = safe_job_id(job_id)
+        job = self.read_job(jid)
+        if str(job.get("status")) in FINAL_STATUSES:
+            return job
+        ev, n = self._final_events.get(jid) or (asyncio.Event(), 0)
+        self._final_events[jid] = (ev, n + 1)
         deadline = time.monotonic() + max(0.0, timeout_s)
-        while True:
-            job = self.read_job(job_id)
-            if str(job.get("status")) in FINAL_STATUSES:
-                return job
-            if time.monotonic() >= deadline:
-                return job
-            await asyncio.sleep(0.25)
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    try:
+                        await asyncio.wait_for(ev.wait(), timeout=min(remaining, self.wait_fallback_s))
+                    except asyncio.TimeoutError:
+                        pass
+                job = self.read_job(jid)
+                if str(job.get("status")) in FINAL_STATUSES or time.monotonic() >= deadline:
+                    return job
+        finally:
+            cur = self._final_events.get(jid)
+            if cur is not None and cur[0] is ev:
+                if cur[1] <= 1:
+                    self._final_events.pop(jid, None)
+                else:
+                    self._final_events[jid] = (ev, cur[1] - 1)
 
     async def respond(self, payload: dict[str, Any]) -> dict[str, Any]:
         request = dict(payload)
@@ -350,14 +724,19 @@ class CodexJobManager:
         wait_seconds = float(request.pop("wait_seconds", 120))
         job_payload = self.submit_job(request, start=False)
         job_id = str(job_payload["job"]["id"])
-        await self.run_job(job_id)
+        await self.start_job(job_id)
         await self.wait_job(job_id, timeout_s=wait_seconds)
         return self.job_status(job_id, include_logs=True, include_output=True)
 
     def job_status(self, job_id: str, *, include_logs: bool = True, include_output: bool = True) -> dict[str, Any]:
         job = self.read_job(job_id)
+        if job.get("archive"):
+            return self._archived_status(job, include_logs=include_logs, include_output=include_output)
         job_dir = self.job_dir(job["id"])
         payload: dict[str, Any] = {"job": job}
+        queue = self.scheduler.queue_info(str(job["id"]))
+        if queue is not None:
+            payload["queue"] = queue
         if include_output and (job_dir / "output.json").exists():
             output = read_json(job_dir / "output.json")
             if output is None:
@@ -371,15 +750,43 @@ class CodexJobManager:
             }
         return payload
 
+    def _archived_status(self, job: dict[str, Any], *, include_logs: bool, include_output: bool) -> dict[str, Any]:
+        payload: dict[str, Any] = {"job": job, "archived": True}
+        names = ({"output.json"} if include_output else set()) | ({"stdout.log", "stderr.log"} if include_logs else set())
+        if not names:
+            return payload
+        try:
+            members = read_archive_members(Path(job["archive"]["path"]), names)
+        except Exception as exc:
+            raise CodexJobError("archive_unreadable", f"{type(exc).__name__}: {exc}") from exc
+        if "output.json" in members:
+            text = members["output.json"].decode("utf-8", errors="replace")
+            try:
+                payload["output"] = json.loads(text)
+            except Exception:
+                payload["output_text"] = text
+        if include_logs:
+            payload["logs"] = {
+                "stdout_tail": decode_tail(members.get("stdout.log")),
+                "stderr_tail": decode_tail(members.get("stderr.log")),
+            }
+        return payload
+
+    async def load_job_status(self, job_id: str, *, include_logs: bool = True, include_output: bool = True) -> dict[str, Any]:
+        """job_status() that reads archived jobs off the IOLoop (the archive has to be decompressed)."""
+        job = self.read_job(job_id)
+        if not job.get("archive") or not (include_logs or include_output):
+            return self.job_status(job_id, include_logs=include_logs, include_output=include_output)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, lambda: self._archived_status(job, include_logs=include_logs, include_output=include_output)
+        )
+
     def list_jobs(self, *, limit: int = 20, session_id: str | None = None) -> list[dict[str, Any]]:
         lim = max(1, min(int(limit), 200))
         sid = str(session_id or "").strip()
-        jobs: list[dict[str, Any]] = []
-        for path in self.jobs_root.glob("*/job.json"):
-            job = read_json(path)
-            if not isinstance(job, dict):
-                continue
-            if sid and str(job.get("session_id") or "") != sid:
-                continue
-            jobs.append(job)
-        return sorted(jobs, key=lambda item: str(item.get("created_at") or ""), reverse=True)[:lim]
+        return self.index.latest(limit=lim, session_id=sid or None)
+
+    def job_counts(self, *, session_id: str | None = None) -> dict[str, int]:
+        """Jobs per status across the whole index (not just the latest page)."""
+        return self.index.counts(session_id=str(session_id or "").strip() or None)
@@ -0,0 +1,52 @@
+import os
+import tarfile
+from pathlib import Path
+
+
+# output.json and job.json go first so reading a result only decompresses the head of the archive.
+_MEMBER_ORDER = ("output.json", "job.json", "input.json", "prompt.txt", "stderr.log", "stdout.log")
+
+
+def archive_job_dir(job_dir: Path, dst: Path) -> tuple[int, int]:
+    """Pack a job directory into `dst` (tar.gz); returns (original bytes, archive bytes)."""
+    names = [n for n in _MEMBER_ORDER if (job_dir / n).is_file()]
+    names += sorted(e.name for e in os.scandir(job_dir) if e.is_file() and e.name not in _MEMBER_ORDER)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + ".tmp")
+    original = 0
+    with tarfile.open(tmp, "w:gz", compresslevel=6) as tar:
+        for name in names:
+            path = job_dir / name
+            original += path.stat().st_size
+            tar.add(str(path), arcname=name, recursive=False)
+    tmp.replace(dst)
+    return original, dst.stat().st_size
+
+
+def read_archive_members(path: Path, names: set[str], *, max_bytes: int = 8 * 1024 * 1024) -> dict[str, bytes]:
+    """Read the named files from a job archive, stopping once all are found.
+
+    Members larger than `max_bytes` are truncated to their last `max_bytes`.
+    """
+    out: dict[str, bytes] = {}
+    with tarfile.open(path, "r:gz") as tar:
+        for member in tar:
+            if member.name not in names or not member.isfile():
+                continue
+            f = tar.extractfile(member)
+            if f is None:
+                continue
+            with f:
+                if member.size > max_bytes:
+                    f.seek(member.size - max_bytes)
+                out[member.name] = f.read()
+            if len(out) == len(names):
+                break
+    return out
+
+
+def decode_tail(data: bytes | None, max_chars: int = 8000) -> str:
+    if not data:
+        return ""
+    return data[-max_chars * 4 :].decode("utf-8", errors="replace")[-max_chars:]
+
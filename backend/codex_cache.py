@@ -0,0 +1,187 @@
+import asyncio
+import collections
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+
+def cache_key(*parts: Any) -> str:
+    """sha256 over the JSON encoding of `parts` (order matters)."""
+    raw = json.dumps(list(parts), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8", errors="replace")).hexdigest()
+
+
+def cache_enabled(requested: Any = None) -> bool:
+    """Per-request `cache` flag if given, else AUTOAPPDEV_CODEX_CACHE (off by default)."""
+    if isinstance(requested, bool):
+        return requested
+    return os.environ.get("AUTOAPPDEV_CODEX_CACHE", "0").strip() == "1"
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls: followers await the leader's result."""
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Future[Any]] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Return (result, shared); `shared` is True when another caller did the work."""
+        existing = self._calls.get(key)
+        if existing is not None:
+            return await asyncio.shield(existing), True
+        fut: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._calls[key] = fut
+        try:
+            result = await fn()
+        except Exception as exc:
+            fut.set_exception(exc)
+            # Mark it retrieved; followers (if any) re-raise it themselves.
+            fut.exception()
+            raise
+        except BaseException:
+            fut.cancel()
+            raise
+        else:
+            fut.set_result(result)
+            return result, False
+        finally:
+            self._calls.pop(key, None)
+
+
+class CodexResultCache:
+    """Content-addressed cache of deterministic Codex results.
+
+    Entries live in runtime/codex-cache/<kk>/<key>.json as {"key", "created",
+    "meta", "value"}. An in-memory LRU mirrors the directory; entries older than
+    `ttl_s` are treated as misses and removed, and the least recently used are
+    evicted once `max_entries` or `max_bytes` is exceeded.
+    """
+
+    def __init__(self, root: Path, *, ttl_s: float = 86400.0, max_entries: int = 1000, max_bytes: int = 256 * 1024 * 1024):
+        self.root = root
+        self.ttl_s = max(0.0, float(ttl_s))
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        # key -> (created epoch seconds, size in bytes), least recently used first
+        self._lru: "collections.OrderedDict[str, tuple[float, int]]" = collections.OrderedDict()
+        self._bytes = 0
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+        self._load()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _load(self) -> None:
+        found: list[tuple[float, str, float, int]] = []
+        if self.root.exists():
+            for path in self.root.glob("*/*.json"):
+                try:
+                    st = path.stat()
+                    created = float(json.loads(path.read_text("utf-8")).get("created") or st.st_mtime)
+                except Exception:
+                    continue
+                # File mtime is bumped on every hit, so it restores the LRU order.
+                found.append((st.st_mtime, path.stem, created, st.st_size))
+        for _, key, created, size in sorted(found):
+            self._lru[key] = (created, size)
+            self._bytes += size
+        self._evict()
+
+    def _drop(self, key: str) -> None:
+        entry = self._lru.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        while self._lru and (
+            len(self._lru) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._lru))
+            self._drop(key)
+            self.counters["evictions"] += 1
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        entry = self._lru.get(key)
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        if self.ttl_s and time.time() - entry[0] > self.ttl_s:
+            self._drop(key)
+            self.counters["expired"] += 1
+            self.counters["misses"] += 1
+            return None
+        path = self._path(key)
+        try:
+            record = json.loads(path.read_text("utf-8"))
+            os.utime(path)
+        except Exception:
+            self._drop(key)
+            self.counters["misses"] += 1
+            return None
+        self._lru.move_to_end(key)
+        self.counters["hits"] += 1
+        return record
+
+    def put(self, key: str, value: Any, *, meta: dict[str, Any] | None = None) -> None:
+        record = {"key": key, "created": time.time(), "meta": meta or {}, "value": value}
+        data = json.dumps(record, ensure_ascii=False) + "\n"
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(data, "utf-8")
+        tmp.replace(path)
+        old = self._lru.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        size = len(data.encode("utf-8"))
+        self._lru[key] = (record["created"], size)
+        self._bytes += size
+        self.counters["stores"] += 1
+        self._evict()
+
+    def clear(self) -> int:
+        n = len(self._lru)
+        for key in list(self._lru):
+            self._drop(key)
+        return n
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "enabled_by_default": cache_enabled(),
+            "entries": len(self._lru),
+            "bytes": self._bytes,
+            "ttl_s": self.ttl_s,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else None,
+        }
+
+
+def codex_cache_from_env(root: Path) -> CodexResultCache:
+    def _num(key: str, default: float) -> float:
+        try:
+            return float(os.environ.get(key, str(default)).strip())
+        except Exception:
+            return default
+
+    return CodexResultCache(
+        root,
+        ttl_s=_num("AUTOAPPDEV_CODEX_CACHE_TTL_S", 86400),
+        max_entries=int(_num("AUTOAPPDEV_CODEX_CACHE_MAX_ENTRIES", 1000)),
+        max_bytes=int(_num("AUTOAPPDEV_CODEX_CACHE_MAX_MB", 256) * 1024 * 1024),
+    )
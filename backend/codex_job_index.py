@@ -0,0 +1,181 @@
+import bisect
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+
+def _sort_key(job: dict[str, Any]) -> tuple[str, str]:
+    return (str(job.get("created_at") or ""), str(job.get("id") or ""))
+
+
+class CodexJobIndex:
+    """In-memory index of Codex job records, persisted as an append-only manifest.
+
+    Every job write appends the full record to runtime/codex-jobs/index.jsonl
+    (last line per id wins). On startup the manifest is replayed, reconciled
+    against the job directories (names only; job.json is read just for ids the
+    manifest does not know), and compacted. Listing newest-first walks a list
+    sorted by (created_at, id), so it costs O(limit) rather than a glob+parse
+    of every job.
+    """
+
+    def __init__(self, root: Path, *, compact_slack: int = 1000):
+        self.root = root
+        self.path = root / "index.jsonl"
+        self.compact_slack = max(0, int(compact_slack))
+        self._jobs: dict[str, dict[str, Any]] = {}
+        self._order: list[tuple[str, str]] = []
+        self._by_session: dict[str, list[tuple[str, str]]] = {}
+        self._counts: dict[str, int] = {}
+        self._manifest_lines = 0
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._jobs
+
+    # --- loading -----------------------------------------------------------
+
+    def load(self) -> None:
+        records: dict[str, dict[str, Any]] = {}
+        lines = 0
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                for raw in f:
+                    lines += 1
+                    try:
+                        rec = json.loads(raw)
+                    except Exception:
+                        continue
+                    if not isinstance(rec, dict) or not rec.get("id"):
+                        continue
+                    if rec.get("deleted"):
+                        records.pop(str(rec["id"]), None)
+                    else:
+                        records[str(rec["id"])] = rec
+        except FileNotFoundError:
+            pass
+
+        on_disk = {e.name for e in os.scandir(self.root) if e.is_dir()} if self.root.exists() else set()
+        for jid in list(records):
+            # Archived jobs keep only their summary row here; the directory is gone on purpose.
+            if jid not in on_disk and not records[jid].get("archive"):
+                records.pop(jid)
+        for jid in on_disk - records.keys():
+            try:
+                rec = json.loads((self.root / jid / "job.json").read_text("utf-8"))
+            except Exception:
+                continue
+            if isinstance(rec, dict) and rec.get("id"):
+                records[str(rec["id"])] = rec
+
+        self._jobs.clear()
+        self._order.clear()
+        self._by_session.clear()
+        self._counts.clear()
+        for rec in records.values():
+            self._insert(rec)
+        self._manifest_lines = lines
+        if lines != len(self._jobs):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the manifest with one line per live job."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for _, jid in self._order:
+                f.write(json.dumps(self._jobs[jid], ensure_ascii=False) + "\n")
+        tmp.replace(self.path)
+        self._manifest_lines = len(self._jobs)
+
+    # --- updates -----------------------------------------------------------
+
+    def _insert(self, job: dict[str, Any]) -> None:
+        jid = str(job["id"])
+        key = _sort_key(job)
+        self._jobs[jid] = job
+        # New jobs almost always sort last, so insort is an append in practice.
+        bisect.insort(self._order, key)
+        sid = str(job.get("session_id") or "")
+        if sid:
+            bisect.insort(self._by_session.setdefault(sid, []), key)
+        st = str(job.get("status") or "unknown")
+        self._counts[st] = self._counts.get(st, 0) + 1
+
+    def _remove(self, jid: str) -> dict[str, Any] | None:
+        old = self._jobs.pop(jid, None)
+        if old is None:
+            return None
+        key = _sort_key(old)
+        i = bisect.bisect_left(self._order, key)
+        if i < len(self._order) and self._order[i] == key:
+            del self._order[i]
+        sid = str(old.get("session_id") or "")
+        seq = self._by_session.get(sid)
+        if seq is not None:
+            i = bisect.bisect_left(seq, key)
+            if i < len(seq) and seq[i] == key:
+                del seq[i]
+            if not seq:
+                self._by_session.pop(sid, None)
+        st = str(old.get("status") or "unknown")
+        left = self._counts.get(st, 0) - 1
+        if left > 0:
+            self._counts[st] = left
+        else:
+            self._counts.pop(st, None)
+        return old
+
+    def _append(self, rec: dict[str, Any]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._manifest_lines += 1
+        if self._manifest_lines > 2 * len(self._jobs) + self.compact_slack:
+            self.compact()
+
+    def upsert(self, job: dict[str, Any]) -> None:
+        if not job.get("id"):
+            return
+        rec = dict(job)
+        self._remove(str(rec["id"]))
+        self._insert(rec)
+        self._append(rec)
+
+    def remove(self, job_id: str) -> None:
+        if self._remove(job_id) is not None:
+            self._append({"id": job_id, "deleted": True})
+
+    # --- queries -----------------------------------------------------------
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    def rows(self) -> list[dict[str, Any]]:
+        """All job records, oldest first."""
+        return [dict(self._jobs[jid]) for _, jid in self._order]
+
+    def unfinished(self, final_statuses: set[str]) -> list[dict[str, Any]]:
+        return [dict(job) for job in self._jobs.values() if str(job.get("status")) not in final_statuses]
+
+    def latest(self, *, limit: int, session_id: str | None = None) -> list[dict[str, Any]]:
+        seq = self._by_session.get(session_id, []) if session_id else self._order
+        out: list[dict[str, Any]] = []
+        for i in range(len(seq) - 1, -1, -1):
+            if len(out) >= limit:
+                break
+            out.append(dict(self._jobs[seq[i][1]]))
+        return out
+
+    def counts(self, *, session_id: str | None = None) -> dict[str, int]:
+        if not session_id:
+            return dict(self._counts)
+        out: dict[str, int] = {}
+        for _, jid in self._by_session.get(session_id, []):
+            st = str(self._jobs[jid].get("status") or "unknown")
+            out[st] = out.get(st, 0) + 1
+        return out
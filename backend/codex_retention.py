@@ -0,0 +1,245 @@
+import asyncio
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any
+
+from .codex_api import FINAL_STATUSES, CodexJobManager, now_iso, parse_iso
+from .codex_archive import archive_job_dir
+
+
+# Fields kept in the index row of an archived job; everything else is in the archive.
+_SUMMARY_FIELDS = (
+    "id",
+    "tool",
+    "status",
+    "created_at",
+    "updated_at",
+    "started_at",
+    "finished_at",
+    "elapsed_seconds",
+    "queued_seconds",
+    "model",
+    "reasoning",
+    "priority",
+    "mode",
+    "session_id",
+    "prompt_preview",
+    "returncode",
+    "error",
+    "detail",
+    "cache",
+    "recovered",
+    "attempts",
+    "prompt_template",
+    "poll_url",
+    "result_url",
+)
+
+
+def _dir_bytes(path: Path) -> int:
+    total = 0
+    try:
+        for e in os.scandir(path):
+            if e.is_file():
+                total += e.stat().st_size
+    except OSError:
+        pass
+    return total
+
+
+class RetentionPolicy:
+    """When finished Codex jobs are archived, and when archives are deleted.
+
+    A finished job is archived once it is older than `archive_after_s`, falls
+    outside the newest `keep_per_tool` jobs of its tool or `keep_per_session`
+    of its chat session, or while live job directories exceed `max_live_bytes`
+    (oldest first). Archives older than `purge_after_s` are deleted with their
+    index row (0 keeps them forever).
+    """
+
+    def __init__(
+        self,
+        *,
+        archive_after_s: float = 7 * 86400,
+        keep_per_tool: int = 200,
+        keep_per_session: int = 50,
+        max_live_bytes: int = 1024 * 1024 * 1024,
+        purge_after_s: float = 0,
+    ):
+        self.archive_after_s = max(0.0, float(archive_after_s))
+        self.keep_per_tool = max(1, int(keep_per_tool))
+        self.keep_per_session = max(1, int(keep_per_session))
+        self.max_live_bytes = max(0, int(max_live_bytes))
+        self.purge_after_s = max(0.0, float(purge_after_s))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "archive_after_s": self.archive_after_s,
+            "keep_per_tool": self.keep_per_tool,
+            "keep_per_session": self.keep_per_session,
+            "max_live_bytes": self.max_live_bytes,
+            "purge_after_s": self.purge_after_s,
+        }
+
+    def select(self, rows: list[dict[str, Any]], sizes: dict[str, int], now: float) -> dict[str, str]:
+        """Map job id -> reason for every live finished job that should be archived.
+
+        `rows` are finished, unarchived jobs oldest first; `sizes` their directory bytes.
+        """
+        out: dict[str, str] = {}
+        by_tool: dict[str, int] = {}
+        by_session: dict[str, int] = {}
+        kept: list[dict[str, Any]] = []
+        for job in reversed(rows):
+            jid = str(job["id"])
+            tool = str(job.get("tool") or "")
+            sid = str(job.get("session_id") or "")
+            by_tool[tool] = by_tool.get(tool, 0) + 1
+            if sid:
+                by_session[sid] = by_session.get(sid, 0) + 1
+            finished = parse_iso(job.get("finished_at") or job.get("updated_at"))
+            if self.archive_after_s and finished is not None and now - finished > self.archive_after_s:
+                out[jid] = "age"
+            elif by_tool[tool] > self.keep_per_tool:
+                out[jid] = "tool_count"
+            elif sid and by_session[sid] > self.keep_per_session:
+                out[jid] = "session_count"
+            else:
+                kept.append(job)
+        if self.max_live_bytes:
+            live = sum(sizes.get(str(j["id"]), 0) for j in kept)
+            for job in reversed(kept):
+                if live <= self.max_live_bytes:
+                    break
+                out[str(job["id"])] = "bytes"
+                live -= sizes.get(str(job["id"]), 0)
+        return out
+
+
+class CodexRetention:
+    """Archives finished Codex jobs into runtime/codex-archive/<YYYYMM>/<job-id>.tar.gz.
+
+    Sizing and compression run in a worker thread; only the index update
+    happens on the IOLoop. The job's index row is replaced by a summary with
+    an `archive` field, after which the job directory is removed; reads of
+    its output go through CodexJobManager.load_job_status, which unpacks
+    just the members it needs.
+    """
+
+    def __init__(self, codex: CodexJobManager, *, archive_root: Path, policy: RetentionPolicy, max_per_sweep: int = 500):
+        self.codex = codex
+        self.archive_root = archive_root.resolve()
+        self.policy = policy
+        self.max_per_sweep = max(1, int(max_per_sweep))
+        self.last_sweep: dict[str, Any] | None = None
+        self._sweeping: asyncio.Future[Any] | None = None
+
+    def archive_path(self, job_id: str) -> Path:
+        # Job ids start with a UTC timestamp (YYYYMMDDT...), so group archives by month.
+        return self.archive_root / job_id[:6] / f"{job_id}.tar.gz"
+
+    async def sweep(self) -> dict[str, Any]:
+        """Run one retention pass; concurrent callers share it."""
+        if self._sweeping is not None:
+            return await asyncio.shield(self._sweeping)
+        fut = asyncio.ensure_future(self._sweep())
+        self._sweeping = fut
+        try:
+            return await asyncio.shield(fut)
+        finally:
+            self._sweeping = None
+
+    async def _sweep(self) -> dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        now = time.time()
+        rows = self.codex.index.rows()
+        live = [
+            r for r in rows
+            if str(r.get("status")) in FINAL_STATUSES and not r.get("archive") and not self.codex.scheduler.tracks(str(r["id"]))
+        ]
+        sizes = await loop.run_in_executor(None, lambda: {str(r["id"]): _dir_bytes(self.codex.job_dir(str(r["id"]))) for r in live})
+        chosen = self.policy.select(live, sizes, now)
+
+        archived: list[dict[str, Any]] = []
+        errors: list[dict[str, Any]] = []
+        for job in live:
+            jid = str(job["id"])
+            if jid not in chosen or len(archived) >= self.max_per_sweep:
+                continue
+            dst = self.archive_path(jid)
+            try:
+                original, packed = await loop.run_in_executor(None, archive_job_dir, self.codex.job_dir(jid), dst)
+            except Exception as exc:
+                errors.append({"id": jid, "error": f"{type(exc).__name__}: {exc}"})
+                continue
+            current = self.codex.index.get(jid)
+            if current is None or current.get("updated_at") != job.get("updated_at"):
+                # Touched while we were packing; try again next sweep.
+                dst.unlink(missing_ok=True)
+                continue
+            summary = {k: current[k] for k in _SUMMARY_FIELDS if k in current}
+            progress = current.get("progress")
+            if isinstance(progress, dict):
+                summary["progress"] = {k: progress.get(k) for k in ("events", "tool_calls", "usage")}
+            summary["archive"] = {
+                "path": str(dst),
+                "bytes": packed,
+                "original_bytes": original,
+                "archived_at": now_iso(),
+                "reason": chosen[jid],
+            }
+            self.codex.index.upsert(summary)
+            await loop.run_in_executor(None, lambda: shutil.rmtree(self.codex.job_dir(jid), ignore_errors=True))
+            archived.append({"id": jid, "reason": chosen[jid], "bytes": packed, "original_bytes": original})
+
+        purged = 0
+        if self.policy.purge_after_s:
+            for job in rows:
+                arch = job.get("archive")
+                archived_at = parse_iso(arch.get("archived_at")) if isinstance(arch, dict) else None
+                if archived_at is None or now - archived_at <= self.policy.purge_after_s:
+                    continue
+                Path(arch["path"]).unlink(missing_ok=True)
+                self.codex.index.remove(str(job["id"]))
+                purged += 1
+
+        self.last_sweep = {
+            "at": now_iso(),
+            "took_ms": round((time.monotonic() - started) * 1000, 2),
+            "live_jobs": len(live) - len(archived),
+            "live_bytes": sum(sizes.values()) - sum(a["original_bytes"] for a in archived),
+            "archived": len(archived),
+            "archived_bytes": sum(a["bytes"] for a in archived),
+            "freed_bytes": sum(a["original_bytes"] for a in archived),
+            "purged": purged,
+            "pending": max(0, len(chosen) - len(archived) - len(errors)),
+            "errors": errors[:20],
+        }
+        return self.last_sweep
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "policy": self.policy.to_dict(),
+            "archive_root": str(self.archive_root),
+            "last_sweep": self.last_sweep,
+        }
+
+
+def codex_retention_from_env(codex: CodexJobManager, archive_root: Path) -> CodexRetention:
+    def _num(key: str, default: float) -> float:
+        try:
+            return float(os.environ.get(key, str(default)).strip())
+        except Exception:
+            return default
+
+    policy = RetentionPolicy(
+        archive_after_s=_num("AUTOAPPDEV_CODEX_ARCHIVE_AFTER_DAYS", 7) * 86400,
+        keep_per_tool=int(_num("AUTOAPPDEV_CODEX_KEEP_JOBS", 200)),
+        keep_per_session=int(_num("AUTOAPPDEV_CODEX_KEEP_PER_SESSION", 50)),
+        max_live_bytes=int(_num("AUTOAPPDEV_CODEX_LIVE_MB", 1024) * 1024 * 1024),
+        purge_after_s=_num("AUTOAPPDEV_CODEX_PURGE_DAYS", 0) * 86400,
+    )
+    return CodexRetention(codex, archive_root=archive_root, policy=policy)
@@ -0,0 +1,251 @@
+import asyncio
+import collections
+import statistics
+import time
+from typing import Any, Awaitable, Callable
+
+
+PRIORITIES = ("interactive", "normal", "background")
+
+
+class _Entry:
+    __slots__ = ("job_id", "tool", "session_id", "priority", "enqueued", "future")
+
+    def __init__(self, job_id: str, tool: str, session_id: str, priority: str, future: "asyncio.Future[Any]"):
+        self.job_id = job_id
+        self.tool = tool
+        self.session_id = session_id
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.future = future
+
+
+class _Lane:
+    """Jobs of one priority: FIFO per session, round-robin across sessions."""
+
+    def __init__(self) -> None:
+        self.sessions: "collections.OrderedDict[str, collections.deque[_Entry]]" = collections.OrderedDict()
+        self.size = 0
+
+    def push(self, entry: _Entry) -> None:
+        self.sessions.setdefault(entry.session_id, collections.deque()).append(entry)
+        self.size += 1
+
+    def pop(self) -> _Entry:
+        sid, q = next(iter(self.sessions.items()))
+        entry = q.popleft()
+        # The session goes to the back of the rotation (or away if drained).
+        del self.sessions[sid]
+        if q:
+            self.sessions[sid] = q
+        self.size -= 1
+        return entry
+
+    def order(self) -> list[_Entry]:
+        queues = [list(q) for q in self.sessions.values()]
+        out: list[_Entry] = []
+        depth = 0
+        while True:
+            row = [q[depth] for q in queues if depth < len(q)]
+            if not row:
+                return out
+            out.extend(row)
+            depth += 1
+
+
+class _ToolQueue:
+    def __init__(self, workers: int):
+        self.workers = max(1, int(workers))
+        self.lanes = {p: _Lane() for p in PRIORITIES}
+        self.running: dict[str, _Entry] = {}
+        self.completed = 0
+        self.waits: collections.deque[float] = collections.deque(maxlen=500)
+        self.runs: collections.deque[float] = collections.deque(maxlen=500)
+
+    def head(self) -> tuple[int, float] | None:
+        """(priority rank, enqueue time) of the entry next() would return."""
+        for rank, p in enumerate(PRIORITIES):
+            lane = self.lanes[p]
+            if lane.size:
+                return rank, next(iter(lane.sessions.values()))[0].enqueued
+        return None
+
+    def next(self) -> _Entry | None:
+        for p in PRIORITIES:
+            lane = self.lanes[p]
+            if lane.size:
+                return lane.pop()
+        return None
+
+    def order(self) -> list[_Entry]:
+        out: list[_Entry] = []
+        for p in PRIORITIES:
+            out.extend(self.lanes[p].order())
+        return out
+
+
+def _percentiles(samples: collections.deque[float]) -> dict[str, float | None]:
+    if not samples:
+        return {"p50": None, "p95": None, "max": None}
+    data = sorted(samples)
+    if len(data) == 1:
+        return {"p50": round(data[0], 3), "p95": round(data[0], 3), "max": round(data[0], 3)}
+    q = statistics.quantiles(data, n=20, method="inclusive")
+    return {"p50": round(statistics.median(data), 3), "p95": round(q[18], 3), "max": round(data[-1], 3)}
+
+
+class CodexScheduler:
+    """Bounded-concurrency dispatcher for Codex jobs.
+
+    Each tool has its own worker limit. Within a tool, jobs are taken from the
+    highest priority class first (interactive > normal > background); within
+    a class, sessions are served round-robin and each session is FIFO, so one
+    chatty session cannot starve the others.
+
+    Across tools, `max_workers` bounds all tools together (default: the sum
+    of the per-tool limits) and a freed slot goes to the highest-priority
+    head among the tools that still have room, oldest first on ties. The last
+    `interactive_reserve` of those slots only go to interactive jobs, so
+    normal and background work of every tool together cannot occupy all of
+    them and an interactive reply starts as soon as its own tool has room.
+    `max_workers` of 0 disables the shared limit (and the reservation).
+    """
+
+    def __init__(
+        self,
+        *,
+        run: Callable[[str, float], Awaitable[dict[str, Any]]],
+        workers: dict[str, int],
+        max_workers: int | None = None,
+        interactive_reserve: int = 1,
+    ):
+        self._run = run
+        self._tools = {tool: _ToolQueue(n) for tool, n in workers.items()}
+        if max_workers is None:
+            max_workers = sum(q.workers for q in self._tools.values())
+        self.max_workers = max(0, int(max_workers))
+        # At least one slot stays open to non-interactive work.
+        self.interactive_reserve = max(0, min(int(interactive_reserve), self.max_workers - 1))
+        self._entries: dict[str, _Entry] = {}
+
+    def _queue(self, tool: str) -> _ToolQueue:
+        q = self._tools.get(tool)
+        if q is None:
+            q = self._tools[tool] = _ToolQueue(1)
+        return q
+
+    def submit(self, job_id: str, *, tool: str, session_id: str = "", priority: str = "normal") -> "asyncio.Future[Any]":
+        """Queue a job; the returned future resolves with run()'s result. Idempotent per job id."""
+        existing = self._entries.get(job_id)
+        if existing is not None:
+            return existing.future
+        fut: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        entry = _Entry(job_id, tool, session_id, priority if priority in PRIORITIES else "normal", fut)
+        self._entries[job_id] = entry
+        q = self._queue(tool)
+        q.lanes[entry.priority].push(entry)
+        self._pump()
+        return fut
+
+    def _running(self) -> int:
+        return sum(len(q.running) for q in self._tools.values())
+
+    def _pump(self) -> None:
+        while True:
+            running = self._running()
+            if self.max_workers and running >= self.max_workers:
+                return
+            shared = not self.max_workers or running < self.max_workers - self.interactive_reserve
+            best: tuple[tuple[int, float], _ToolQueue] | None = None
+            for q in self._tools.values():
+                if len(q.running) >= q.workers:
+                    continue
+                head = q.head()
+                if head is None or (head[0] > 0 and not shared):
+                    # Only interactive jobs may take the reserved slots.
+                    continue
+                if best is None or head < best[0]:
+                    best = (head, q)
+            if best is None:
+                return
+            q = best[1]
+            entry = q.next()
+            assert entry is not None
+            q.running[entry.job_id] = entry
+            waited = time.monotonic() - entry.enqueued
+            q.waits.append(waited)
+            asyncio.ensure_future(self._execute(q, entry, waited))
+
+    async def _execute(self, q: _ToolQueue, entry: _Entry, waited: float) -> None:
+        started = time.monotonic()
+        try:
+            result = await self._run(entry.job_id, waited)
+        except asyncio.CancelledError:
+            entry.future.cancel()
+            raise
+        except Exception as exc:
+            if not entry.future.done():
+                entry.future.set_exception(exc)
+                # Mark it retrieved so an unawaited future does not log a warning.
+                entry.future.exception()
+        else:
+            if not entry.future.done():
+                entry.future.set_result(result)
+        finally:
+            q.runs.append(time.monotonic() - started)
+            q.completed += 1
+            q.running.pop(entry.job_id, None)
+            self._entries.pop(entry.job_id, None)
+            self._pump()
+
+    def tracks(self, job_id: str) -> bool:
+        """True while the job is queued or running here."""
+        return job_id in self._entries
+
+    def queue_info(self, job_id: str) -> dict[str, Any] | None:
+        """Where a job currently is: running, or queued with a 1-based position within its tool."""
+        entry = self._entries.get(job_id)
+        if entry is None:
+            return None
+        q = self._queue(entry.tool)
+        info: dict[str, Any] = {"tool": entry.tool, "priority": entry.priority}
+        if job_id in q.running:
+            info["state"] = "running"
+            return info
+        position = next((i for i, e in enumerate(q.order(), start=1) if e.job_id == job_id), None)
+        info.update(
+            {
+                "state": "queued",
+                "position": position,
+                "waited_seconds": round(time.monotonic() - entry.enqueued, 2),
+            }
+        )
+        return info
+
+    def stats(self, *, include_jobs: int = 50) -> dict[str, Any]:
+        now = time.monotonic()
+        tools: dict[str, Any] = {}
+        for tool, q in self._tools.items():
+            order = q.order()
+            tools[tool] = {
+                "workers": q.workers,
+                "running": len(q.running),
+                "queued": len(order),
+                "queued_by_priority": {p: q.lanes[p].size for p in PRIORITIES},
+                "oldest_wait_seconds": round(max((now - e.enqueued for e in order), default=0.0), 2),
+                "completed": q.completed,
+                "wait_seconds": _percentiles(q.waits),
+                "run_seconds": _percentiles(q.runs),
+                "jobs": [
+                    {
+                        "id": e.job_id,
+                        "session_id": e.session_id,
+                        "priority": e.priority,
+                        "position": i,
+                        "waited_seconds": round(now - e.enqueued, 2),
+                    }
+                    for i, e in enumerate(order[: max(0, include_jobs)], start=1)
+                ],
+                "running_jobs": [e.job_id for e in q.running.values()],
+            }
+        return {"tools": tools, "priorities": list(PRIORITIES), "max_workers": self.max_workers, "interactive_reserve": self.interactive_reserve, "running": self._running()}
@@ -0,0 +1,308 @@
+import asyncio
+import json
+import os
+import signal
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+
+_CHUNK_BYTES = 64 * 1024
+# Longest single JSONL event we parse; longer lines still reach the log file.
+_MAX_LINE_BYTES = 1024 * 1024
+_AGENT_MESSAGE_TYPES = {"agent_message", "assistant_message"}
+_TOOL_ITEM_TYPES = {"command_execution", "mcp_tool_call", "file_change", "web_search", "tool_call"}
+
+
+class CodexProgress:
+    """Running summary of a `codex exec --json` event stream, fed line by line."""
+
+    def __init__(self) -> None:
+        self.events = 0
+        self.tool_calls = 0
+        self.last_agent_message = ""
+        self.last_event_type = ""
+        self.last_tool = ""
+        self.usage: dict[str, Any] | None = None
+        self.stdout_bytes = 0
+        self.stderr_bytes = 0
+        self._tool_ids: set[str] = set()
+
+    def feed_line(self, raw: bytes | str) -> None:
+        raw = raw.strip()
+        if not raw:
+            return
+        try:
+            obj = json.loads(raw)
+        except Exception:
+            return
+        if not isinstance(obj, dict):
+            return
+        self.events += 1
+        etype = str(obj.get("type") or "")
+        self.last_event_type = etype
+        item = obj.get("item")
+        if isinstance(item, dict):
+            itype = item.get("type")
+            txt = item.get("text")
+            if itype in _AGENT_MESSAGE_TYPES and isinstance(txt, str) and txt:
+                self.last_agent_message = txt
+            elif itype in _TOOL_ITEM_TYPES:
+                # Items are reported when started and again when completed; count each once.
+                iid = str(item.get("id") or "")
+                if not iid or iid not in self._tool_ids:
+                    if iid:
+                        self._tool_ids.add(iid)
+                    self.tool_calls += 1
+                label = item.get("command") or item.get("tool") or item.get("query") or itype
+                self.last_tool = str(label)[:200]
+            return
+        txt = obj.get("text")
+        if etype in _AGENT_MESSAGE_TYPES and isinstance(txt, str) and txt:
+            self.last_agent_message = txt
+        if etype == "turn.completed" and isinstance(obj.get("usage"), dict):
+            self.usage = obj["usage"]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "events": self.events,
+            "tool_calls": self.tool_calls,
+            "last_tool": self.last_tool,
+            "last_event_type": self.last_event_type,
+            "last_agent_message": self.last_agent_message[-2000:],
+            "usage": self.usage,
+            "stdout_bytes": self.stdout_bytes,
+            "stderr_bytes": self.stderr_bytes,
+        }
+
+
+class CodexOutputFollower:
+    """Reads what a Codex child appended to its log files since the last poll.
+
+    The child writes stdout/stderr straight to files (not pipes), so it keeps
+    running if the backend restarts; whoever owns the job follows the files.
+    Reads are fixed-size chunks and only the trailing partial line is kept.
+    """
+
+    def __init__(self, stdout_path: Path, stderr_path: Path, progress: CodexProgress | None = None):
+        self.stdout_path = stdout_path
+        self.stderr_path = stderr_path
+        self.progress = progress or CodexProgress()
+        self._offset = 0
+        self._partial = b""
+        self._overflow = False
+
+    def poll(self) -> bool:
+        """Parse newly appended stdout; returns True if anything changed."""
+        changed = False
+        try:
+            with self.stdout_path.open("rb") as f:
+                f.seek(self._offset)
+                while True:
+                    chunk = f.read(_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    changed = True
+                    self._offset += len(chunk)
+                    lines = (self._partial + chunk).split(b"\n")
+                    self._partial = lines.pop()
+                    for ln in lines:
+                        if self._overflow:
+                            # Tail end of an oversized line; resume at the next one.
+                            self._overflow = False
+                            continue
+                        self.progress.feed_line(ln)
+                    if len(self._partial) > _MAX_LINE_BYTES:
+                        self._partial = b""
+                        self._overflow = True
+        except FileNotFoundError:
+            pass
+        self.progress.stdout_bytes = self._offset
+        try:
+            err_bytes = self.stderr_path.stat().st_size
+        except OSError:
+            err_bytes = 0
+        if err_bytes != self.progress.stderr_bytes:
+            self.progress.stderr_bytes = err_bytes
+            changed = True
+        return changed
+
+    def finish(self) -> CodexProgress:
+        self.poll()
+        if self._partial and not self._overflow:
+            self.progress.feed_line(self._partial)
+        self._partial = b""
+        return self.progress
+
+
+class _Ticker:
+    def __init__(
+        self,
+        on_progress: Callable[[CodexProgress], None] | None,
+        progress_interval_s: float,
+        heartbeat_interval_s: float,
+    ):
+        self.on_progress = on_progress
+        self.progress_interval_s = progress_interval_s
+        self.heartbeat_interval_s = heartbeat_interval_s
+        self._last = 0.0
+
+    def __call__(self, progress: CodexProgress, changed: bool) -> None:
+        if self.on_progress is None:
+            return
+        since = time.monotonic() - self._last
+        # Report changes at most every progress interval; report anyway as a heartbeat.
+        if (changed and since >= self.progress_interval_s) or since >= self.heartbeat_interval_s:
+            self._last = time.monotonic()
+            self.on_progress(progress)
+
+
+def kill_process_group(pgid: int) -> None:
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def probe_process(pid: int, pgid: int | None = None) -> tuple[bool, int | None]:
+    """Return (alive, returncode) for a Codex child recorded on a job.
+
+    Reaps the process if it is our (zombie) child, e.g. across an in-place
+    autoreload exec; for other processes the return code is unknown.
+    """
+    try:
+        wpid, status = os.waitpid(pid, os.WNOHANG)
+    except ChildProcessError:
+        pass
+    else:
+        if wpid == pid:
+            return False, os.waitstatus_to_exitcode(status)
+        return True, None
+    try:
+        os.kill(pid, 0)
+        if pgid is not None and os.getpgid(pid) != pgid:
+            # The pid was reused by an unrelated process.
+            return False, None
+    except (ProcessLookupError, PermissionError):
+        return False, None
+    return True, None
+
+
+async def stream_codex_exec(
+    cmd: list[str],
+    *,
+    cwd: Path,
+    stdin_data: bytes,
+    stdout_path: Path,
+    stderr_path: Path,
+    timeout_s: float,
+    on_progress: Callable[[CodexProgress], None] | None = None,
+    on_spawn: Callable[[int], None] | None = None,
+    progress_interval_s: float = 2.0,
+    heartbeat_interval_s: float = 10.0,
+    poll_interval_s: float = 0.25,
+    detach: bool = True,
+) -> tuple[int, CodexProgress]:
+    """Run `codex exec --json` with stdout/stderr appended directly to files.
+
+    The child gets its own session (pgid == pid) and file descriptors, so it
+    survives a backend restart and can be re-attached by pid. stdout is
+    followed as JSONL into a CodexProgress without buffering it in memory;
+    `on_progress` fires when it changes (at most every `progress_interval_s`)
+    and at least every `heartbeat_interval_s`. On timeout the whole process
+    group is killed and asyncio.TimeoutError raised. Cancelling the caller
+    leaves the child running unless `detach` is False, in which case the
+    process group is killed too (for callers that cannot re-attach).
+    """
+    stdout_path.parent.mkdir(parents=True, exist_ok=True)
+    stderr_path.parent.mkdir(parents=True, exist_ok=True)
+    follower = CodexOutputFollower(stdout_path, stderr_path)
+    tick = _Ticker(on_progress, progress_interval_s, heartbeat_interval_s)
+
+    with stdout_path.open("ab") as out_f, stderr_path.open("ab") as err_f:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=str(cwd),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=out_f,
+            stderr=err_f,
+            env=os.environ.copy(),
+            start_new_session=True,
+        )
+    if on_spawn is not None:
+        on_spawn(proc.pid)
+
+    assert proc.stdin is not None
+    try:
+        proc.stdin.write(stdin_data)
+        await proc.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        proc.stdin.close()
+
+    deadline = time.monotonic() + timeout_s
+    waiter = asyncio.ensure_future(proc.wait())
+    try:
+        while True:
+            await asyncio.wait({waiter}, timeout=poll_interval_s)
+            tick(follower.progress, follower.poll())
+            if waiter.done():
+                break
+            if time.monotonic() >= deadline:
+                kill_process_group(proc.pid)
+                await waiter
+                follower.finish()
+                raise asyncio.TimeoutError()
+    except BaseException:
+        if not detach and proc.returncode is None:
+            kill_process_group(proc.pid)
+        raise
+    finally:
+        if not waiter.done():
+            waiter.cancel()
+    return int(proc.returncode or 0), follower.finish()
+
+
+async def watch_codex_process(
+    pid: int,
+    pgid: int,
+    *,
+    follower: CodexOutputFollower,
+    deadline: float,
+    on_progress: Callable[[CodexProgress], None] | None = None,
+    progress_interval_s: float = 2.0,
+    heartbeat_interval_s: float = 10.0,
+    poll_interval_s: float = 1.0,
+) -> tuple[int | None, CodexProgress]:
+    """Follow a re-attached Codex child (not spawned by this process) until it exits.
+
+    `deadline` is a time.time() timestamp; past it the process group is killed
+    and asyncio.TimeoutError raised. The return code is None unless the
+    process could be reaped as our own child.
+    """
+    tick = _Ticker(on_progress, progress_interval_s, heartbeat_interval_s)
+    while True:
+        alive, rc = probe_process(pid, pgid)
+        tick(follower.progress, follower.poll())
+        if not alive:
+            return rc, follower.finish()
+        if time.time() >= deadline:
+            kill_process_group(pgid)
+            follower.finish()
+            raise asyncio.TimeoutError()
+        await asyncio.sleep(poll_interval_s)
+
+
+def read_tail_text(path: Path, max_chars: int = 8000) -> str:
+    """Last `max_chars` characters of a text file, reading only the end of it."""
+    try:
+        with path.open("rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # UTF-8 is at most 4 bytes per character.
+            start = max(0, size - max_chars * 4)
+            f.seek(start)
+            data = f.read()
+    except Exception:
+        return ""
+    return data.decode("utf-8", errors="replace")[-max_chars:]
@@ -0,0 +1,72 @@
+import asyncio
+import datetime
+import itertools
+from collections import deque
+from typing import Any
+
+
+class EventHub:
+    """In-process fan-out of backend change events for `GET /api/events`.
+
+    Events carry monotonically increasing ids so SSE clients can resume from
+    `Last-Event-ID` after a reconnect. All parked streams share one
+    asyncio.Event that is swapped on publish, so idle subscribers cost nothing.
+    """
+
+    def __init__(self, max_events: int = 10_000):
+        self._max_events = max(100, int(max_events))
+        self._items: deque[dict[str, Any]] = deque(maxlen=self._max_events)
+        self._next_id = 1
+        self._changed: asyncio.Event | None = None
+
+    def publish(self, kind: str, data: dict[str, Any]) -> int:
+        eid = self._next_id
+        self._next_id += 1
+        self._items.append(
+            {
+                "id": eid,
+                "ts": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "type": str(kind),
+                "data": data,
+            }
+        )
+        ev = self._changed
+        if ev is not None:
+            self._changed = None
+            ev.set()
+        return eid
+
+    def latest_id(self) -> int:
+        return self._next_id - 1
+
+    def oldest_id(self) -> int:
+        return int(self._items[0]["id"]) if self._items else self._next_id
+
+    def since(self, *, since_id: int, limit: int = 500) -> list[dict[str, Any]]:
+        if not self._items:
+            return []
+        # Ids are contiguous inside the ring, so the cursor maps to an offset directly.
+        start = max(0, int(since_id) + 1 - self.oldest_id())
+        if start >= len(self._items):
+            return []
+        return list(itertools.islice(self._items, start, start + max(1, int(limit))))
+
+    def missed(self, since_id: int) -> bool:
+        """True when the cursor cannot be resumed: events after `since_id` were
+        already evicted from the ring, or `since_id` is ahead of the newest id
+        (a client reconnecting after a backend restart reset the ids)."""
+        if int(since_id) > self.latest_id():
+            return True
+        return bool(self._items) and int(since_id) + 1 < self.oldest_id()
+
+    async def wait(self, *, since_id: int, timeout_s: float) -> bool:
+        """Wait until there is something for `since_id`; True at once if the cursor is ahead (see missed())."""
+        if self.latest_id() != since_id:
+            return True
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=max(0.0, timeout_s))
+        except asyncio.TimeoutError:
+            return False
+        return self.latest_id() != since_id
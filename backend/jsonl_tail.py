@@ -0,0 +1,148 @@
+import os
+import struct
+from pathlib import Path
+from typing import Callable
+
+_CHUNK_BYTES = 64 * 1024
+_OFFSET = struct.Struct(">Q")
+
+
+def read_tail_lines(path: Path, n: int, *, end: int | None = None) -> list[bytes]:
+    """Last `n` non-empty lines of a file (ending before byte `end`), oldest first.
+
+    Reads backwards in fixed-size chunks, so the cost depends on the size of
+    those lines, not of the file.
+    """
+    if n <= 0:
+        return []
+    try:
+        f = path.open("rb")
+    except FileNotFoundError:
+        return []
+    lines: list[bytes] = []
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        pos = size if end is None else max(0, min(end, size))
+        carry = b""
+        while pos > 0 and len(lines) < n:
+            step = min(_CHUNK_BYTES, pos)
+            pos -= step
+            f.seek(pos)
+            parts = (f.read(step) + carry).split(b"\n")
+            # parts[0] may continue in the previous chunk.
+            carry = parts[0]
+            for ln in reversed(parts[1:]):
+                if ln.strip():
+                    lines.append(ln)
+                    if len(lines) >= n:
+                        break
+        if pos == 0 and len(lines) < n and carry.strip():
+            lines.append(carry)
+    lines.reverse()
+    return lines
+
+
+class JsonlOffsetIndex:
+    """Sidecar of fixed-width (8-byte) start offsets, one per non-empty line of a JSONL file.
+
+    Line i starts at offset(i), so any range of lines is one seek and one
+    read. `append` is called by the writer after each line; `sync` catches
+    the sidecar up with lines it missed (a crash between the two writes, or a
+    file written before the sidecar existed) and rebuilds it if it does not
+    line up with the data file.
+    """
+
+    def __init__(self, data_path: Path, index_path: Path):
+        self.data_path = data_path
+        self.index_path = index_path
+
+    def exists(self) -> bool:
+        return self.index_path.exists()
+
+    def append(self, offset: int) -> None:
+        with self.index_path.open("ab") as f:
+            f.write(_OFFSET.pack(offset))
+
+    def count(self) -> int:
+        try:
+            return self.index_path.stat().st_size // _OFFSET.size
+        except FileNotFoundError:
+            return 0
+
+    def offsets(self, lo: int, hi: int) -> list[int]:
+        """Offsets of lines [lo, hi)."""
+        lo, hi = max(0, lo), min(hi, self.count())
+        if lo >= hi:
+            return []
+        with self.index_path.open("rb") as f:
+            f.seek(lo * _OFFSET.size)
+            data = f.read((hi - lo) * _OFFSET.size)
+        return [v for (v,) in _OFFSET.iter_unpack(data)]
+
+    def sync(self) -> int:
+        """Make the sidecar cover the whole data file; returns the line count."""
+        try:
+            size = self.data_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+        n = self.count()
+        start = 0
+        keep = 0
+        if n:
+            last = self.offsets(n - 1, n)[0]
+            if last < size and (last == 0 or self._byte_at(last - 1) == b"\n"):
+                # Resume after the last indexed line.
+                start, keep = last, n
+        new: list[int] = []
+        with self.data_path.open("rb") as f:
+            f.seek(start)
+            pos = start
+            first = keep > 0
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                if first:
+                    first = False
+                elif line.strip():
+                    new.append(pos)
+                pos += len(line)
+        if keep and not new and self.index_path.stat().st_size == keep * _OFFSET.size:
+            return keep
+        with self.index_path.open("r+b" if keep else "wb") as f:
+            # Also drops a torn trailing record, which would misalign later appends.
+            f.truncate(keep * _OFFSET.size)
+            f.seek(keep * _OFFSET.size)
+            f.write(b"".join(_OFFSET.pack(o) for o in new))
+        return keep + len(new)
+
+    def _byte_at(self, pos: int) -> bytes:
+        with self.data_path.open("rb") as f:
+            f.seek(pos)
+            return f.read(1)
+
+    def read_lines(self, lo: int, hi: int) -> list[bytes]:
+        """Lines [lo, hi) in one read."""
+        offs = self.offsets(lo, hi + 1)
+        if not offs:
+            return []
+        with self.data_path.open("rb") as f:
+            f.seek(offs[0])
+            if len(offs) > hi - lo:
+                data = f.read(offs[-1] - offs[0])
+            else:
+                data = f.read()
+        return [ln for ln in data.split(b"\n") if ln.strip()][: hi - lo]
+
+    def bisect(self, n: int, key: Callable[[bytes], str], target: str) -> int:
+        """First line index in [0, n) whose key is >= target (keys must be non-decreasing)."""
+        lo, hi = 0, n
+        with self.data_path.open("rb") as f:
+            while lo < hi:
+                mid = (lo + hi) // 2
+                f.seek(self.offsets(mid, mid + 1)[0])
+                if key(f.readline()) < target:
+                    lo = mid + 1
+                else:
+                    hi = mid
+        return lo
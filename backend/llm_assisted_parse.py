@@ -2,13 +2,14 @@ import asyncio
 import datetime
 import hashlib
 import json
-import os
 import re
 import shutil
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+from .codex_stream import read_tail_text, stream_codex_exec
+from .prompt_templates import PromptTemplate
 
 _CODE_FENCE_RE = re.compile(r"^\s*```")
 
@@ -31,22 +32,28 @@ def make_request_id(*, source_text: str) -> str:
     return f"{ts}_{_sha256_text(source_text)[:8]}"
 
 
-def build_prompt(*, source_text: str, source_format: str = "unknown") -> str:
+# Static instructions first, so every parse request shares the same prompt prefix.
+PARSE_PROMPT = PromptTemplate(
+    "parse_llm_aaps_v1",
     # Guardrails: do not run tools/commands; output only deterministic AAPS text.
-    return (
-        "You are a deterministic converter.\n"
-        "Convert the input into AutoAppDev formatted pipeline script (AAPS v1).\n"
-        "\n"
-        "Hard rules:\n"
-        "- Do NOT run shell commands.\n"
-        "- Do NOT read or write any files.\n"
-        "- Output ONLY the AAPS v1 text (no markdown, no code fences, no commentary).\n"
-        "- The first non-comment line MUST be: AUTOAPPDEV_PIPELINE 1\n"
-        "- Use only these STEP.block values: plan, work, debug, fix, summary, commit_push\n"
-        "- Prefer ACTION.kind=\"note\" with params.text summarizing what would happen.\n"
-        "- Use stable ids: task id \"t1\"; step ids \"s1\", \"s2\"...; action ids \"a1\".\n"
-        "- Keep it minimal and safe: do not invent destructive commands.\n"
-        "\n"
+    "You are a deterministic converter.\n"
+    "Convert the input into AutoAppDev formatted pipeline script (AAPS v1).\n"
+    "\n"
+    "Hard rules:\n"
+    "- Do NOT run shell commands.\n"
+    "- Do NOT read or write any files.\n"
+    "- Output ONLY the AAPS v1 text (no markdown, no code fences, no commentary).\n"
+    "- The first non-comment line MUST be: AUTOAPPDEV_PIPELINE 1\n"
+    "- Use only these STEP.block values: plan, work, debug, fix, summary, commit_push\n"
+    "- Prefer ACTION.kind=\"note\" with params.text summarizing what would happen.\n"
+    "- Use stable ids: task id \"t1\"; step ids \"s1\", \"s2\"...; action ids \"a1\".\n"
+    "- Keep it minimal and safe: do not invent destructive commands.\n"
+    "\n",
+)
+
+
+def build_prompt(*, source_text: str, source_format: str = "unknown") -> str:
+    return PARSE_PROMPT.render(
         f"Input format hint: {source_format}\n"
         "\n"
         "INPUT BEGIN\n"
@@ -87,33 +94,6 @@ def extract_aaps(text: str) -> tuple[str, list[str]]:
     raise LlmParseError("missing_aaps_header", "expected AAPS header: AUTOAPPDEV_PIPELINE 1")
 
 
-def _extract_last_agent_text(jsonl_text: str) -> str:
-    last = ""
-    for raw in jsonl_text.splitlines():
-        raw = raw.strip()
-        if not raw:
-            continue
-        try:
-            obj = json.loads(raw)
-        except Exception:
-            continue
-        if not isinstance(obj, dict):
-            continue
-        item = obj.get("item")
-        if isinstance(item, dict):
-            t = item.get("type")
-            txt = item.get("text")
-            if t in ("agent_message", "assistant_message") and isinstance(txt, str) and txt:
-                last = txt
-                continue
-        t2 = obj.get("type")
-        txt2 = obj.get("text")
-        if t2 in ("agent_message", "assistant_message") and isinstance(txt2, str) and txt2:
-            last = txt2
-            continue
-    return last
-
-
 async def run_codex_to_jsonl(
     *,
     prompt: str,
@@ -121,9 +101,15 @@ async def run_codex_to_jsonl(
     reasoning: str,
     timeout_s: float,
     cwd: Path,
+    jsonl_path: Path,
+    stderr_path: Path,
     skip_git_check: bool = False,
-) -> tuple[str, str, str, int]:
-    """Run Codex non-interactively and return (assistant_text, jsonl_text, stderr_text, exit_code)."""
+) -> tuple[str, str, int]:
+    """Run Codex non-interactively and return (assistant_text, stderr_tail, exit_code).
+
+    The JSONL event stream and stderr are streamed to `jsonl_path`/`stderr_path`
+    as they arrive rather than held in memory.
+    """
 
     if not shutil.which("codex"):
         raise LlmParseError("codex_not_found", "codex not found on PATH")
@@ -141,34 +127,23 @@ async def run_codex_to_jsonl(
         cmd.append("--skip-git-repo-check")
     cmd.append("-")
 
-    proc = await asyncio.create_subprocess_exec(
-        *cmd,
-        cwd=str(cwd),
-        stdin=asyncio.subprocess.PIPE,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-        env=os.environ.copy(),
-    )
-
+    for path in (jsonl_path, stderr_path):
+        path.unlink(missing_ok=True)
     try:
-        out_b, err_b = await asyncio.wait_for(proc.communicate(prompt.encode("utf-8")), timeout=timeout_s)
+        rc, progress = await stream_codex_exec(
+            cmd,
+            cwd=cwd,
+            stdin_data=prompt.encode("utf-8"),
+            stdout_path=jsonl_path,
+            stderr_path=stderr_path,
+            timeout_s=timeout_s,
+            # Nothing re-attaches a parse-llm run, so a cancelled request must not leave codex running.
+            detach=False,
+        )
     except asyncio.TimeoutError as e:
-        try:
-            proc.kill()
-        except Exception:
-            pass
-        try:
-            await proc.wait()
-        except Exception:
-            pass
         raise LlmParseError("timeout", f"codex exec exceeded timeout_s={timeout_s}") from e
 
-    jsonl_text = out_b.decode("utf-8", errors="replace")
-    stderr_text = err_b.decode("utf-8", errors="replace")
-    rc = int(proc.returncode or 0)
-
-    assistant_text = _extract_last_agent_text(jsonl_text) or ""
-    return assistant_text, jsonl_text, stderr_text, rc
+    return progress.last_agent_message, read_tail_text(stderr_path, 4000), rc
 
 
 def write_artifacts(
@@ -176,12 +151,13 @@ def write_artifacts(
     artifacts_dir: Path,
     source_text: str,
     prompt: str,
-    codex_jsonl: str,
+    codex_jsonl: str | None,
     assistant_text: str,
     script_text: str | None,
     provenance: dict[str, Any],
-    codex_stderr: str = "",
+    codex_stderr: str | None = "",
 ) -> dict[str, str]:
+    """Write the request artifacts; `codex_jsonl`/`codex_stderr` of None means already streamed there."""
     artifacts_dir.mkdir(parents=True, exist_ok=True)
 
     source_path = artifacts_dir / "source.txt"
@@ -194,8 +170,14 @@ def write_artifacts(
 
     source_path.write_text(source_text, "utf-8")
     prompt_path.write_text(prompt, "utf-8")
-    jsonl_path.write_text(codex_jsonl, "utf-8")
-    stderr_path.write_text(codex_stderr or "", "utf-8")
+    if codex_jsonl is not None:
+        jsonl_path.write_text(codex_jsonl, "utf-8")
+    elif not jsonl_path.exists():
+        jsonl_path.write_text("", "utf-8")
+    if codex_stderr is not None:
+        stderr_path.write_text(codex_stderr, "utf-8")
+    elif not stderr_path.exists():
+        stderr_path.write_text("", "utf-8")
     assistant_path.write_text(assistant_text, "utf-8")
     if script_text is not None:
         aaps_path.write_text(script_text, "utf-8")
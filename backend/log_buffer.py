@@ -0,0 +1,114 @@
+import asyncio
+import bisect
+import datetime
+from typing import Any, Callable
+
+
+class _Ring:
+    """Bounded append-only run of log entries with sorted ids.
+
+    Backed by plain lists plus a moving head so `since()` can bisect the ids;
+    evicted slots are compacted in bulk, which keeps append amortized O(1).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ids: list[int] = []
+        self.items: list[dict[str, Any]] = []
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.ids) - self.head
+
+    def append(self, lid: int, entry: dict[str, Any]) -> None:
+        self.ids.append(lid)
+        self.items.append(entry)
+        if len(self.ids) - self.head > self.capacity:
+            self.head += 1
+            if self.head >= self.capacity:
+                del self.ids[: self.head]
+                del self.items[: self.head]
+                self.head = 0
+
+    def since(self, since_id: int, limit: int) -> list[dict[str, Any]]:
+        i = bisect.bisect_right(self.ids, since_id, lo=self.head)
+        return self.items[i : i + limit]
+
+    def latest_id(self) -> int:
+        return self.ids[-1] if len(self.ids) > self.head else 0
+
+
+class LogBuffer:
+    """In-memory log window behind `GET /api/logs`.
+
+    Entries get one global, monotonically increasing id. Each source keeps its
+    own ring (plus one ring for the unfiltered view), so cursor lookups are a
+    bisect and `latest_id()` is O(1) regardless of capacity.
+    """
+
+    def __init__(self, max_entries: int = 2000):
+        self._max_entries = max(100, int(max_entries))
+        self._all = _Ring(self._max_entries)
+        self._by_source: dict[str, _Ring] = {}
+        self._next_id = 1
+        self._listeners: list[Callable[[dict[str, Any]], None]] = []
+        # Shared by all parked long-poll requests; swapped out on each append.
+        self._changed: asyncio.Event | None = None
+
+    def add_listener(self, fn: Callable[[dict[str, Any]], None]) -> None:
+        self._listeners.append(fn)
+
+    def append(self, *, source: str, line: str) -> int:
+        lid = self._next_id
+        self._next_id += 1
+        entry = {
+            "id": lid,
+            "ts": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "source": source,
+            "line": line,
+        }
+        self._all.append(lid, entry)
+        ring = self._by_source.get(source)
+        if ring is None:
+            ring = self._by_source[source] = _Ring(self._max_entries)
+        ring.append(lid, entry)
+        ev = self._changed
+        if ev is not None:
+            self._changed = None
+            ev.set()
+        for fn in self._listeners:
+            try:
+                fn(entry)
+            except Exception:
+                pass
+        return lid
+
+    def _ring(self, source: str | None) -> _Ring | None:
+        return self._by_source.get(source) if source else self._all
+
+    def since(self, *, since_id: int, limit: int, source: str | None = None) -> list[dict[str, Any]]:
+        lim = max(1, min(2000, int(limit)))
+        ring = self._ring(source)
+        if ring is None:
+            return []
+        return ring.since(int(since_id), lim)
+
+    def latest_id(self, *, source: str | None = None) -> int:
+        ring = self._ring(source)
+        return ring.latest_id() if ring is not None else 0
+
+    async def wait_for(self, *, since_id: int, timeout_s: float, source: str | None = None) -> bool:
+        """Park until an entry newer than `since_id` exists for `source`, or the timeout expires."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(0.0, timeout_s)
+        while self.latest_id(source=source) <= since_id:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            if self._changed is None:
+                self._changed = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
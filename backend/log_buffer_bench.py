@@ -0,0 +1,81 @@
+"""Micro-benchmark: `/api/logs` poll latency vs LogBuffer size.
+
+Compares the indexed per-source LogBuffer with the previous single-deque
+linear scan. Run with:
+
+    python -m backend.log_buffer_bench
+"""
+
+import time
+from collections import deque
+from typing import Any
+
+from .log_buffer import LogBuffer
+
+
+class _LinearLogBuffer:
+    # Reference copy of the original implementation (full scan per poll).
+    def __init__(self, max_entries: int):
+        self._items: deque[dict[str, Any]] = deque(maxlen=max_entries)
+        self._next_id = 1
+
+    def append(self, *, source: str, line: str) -> int:
+        lid = self._next_id
+        self._next_id += 1
+        self._items.append({"id": lid, "ts": "", "source": source, "line": line})
+        return lid
+
+    def since(self, *, since_id: int, limit: int, source: str | None = None) -> list[dict[str, Any]]:
+        out: list[dict[str, Any]] = []
+        for it in self._items:
+            if int(it.get("id", 0)) <= since_id:
+                continue
+            if source and it.get("source") != source:
+                continue
+            out.append(it)
+            if len(out) >= limit:
+                break
+        return out
+
+    def latest_id(self, *, source: str | None = None) -> int:
+        last = 0
+        for it in self._items:
+            if source and it.get("source") != source:
+                continue
+            last = max(last, int(it.get("id", 0)))
+        return last
+
+
+def _fill(buf: Any, n: int) -> int:
+    # 9:1 pipeline/backend mix, similar to a busy codex phase.
+    last = 0
+    for i in range(n):
+        last = buf.append(source="backend" if i % 10 == 0 else "pipeline", line=f"line {i}")
+    return last
+
+
+def _time_poll(buf: Any, cursor: int, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        buf.since(since_id=cursor, limit=200, source="pipeline")
+        buf.latest_id(source="pipeline")
+    return (time.perf_counter() - t0) / rounds * 1e6
+
+
+def main() -> None:
+    print(f"{'entries':>9}  {'linear us/poll':>15}  {'indexed us/poll':>16}")
+    for size in (2_000, 20_000, 100_000, 500_000):
+        rounds = max(5, 200_000 // size)
+        linear = _LinearLogBuffer(size)
+        indexed = LogBuffer(max_entries=size)
+        last = _fill(linear, size)
+        _fill(indexed, size)
+        # Typical tail poll: the client is ~50 lines behind.
+        cursor = last - 50
+        lin_us = _time_poll(linear, cursor, rounds)
+        idx_us = _time_poll(indexed, cursor, 2_000)
+        print(f"{size:>9}  {lin_us:>15.1f}  {idx_us:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+import asyncio
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any
+
+from .sqlite_worker import SqliteWorker, fts5_available
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_lines (
+  id INTEGER PRIMARY KEY,
+  source TEXT NOT NULL,
+  run_id TEXT,
+  job_id TEXT,
+  seq INTEGER,
+  ts TEXT,
+  line TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS log_lines_run_seq ON log_lines(run_id, seq);
+CREATE INDEX IF NOT EXISTS log_lines_job_seq ON log_lines(job_id, source, seq);
+CREATE VIRTUAL TABLE IF NOT EXISTS log_fts USING fts5(line, content='log_lines', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS log_lines_ai AFTER INSERT ON log_lines BEGIN
+  INSERT INTO log_fts(rowid, line) VALUES (new.id, new.line);
+END;
+CREATE TRIGGER IF NOT EXISTS log_lines_ad AFTER DELETE ON log_lines BEGIN
+  INSERT INTO log_fts(log_fts, rowid, line) VALUES ('delete', old.id, old.line);
+END;
+CREATE TABLE IF NOT EXISTS log_files (
+  path TEXT PRIMARY KEY,
+  ino INTEGER NOT NULL,
+  offset INTEGER NOT NULL,
+  lines INTEGER NOT NULL
+);
+"""
+
+_JOB_STREAMS = ("stdout", "stderr")
+
+
+class LogSearchError(Exception):
+    def __init__(self, code: str, detail: str):
+        super().__init__(detail)
+        self.code = code
+        self.detail = detail
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"ok": False, "error": self.code, "detail": self.detail}
+
+
+def match_expression(q: str) -> str:
+    """Turn free text into an FTS5 query: every word must appear, `word*` is a prefix."""
+    terms: list[str] = []
+    for tok in str(q or "").split():
+        prefix = tok.endswith("*") and len(tok) > 1
+        word = tok[:-1] if prefix else tok
+        if not re.search(r"\w", word):
+            continue
+        terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def _index_file(conn: sqlite3.Connection, path: Path, *, source: str, job_id: str, ts: str) -> int:
+    try:
+        st = path.stat()
+    except OSError:
+        return 0
+    key = str(path)
+    row = conn.execute("SELECT ino, offset, lines FROM log_files WHERE path = ?", (key,)).fetchone()
+    offset, nlines = 0, 0
+    if row is not None:
+        if int(row["ino"]) == st.st_ino and st.st_size >= int(row["offset"]):
+            offset, nlines = int(row["offset"]), int(row["lines"])
+        else:
+            # Rewritten (atomic replace) or truncated: drop what we had and start over.
+            conn.execute("DELETE FROM log_lines WHERE job_id = ? AND source = ?", (job_id, source))
+    if row is not None and offset == st.st_size:
+        return 0
+    with path.open("rb") as f:
+        f.seek(offset)
+        data = f.read(max(0, st.st_size - offset))
+    rows = []
+    for ln in data.decode("utf-8", errors="replace").splitlines():
+        nlines += 1
+        if ln.strip():
+            rows.append((source, job_id, nlines, ts, ln))
+    conn.executemany("INSERT INTO log_lines(source, job_id, seq, ts, line) VALUES (?, ?, ?, ?, ?)", rows)
+    conn.execute(
+        "INSERT INTO log_files(path, ino, offset, lines) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(path) DO UPDATE SET ino = excluded.ino, offset = excluded.offset, lines = excluded.lines",
+        (key, st.st_ino, offset + len(data), nlines),
+    )
+    return len(rows)
+
+
+class LogSearchIndex:
+    """Incremental full-text index over pipeline/backend log lines and Codex job logs.
+
+    Backed by an SQLite FTS5 sidecar (runtime/logs/search.sqlite3) owned by a
+    dedicated thread. Live log lines are buffered in memory and written in
+    batches on a timer; job stdout/stderr files are indexed from the last
+    recorded byte offset when a job finishes. Nothing here runs on the
+    FileLogTailer path beyond a list append.
+    """
+
+    def __init__(self, *, db_path: Path, jobs_root: Path, max_rows: int = 2_000_000, max_pending: int = 50_000):
+        self.db_path = db_path
+        self.jobs_root = jobs_root
+        self.max_rows = max(10_000, int(max_rows))
+        self.max_pending = max(1000, int(max_pending))
+        self.available = False
+        self.dropped = 0
+        self._worker: SqliteWorker | None = None
+        self._pending: list[tuple[str, str | None, int | None, str, str]] = []
+        self._pending_jobs: dict[str, str] = {}
+        self._flushing: asyncio.Future[Any] | None = None
+
+    def open(self) -> bool:
+        if os.environ.get("AUTOAPPDEV_LOG_SEARCH", "1").strip() == "0" or not fts5_available():
+            return False
+        worker = SqliteWorker(self.db_path, name="log-search")
+        try:
+            worker.run_sync(lambda conn: conn.executescript(_SCHEMA))
+        except Exception:
+            worker.close()
+            return False
+        self._worker = worker
+        self.available = True
+        return True
+
+    # --- ingest ------------------------------------------------------------
+
+    def add_line(self, entry: dict[str, Any], *, run_id: str | None = None, seq: int | None = None) -> None:
+        if not self.available:
+            return
+        line = str(entry.get("line") or "")
+        if not line.strip():
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((str(entry.get("source") or ""), run_id, seq, str(entry.get("ts") or ""), line))
+
+    def add_job(self, job: dict[str, Any]) -> None:
+        """Queue a job's stdout/stderr for (incremental) indexing."""
+        if not self.available:
+            return
+        jid = str(job.get("id") or "")
+        if jid:
+            self._pending_jobs[jid] = str(job.get("finished_at") or job.get("updated_at") or "")
+
+    def _write(self, conn: sqlite3.Connection, lines: list[Any], jobs: dict[str, str]) -> int:
+        n = 0
+        with conn:
+            if lines:
+                conn.executemany(
+                    "INSERT INTO log_lines(source, run_id, seq, ts, line) VALUES (?, ?, ?, ?, ?)", lines
+                )
+                n += len(lines)
+            for jid, ts in jobs.items():
+                jdir = self.jobs_root / jid
+                for stream in _JOB_STREAMS:
+                    n += _index_file(conn, jdir / f"{stream}.log", source=f"codex:{stream}", job_id=jid, ts=ts)
+            lo, hi = conn.execute("SELECT min(id), max(id) FROM log_lines").fetchone()
+            if lo is not None and hi - lo + 1 > self.max_rows:
+                conn.execute("DELETE FROM log_lines WHERE id <= ?", (hi - self.max_rows,))
+        return n
+
+    async def flush(self) -> int:
+        """Write buffered lines and queued jobs; concurrent callers share one write."""
+        if self._worker is None:
+            return 0
+        while self._flushing is not None:
+            await asyncio.shield(self._flushing)
+        if not self._pending and not self._pending_jobs:
+            return 0
+        lines, self._pending = self._pending, []
+        jobs, self._pending_jobs = self._pending_jobs, {}
+        fut = asyncio.ensure_future(self._worker.run(self._write, lines, jobs))
+        self._flushing = fut
+        try:
+            return await asyncio.shield(fut)
+        finally:
+            self._flushing = None
+
+    async def backfill_jobs(self) -> int:
+        """Index job logs written before the index existed (or while the backend was down)."""
+        if not self.available:
+            return 0
+        for path in self.jobs_root.glob("*/job.json"):
+            self._pending_jobs.setdefault(path.parent.name, "")
+        return await self.flush()
+
+    # --- query -------------------------------------------------------------
+
+    def _search(
+        self,
+        conn: sqlite3.Connection,
+        match: str,
+        source: str | None,
+        run_id: str | None,
+        job_id: str | None,
+        limit: int,
+        context: int,
+    ) -> list[dict[str, Any]]:
+        sql = (
+            "SELECT l.id, l.source, l.run_id, l.job_id, l.seq, l.ts, l.line "
+            "FROM log_fts JOIN log_lines l ON l.id = log_fts.rowid WHERE log_fts MATCH ?"
+        )
+        args: list[Any] = [match]
+        if source:
+            if source == "codex":
+                sql += " AND l.source LIKE 'codex:%'"
+            else:
+                sql += " AND l.source = ?"
+                args.append(source)
+        if run_id:
+            sql += " AND l.run_id = ?"
+            args.append(run_id)
+        if job_id:
+            sql += " AND l.job_id = ?"
+            args.append(job_id)
+        sql += " ORDER BY log_fts.rowid DESC LIMIT ?"
+        args.append(limit)
+        try:
+            rows = conn.execute(sql, args).fetchall()
+        except sqlite3.OperationalError as exc:
+            raise LogSearchError("invalid_query", str(exc)) from exc
+        out: list[dict[str, Any]] = []
+        for r in rows:
+            hit = {k: r[k] for k in ("source", "run_id", "job_id", "seq", "ts", "line")}
+            if context and r["seq"] is not None:
+                near = conn.execute(
+                    "SELECT seq, line FROM log_lines WHERE run_id IS ? AND job_id IS ? AND source = ? "
+                    "AND seq BETWEEN ? AND ? ORDER BY seq",
+                    (r["run_id"], r["job_id"], r["source"], r["seq"] - context, r["seq"] + context),
+                ).fetchall()
+                hit["before"] = [n["line"] for n in near if n["seq"] < r["seq"]]
+                hit["after"] = [n["line"] for n in near if n["seq"] > r["seq"]]
+            out.append(hit)
+        return out
+
+    async def search(
+        self,
+        q: str,
+        *,
+        source: str | None = None,
+        run_id: str | None = None,
+        job_id: str | None = None,
+        limit: int = 50,
+        context: int = 0,
+        raw: bool = False,
+    ) -> dict[str, Any]:
+        if self._worker is None:
+            raise LogSearchError("search_unavailable", "log search index is disabled or SQLite lacks FTS5")
+        match = str(q or "").strip() if raw else match_expression(q)
+        if not match:
+            raise LogSearchError("empty_query", "q is required")
+        await self.flush()
+        started = time.monotonic()
+        results = await self._worker.run(
+            self._search,
+            match,
+            source or None,
+            run_id or None,
+            job_id or None,
+            max(1, min(int(limit), 500)),
+            max(0, min(int(context), 10)),
+        )
+        return {"q": q, "results": results, "took_ms": round((time.monotonic() - started) * 1000, 2)}
+
+    def close(self) -> None:
+        if self._worker is not None:
+            self._worker.close()
+            self._worker = None
+        self.available = False
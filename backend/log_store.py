@@ -0,0 +1,475 @@
+import asyncio
+import datetime
+import gzip
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator
+
+from .codex_api import atomic_write_json, read_json
+
+
+def _gzip_file(src: Path, dst: Path, index: list[list[int]], block_bytes: int) -> list[list[int]]:
+    """Compress `src` as a multi-member gzip and return its (id, compressed offset) index.
+
+    A new member starts at an index entry at least `block_bytes` past the
+    previous one, so each returned offset is where an independent gzip stream
+    begins and a reader can seek there without decompressing what precedes it.
+    """
+    cuts: list[list[int]] = []
+    for lid, off in index:
+        if not cuts or int(off) - cuts[-1][1] >= block_bytes:
+            cuts.append([int(lid), int(off)])
+    if not cuts or cuts[0][1] != 0:
+        cuts.insert(0, [0, 0])
+    tmp = dst.with_name(dst.name + ".tmp")
+    out: list[list[int]] = []
+    with src.open("rb") as fin, tmp.open("wb") as fout:
+        for i, (lid, off) in enumerate(cuts):
+            end = cuts[i + 1][1] if i + 1 < len(cuts) else None
+            fin.seek(off)
+            out.append([lid, fout.tell()])
+            with gzip.GzipFile(fileobj=fout, mode="wb", compresslevel=6, mtime=0) as gz:
+                if end is None:
+                    shutil.copyfileobj(fin, gz, 1024 * 1024)
+                else:
+                    left = end - off
+                    while left > 0:
+                        chunk = fin.read(min(left, 1024 * 1024))
+                        if not chunk:
+                            break
+                        gz.write(chunk)
+                        left -= len(chunk)
+    tmp.replace(dst)
+    return [it for it in out if it[0]]
+
+
+def _dir_bytes(path: Path) -> int:
+    total = 0
+    for p in path.iterdir():
+        try:
+            total += p.stat().st_size
+        except Exception:
+            pass
+    return total
+
+
+class RunLogStore:
+    """Append-only, segmented pipeline log history keyed by run id.
+
+    Layout: runtime/logs/runs/<run_id>/{manifest.json, 000001.jsonl[.gz], ...}.
+    Each record is one JSON line {"id", "ts", "source", "line"} with a per-run
+    id. Segments roll at `segment_bytes`; closed ones are gzip-compressed off
+    the IOLoop. The manifest keeps per-segment id/ts bounds and a sparse
+    (id -> byte offset) index so range queries only open the segments they need.
+    Compressed segments are written as a sequence of gzip members of about
+    `block_bytes` each, and their index maps ids to member offsets
+    (`"blocks": true`), so a query still seeks close to its start.
+    """
+
+    def __init__(
+        self,
+        *,
+        root: Path,
+        segment_bytes: int = 8 * 1024 * 1024,
+        index_every: int = 256,
+        compress: bool = True,
+        block_bytes: int = 256 * 1024,
+        max_runs: int = 50,
+        max_bytes: int = 2 * 1024 * 1024 * 1024,
+        max_pending: int = 10_000,
+    ):
+        self.root = root.resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = max(64 * 1024, int(segment_bytes))
+        self.index_every = max(16, int(index_every))
+        self.compress = compress
+        self.block_bytes = max(4096, int(block_bytes))
+        self.max_runs = max(1, int(max_runs))
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_pending = max(0, int(max_pending))
+        self._run_key: str | None = None
+        self._manifest: dict[str, Any] | None = None
+        self._fh: BinaryIO | None = None
+        self._dirty = False
+        # Lines that arrive between a run being spawned and its id being known.
+        self._pending: list[dict[str, Any]] = []
+        # Runs with a segment being compressed in the background; not pruned meanwhile.
+        self._compressing: dict[str, int] = {}
+
+    @property
+    def active_run(self) -> str | None:
+        return self._run_key
+
+    def run_dir(self, run_id: Any) -> Path:
+        key = str(run_id).strip()
+        if not key or not key.replace("-", "").replace("_", "").isalnum():
+            raise ValueError(f"invalid run id: {run_id!r}")
+        return self.root / key
+
+    # --- writing -----------------------------------------------------------
+
+    @property
+    def last_id(self) -> int | None:
+        """Id of the last record appended to the active run."""
+        if self._manifest is None:
+            return None
+        return int(self._manifest["next_id"]) - 1
+
+    def begin_run(self, run_id: Any) -> None:
+        self._finish_active()
+        key = str(run_id)
+        rdir = self.run_dir(key)
+        rdir.mkdir(parents=True, exist_ok=True)
+        manifest = read_json(rdir / "manifest.json")
+        if not isinstance(manifest, dict) or not isinstance(manifest.get("segments"), list):
+            manifest = {
+                "run_id": key,
+                "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "next_id": 1,
+                "segments": [],
+            }
+            self._dirty = True
+        self._run_key = key
+        self._manifest = manifest
+        self._recover_active(rdir)
+        pending, self._pending = self._pending, []
+        for entry in pending:
+            self.append(entry)
+        self.flush()
+        self.prune()
+
+    def end_run(self) -> None:
+        """Close the active run; lines buffered while no run was active are dropped."""
+        self._finish_active()
+        self._pending.clear()
+
+    def _finish_active(self) -> None:
+        if self._manifest is None:
+            return
+        self._close_segment()
+        self.flush()
+        self._run_key = None
+        self._manifest = None
+
+    def append(self, entry: dict[str, Any]) -> None:
+        manifest = self._manifest
+        if manifest is None:
+            if len(self._pending) < self.max_pending:
+                self._pending.append(entry)
+            return
+        seg = self._active_segment()
+        assert self._fh is not None
+        lid = int(manifest["next_id"])
+        manifest["next_id"] = lid + 1
+        ts = str(entry.get("ts") or datetime.datetime.now(datetime.timezone.utc).isoformat())
+        rec = {"id": lid, "ts": ts, "source": str(entry.get("source") or ""), "line": str(entry.get("line") or "")}
+        data = (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+        if seg["lines"] % self.index_every == 0:
+            seg["index"].append([lid, seg["bytes"]])
+        self._fh.write(data)
+        seg["bytes"] += len(data)
+        seg["lines"] += 1
+        if seg["first_id"] is None:
+            seg["first_id"] = lid
+            seg["first_ts"] = ts
+        seg["last_id"] = lid
+        seg["last_ts"] = ts
+        self._dirty = True
+        if seg["bytes"] >= self.segment_bytes:
+            self._close_segment()
+            self.flush()
+
+    def flush(self) -> None:
+        if self._fh is not None:
+            try:
+                self._fh.flush()
+            except Exception:
+                pass
+        if self._dirty and self._manifest is not None and self._run_key is not None:
+            atomic_write_json(self.run_dir(self._run_key) / "manifest.json", self._manifest)
+            self._dirty = False
+
+    def _active_segment(self) -> dict[str, Any]:
+        assert self._manifest is not None and self._run_key is not None
+        segs = self._manifest["segments"]
+        if not segs or segs[-1].get("closed"):
+            seg = {
+                "name": f"{len(segs) + 1:06d}.jsonl",
+                "first_id": None,
+                "last_id": None,
+                "first_ts": None,
+                "last_ts": None,
+                "lines": 0,
+                "bytes": 0,
+                "closed": False,
+                "compressed": False,
+                "index": [],
+            }
+            segs.append(seg)
+            self._dirty = True
+        seg = segs[-1]
+        if self._fh is None:
+            self._fh = (self.run_dir(self._run_key) / seg["name"]).open("ab")
+        return seg
+
+    def _close_segment(self) -> None:
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except Exception:
+                pass
+            self._fh = None
+        if self._manifest is None or self._run_key is None:
+            return
+        segs = self._manifest["segments"]
+        if not segs or segs[-1].get("closed"):
+            return
+        seg = segs[-1]
+        seg["closed"] = True
+        self._dirty = True
+        if self.compress and seg["lines"]:
+            self._compress_segment(self._run_key, seg["name"], [list(it) for it in seg["index"]])
+
+    def _compress_segment(self, run_key: str, name: str, index: list[list[int]]) -> None:
+        rdir = self.run_dir(run_key)
+        src = rdir / name
+        dst = rdir / (name + ".gz")
+
+        def _done(blocks: list[list[int]] | None) -> None:
+            left = self._compressing.get(run_key, 1) - 1
+            if left > 0:
+                self._compressing[run_key] = left
+            else:
+                self._compressing.pop(run_key, None)
+            if blocks is None or not rdir.exists():
+                return
+            # Re-read the manifest: the run may no longer be the active one.
+            manifest = self._manifest if self._run_key == run_key else read_json(rdir / "manifest.json")
+            if not isinstance(manifest, dict):
+                return
+            for seg in manifest.get("segments") or []:
+                if seg.get("name") == name:
+                    seg["name"] = name + ".gz"
+                    seg["compressed"] = True
+                    seg["index"] = blocks
+                    seg["blocks"] = True
+            if manifest is self._manifest:
+                self._dirty = True
+                self.flush()
+            else:
+                atomic_write_json(rdir / "manifest.json", manifest)
+            try:
+                src.unlink()
+            except Exception:
+                pass
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            try:
+                blocks = _gzip_file(src, dst, index, self.block_bytes)
+            except Exception:
+                return
+            _done(blocks)
+            return
+        self._compressing[run_key] = self._compressing.get(run_key, 0) + 1
+        fut = loop.run_in_executor(None, _gzip_file, src, dst, index, self.block_bytes)
+        fut.add_done_callback(lambda f: _done(None if f.exception() is not None else f.result()))
+
+    def _recover_active(self, rdir: Path) -> None:
+        # A crash can leave the manifest behind the open segment; rescan it.
+        assert self._manifest is not None
+        segs = self._manifest["segments"]
+        if not segs or segs[-1].get("closed"):
+            return
+        seg = segs[-1]
+        path = rdir / seg["name"]
+        if not path.exists():
+            return
+        seg.update({"first_id": None, "last_id": None, "first_ts": None, "last_ts": None, "lines": 0, "bytes": 0})
+        seg["index"] = []
+        good = 0
+        with path.open("rb") as f:
+            for raw in f:
+                try:
+                    rec = json.loads(raw)
+                except Exception:
+                    break
+                if seg["lines"] % self.index_every == 0:
+                    seg["index"].append([rec["id"], good])
+                good += len(raw)
+                seg["lines"] += 1
+                if seg["first_id"] is None:
+                    seg["first_id"] = rec["id"]
+                    seg["first_ts"] = rec["ts"]
+                seg["last_id"] = rec["id"]
+                seg["last_ts"] = rec["ts"]
+        if good != path.stat().st_size:
+            with path.open("r+b") as f:
+                f.truncate(good)
+        seg["bytes"] = good
+        if seg["last_id"] is not None:
+            self._manifest["next_id"] = max(int(self._manifest["next_id"]), int(seg["last_id"]) + 1)
+        self._dirty = True
+
+    def prune(self) -> list[str]:
+        runs = self._run_dirs()
+        removed: list[str] = []
+        total = sum(size for _, _, size in runs)
+        # Oldest first; never drop the run that is being written.
+        for i, (key, rdir, size) in enumerate(runs):
+            keep_count = len(runs) - i <= self.max_runs
+            keep_bytes = not self.max_bytes or total <= self.max_bytes
+            if keep_count and keep_bytes:
+                break
+            if key == self._run_key or key in self._compressing:
+                continue
+            shutil.rmtree(rdir, ignore_errors=True)
+            total -= size
+            removed.append(key)
+        return removed
+
+    def _run_dirs(self) -> list[tuple[str, Path, int]]:
+        out: list[tuple[str, str, Path, int]] = []
+        for rdir in self.root.iterdir():
+            if not rdir.is_dir():
+                continue
+            manifest = read_json(rdir / "manifest.json", {})
+            created = str(manifest.get("created_at") or "") if isinstance(manifest, dict) else ""
+            out.append((rdir.name, created, rdir, _dir_bytes(rdir)))
+        out.sort(key=lambda it: (it[1], it[0]))
+        return [(key, rdir, size) for key, _, rdir, size in out]
+
+    # --- reading -----------------------------------------------------------
+
+    def list_runs(self, *, limit: int = 50) -> list[dict[str, Any]]:
+        self.flush()
+        runs: list[dict[str, Any]] = []
+        for key, rdir, size in reversed(self._run_dirs()):
+            manifest = self._manifest if key == self._run_key else read_json(rdir / "manifest.json", {})
+            if not isinstance(manifest, dict):
+                continue
+            segs = [s for s in manifest.get("segments") or [] if isinstance(s, dict)]
+            runs.append(
+                {
+                    "run_id": key,
+                    "active": key == self._run_key,
+                    "created_at": manifest.get("created_at"),
+                    "lines": sum(int(s.get("lines") or 0) for s in segs),
+                    "segments": len(segs),
+                    "bytes_on_disk": size,
+                    "first_ts": next((s.get("first_ts") for s in segs if s.get("first_ts")), None),
+                    "last_ts": next((s.get("last_ts") for s in reversed(segs) if s.get("last_ts")), None),
+                    "last_id": int(manifest.get("next_id") or 1) - 1,
+                }
+            )
+            if len(runs) >= limit:
+                break
+        return runs
+
+    def query(
+        self,
+        run_id: Any,
+        *,
+        since_id: int = 0,
+        until_id: int | None = None,
+        from_ts: str | None = None,
+        to_ts: str | None = None,
+        limit: int = 500,
+    ) -> list[dict[str, Any]]:
+        """Return records with since_id < id <= until_id and from_ts <= ts <= to_ts."""
+        key = str(run_id)
+        rdir = self.run_dir(key)
+        if key == self._run_key:
+            self.flush()
+            manifest = self._manifest
+        else:
+            manifest = read_json(rdir / "manifest.json")
+        if not isinstance(manifest, dict):
+            return []
+        lim = max(1, min(int(limit), 5000))
+        out: list[dict[str, Any]] = []
+        for seg in list(manifest.get("segments") or []):
+            if seg.get("first_id") is None:
+                continue
+            if int(seg["last_id"]) <= since_id:
+                continue
+            if until_id is not None and int(seg["first_id"]) > until_id:
+                break
+            if from_ts and str(seg.get("last_ts") or "") < from_ts:
+                continue
+            if to_ts and str(seg.get("first_ts") or "") > to_ts:
+                break
+            for rec in self._scan_segment(rdir, seg, since_id):
+                rid = int(rec.get("id") or 0)
+                if rid <= since_id:
+                    continue
+                if until_id is not None and rid > until_id:
+                    return out
+                ts = str(rec.get("ts") or "")
+                if from_ts and ts < from_ts:
+                    continue
+                if to_ts and ts > to_ts:
+                    return out
+                out.append(rec)
+                if len(out) >= lim:
+                    return out
+        return out
+
+    def _scan_segment(self, rdir: Path, seg: dict[str, Any], since_id: int) -> Iterator[dict[str, Any]]:
+        offset = 0
+        for lid, off in seg.get("index") or []:
+            if int(lid) > since_id:
+                break
+            offset = int(off)
+        name = str(seg["name"])
+        path = rdir / name
+        if not path.exists() and not name.endswith(".gz") and (rdir / (name + ".gz")).exists():
+            # Compressed after we read the manifest: the plain offsets do not apply to it.
+            path = rdir / (name + ".gz")
+            offset = 0
+        try:
+            with path.open("rb") as raw_f:
+                f: BinaryIO | gzip.GzipFile
+                if not path.name.endswith(".gz"):
+                    f = raw_f
+                    f.seek(offset)
+                elif seg.get("blocks"):
+                    # Offsets point at gzip member boundaries; decompress from there on.
+                    raw_f.seek(offset)
+                    f = gzip.GzipFile(fileobj=raw_f, mode="rb")
+                else:
+                    # Compressed as a single stream (older segments): the offsets are
+                    # into the plain data, so seeking decompresses everything before.
+                    f = gzip.GzipFile(fileobj=raw_f, mode="rb")
+                    if offset:
+                        f.seek(offset)
+                for raw in f:
+                    try:
+                        rec = json.loads(raw)
+                    except Exception:
+                        continue
+                    if isinstance(rec, dict):
+                        yield rec
+        except FileNotFoundError:
+            return
+
+
+def run_log_store_from_env(root: Path) -> RunLogStore:
+    def _int(key: str, default: int) -> int:
+        try:
+            return int(os.environ.get(key, str(default)).strip())
+        except Exception:
+            return default
+
+    return RunLogStore(
+        root=root,
+        segment_bytes=_int("AUTOAPPDEV_LOG_SEGMENT_KB", 8192) * 1024,
+        compress=os.environ.get("AUTOAPPDEV_LOG_COMPRESS", "gzip").strip().lower() != "none",
+        max_runs=_int("AUTOAPPDEV_LOG_RETAIN_RUNS", 50),
+        max_bytes=_int("AUTOAPPDEV_LOG_RETAIN_MB", 2048) * 1024 * 1024,
+    )
@@ -0,0 +1,287 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Any, BinaryIO
+
+import tornado.ioloop
+
+from .log_buffer import LogBuffer
+
+
+# inotify(7) event masks; IN_Q_OVERFLOW is always reported.
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def read_tail_lines(
+    path: Path, n: int, *, before: int | None = None, block_size: int = 64 * 1024
+) -> tuple[list[str], int, int]:
+    """Return the last `n` lines that end at or before byte offset `before`.
+
+    Reads backwards from `before` (default: EOF) in fixed-size blocks and stops
+    as soon as `n` complete lines are available, so cost is proportional to the
+    returned text rather than the file size. Returns (lines, start_offset,
+    file_size); pass `start_offset` back as `before` to page further back.
+    """
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        end = size if before is None else max(0, min(int(before), size))
+        want = max(0, int(n))
+        if want == 0 or end == 0:
+            return [], end, size
+        chunks: list[bytes] = []
+        newlines = 0
+        pos = end
+        trailing = 0
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step)
+            if not chunks and block.endswith(b"\n"):
+                # The terminator of the last line does not start a new one.
+                trailing = 1
+            chunks.append(block)
+            newlines += block.count(b"\n")
+            if newlines - trailing >= want:
+                break
+    data = b"".join(reversed(chunks))
+    if trailing:
+        data = data[:-1]
+    parts = data.split(b"\n")
+    if pos > 0:
+        # The first piece may start mid-line; it belongs to the next page.
+        parts = parts[1:]
+    selected = parts[-want:]
+    start = end - trailing - len(b"\n".join(selected))
+    lines = [p.decode("utf-8", errors="replace").rstrip("\r") for p in selected]
+    return lines, start, size
+
+
+class FileLogTailer:
+    """Follows one log file into a LogBuffer.
+
+    The file stays open between reads; rotation is detected by comparing the
+    inode of the path with the inode of the open handle, truncation by size.
+    """
+
+    def __init__(self, *, source: str, path: Path, buf: LogBuffer):
+        self.source = source
+        self.path = path
+        self.buf = buf
+        self._fh: BinaryIO | None = None
+        self._ino: int | None = None
+        self._partial = ""
+
+    def close(self) -> None:
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except Exception:
+                pass
+        self._fh = None
+        self._ino = None
+
+    def _open(self) -> bool:
+        try:
+            fh = self.path.open("rb")
+        except Exception:
+            return False
+        self._fh = fh
+        self._ino = os.fstat(fh.fileno()).st_ino
+        self._partial = ""
+        return True
+
+    def _drain(self) -> None:
+        if self._fh is None:
+            return
+        try:
+            data = self._fh.read()
+        except Exception:
+            return
+        if not data:
+            return
+        text = data.decode("utf-8", errors="replace")
+        if self._partial:
+            text = self._partial + text
+            self._partial = ""
+        for ln in text.splitlines(keepends=True):
+            if ln.endswith("\n") or ln.endswith("\r\n"):
+                self.buf.append(source=self.source, line=ln.rstrip("\r\n"))
+            else:
+                # Partial final line; keep for next poll.
+                self._partial = ln
+
+    def poll(self) -> None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # Deleted or renamed away: flush what the old handle still has.
+            self._drain()
+            self.close()
+            return
+        except Exception:
+            return
+        if self._fh is not None and st.st_ino != self._ino:
+            # Rotated: finish the old file, then follow the new one from the start.
+            self._drain()
+            self.close()
+        if self._fh is None:
+            if not self._open():
+                return
+        assert self._fh is not None
+        try:
+            if st.st_size < self._fh.tell():
+                # Truncated in place (e.g. a new pipeline run).
+                self._fh.seek(0)
+                self._partial = ""
+        except Exception:
+            return
+        self._drain()
+
+
+class _Inotify:
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc = libc
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.fd = fd
+
+    def add_watch(self, path: Path, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), ctypes.c_uint32(mask))
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(path))
+        return int(wd)
+
+    def read_events(self) -> list[tuple[int, int, str]]:
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        out: list[tuple[int, int, str]] = []
+        pos = 0
+        while pos + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, name_len = _EVENT_HEADER.unpack_from(data, pos)
+            pos += _EVENT_HEADER.size
+            name = data[pos : pos + name_len].rstrip(b"\0").decode("utf-8", errors="replace")
+            pos += name_len
+            out.append((wd, mask, name))
+        return out
+
+    def close(self) -> None:
+        try:
+            os.close(self.fd)
+        except Exception:
+            pass
+
+
+class LogWatcher:
+    """Drives a set of FileLogTailers from inotify, or from one shared timer.
+
+    With inotify, parent directories are watched (so creation and rotation are
+    seen) and only the tailers whose file changed are polled. A slow safety
+    poll still runs in case events are lost (e.g. on network filesystems).
+    Without inotify (non-Linux, or AUTOAPPDEV_LOG_INOTIFY=0) every tailer is
+    polled on the fallback interval, as before.
+    """
+
+    def __init__(
+        self,
+        tailers: list[FileLogTailer],
+        *,
+        fallback_interval_ms: int = 500,
+        safety_interval_ms: int = 5000,
+    ):
+        self.tailers = list(tailers)
+        self.fallback_interval_ms = fallback_interval_ms
+        self.safety_interval_ms = safety_interval_ms
+        self.mode = "stopped"
+        self._inotify: _Inotify | None = None
+        self._by_watch: dict[tuple[int, str], list[FileLogTailer]] = {}
+        self._timer: tornado.ioloop.PeriodicCallback | None = None
+
+    def poll_all(self) -> None:
+        for t in self.tailers:
+            t.poll()
+
+    def _start_inotify(self) -> bool:
+        if not sys.platform.startswith("linux") or os.environ.get("AUTOAPPDEV_LOG_INOTIFY", "1").strip() == "0":
+            return False
+        try:
+            ino = _Inotify()
+        except Exception:
+            return False
+        watches: dict[Path, int] = {}
+        try:
+            for t in self.tailers:
+                parent = t.path.parent.resolve()
+                parent.mkdir(parents=True, exist_ok=True)
+                if parent not in watches:
+                    watches[parent] = ino.add_watch(parent, _WATCH_MASK)
+                self._by_watch.setdefault((watches[parent], t.path.name), []).append(t)
+        except Exception:
+            ino.close()
+            self._by_watch.clear()
+            return False
+        self._inotify = ino
+        tornado.ioloop.IOLoop.current().add_handler(ino.fd, self._on_events, tornado.ioloop.IOLoop.READ)
+        return True
+
+    def _on_events(self, _fd: Any, _events: int) -> None:
+        if self._inotify is None:
+            return
+        due: dict[int, FileLogTailer] = {}
+        while True:
+            batch = self._inotify.read_events()
+            if not batch:
+                break
+            for wd, mask, name in batch:
+                if mask & _IN_Q_OVERFLOW:
+                    for t in self.tailers:
+                        due[id(t)] = t
+                    continue
+                for t in self._by_watch.get((wd, name), []):
+                    due[id(t)] = t
+        # One read per changed file per wakeup, however many events arrived.
+        for t in due.values():
+            t.poll()
+
+    def start(self) -> None:
+        self.poll_all()
+        if self._start_inotify():
+            self.mode = "inotify"
+            interval = self.safety_interval_ms
+        else:
+            self.mode = "poll"
+            interval = self.fallback_interval_ms
+        self._timer = tornado.ioloop.PeriodicCallback(self.poll_all, interval)
+        self._timer.start()
+
+    def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        if self._inotify is not None:
+            try:
+                tornado.ioloop.IOLoop.current().remove_handler(self._inotify.fd)
+            except Exception:
+                pass
+            self._inotify.close()
+            self._inotify = None
+        for t in self.tailers:
+            t.close()
+        self.mode = "stopped"
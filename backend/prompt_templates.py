@@ -0,0 +1,71 @@
+import hashlib
+import time
+from pathlib import Path
+
+
+class PromptTemplate:
+    """A prompt split into a static prefix and a per-request dynamic tail.
+
+    The static part is identical byte for byte across requests, so the model
+    provider's prompt-prefix cache can reuse it; `version` identifies it.
+    """
+
+    __slots__ = ("name", "static", "digest", "version")
+
+    def __init__(self, name: str, static: str):
+        self.name = name
+        self.static = static
+        self.digest = hashlib.sha256(static.encode("utf-8", errors="replace")).hexdigest()
+        self.version = self.digest[:12]
+
+    def render(self, dynamic: str) -> str:
+        return self.static + dynamic
+
+    def describe(self) -> dict[str, str]:
+        return {"name": self.name, "version": self.version}
+
+
+class _FileEntry:
+    __slots__ = ("path", "suffix", "template", "stamp", "checked")
+
+    def __init__(self, path: Path, suffix: str):
+        self.path = path
+        self.suffix = suffix
+        self.template: PromptTemplate | None = None
+        self.stamp: tuple[int, int] | None = None
+        self.checked = 0.0
+
+
+class PromptTemplateRegistry:
+    """Prompt templates loaded once and reloaded only when their file changes.
+
+    File-backed templates are stat()ed at most every `check_interval_s`; the
+    file is re-read only if its mtime or size changed. If a file disappears
+    after it was loaded, the last good version keeps being served.
+    """
+
+    def __init__(self, *, check_interval_s: float = 2.0):
+        self.check_interval_s = max(0.0, float(check_interval_s))
+        self._files: dict[str, _FileEntry] = {}
+
+    def register_file(self, name: str, path: Path, *, suffix: str = "") -> None:
+        """Template = file contents + `suffix` (fixed text that precedes the dynamic part)."""
+        self._files[name] = _FileEntry(path, suffix)
+
+    def get(self, name: str) -> PromptTemplate:
+        entry = self._files[name]
+        now = time.monotonic()
+        if entry.template is not None and now - entry.checked < self.check_interval_s:
+            return entry.template
+        entry.checked = now
+        try:
+            st = entry.path.stat()
+        except FileNotFoundError:
+            if entry.template is not None:
+                return entry.template
+            raise
+        stamp = (st.st_mtime_ns, st.st_size)
+        if entry.template is None or stamp != entry.stamp:
+            entry.template = PromptTemplate(name, entry.path.read_text("utf-8") + entry.suffix)
+            entry.stamp = stamp
+        return entry.template
@@ -6,6 +6,18 @@ create table if not exists app_config (
   updated_at timestamptz not null default now()
 );
 
+-- Tell listening backends (Storage's config cache) which key changed.
+create or replace function autoappdev_app_config_notify() returns trigger as $$
+begin
+  perform pg_notify('autoappdev_app_config', coalesce(new.key, old.key));
+  return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists app_config_notify on app_config;
+create trigger app_config_notify after insert or update or delete on app_config
+  for each row execute function autoappdev_app_config_notify();
+
 create table if not exists chat_messages (
   id bigserial primary key,
   role text not null,
@@ -29,6 +41,10 @@ create table if not exists outbox_messages (
 
 create index if not exists outbox_messages_created_at_idx on outbox_messages(created_at);
 
+-- Set by batched file ingest (file name + inode + mtime + content hash) so a re-ingested file is skipped.
+alter table outbox_messages add column if not exists ingest_key text;
+create unique index if not exists outbox_messages_ingest_key_idx on outbox_messages(ingest_key);
+
 create table if not exists pipeline_runs (
   id bigserial primary key,
   status text not null,
@@ -86,3 +102,50 @@ create table if not exists workspace_configs (
 );
 
 create index if not exists workspace_configs_updated_at_idx on workspace_configs(updated_at);
+
+-- Change feed: the backend LISTENs on these channels (see Storage) to keep
+-- pipeline state hot and to push changes made by other processes to clients.
+-- Message payloads carry a content preview: NOTIFY payloads are capped at 8000 bytes.
+create or replace function autoappdev_pipeline_state_notify() returns trigger as $$
+begin
+  perform pg_notify('autoappdev_pipeline_state', row_to_json(new)::text);
+  return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists pipeline_state_notify on pipeline_state;
+create trigger pipeline_state_notify after insert or update on pipeline_state
+  for each row execute function autoappdev_pipeline_state_notify();
+
+create or replace function autoappdev_pipeline_runs_notify() returns trigger as $$
+begin
+  perform pg_notify('autoappdev_pipeline_runs', json_build_object('id', new.id, 'status', new.status, 'pid', new.pid)::text);
+  return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists pipeline_runs_notify on pipeline_runs;
+create trigger pipeline_runs_notify after insert or update on pipeline_runs
+  for each row execute function autoappdev_pipeline_runs_notify();
+
+create or replace function autoappdev_messages_notify() returns trigger as $$
+begin
+  perform pg_notify(
+    'autoappdev_messages',
+    json_build_object('table', tg_table_name, 'id', new.id, 'role', new.role, 'content', left(new.content, 1000))::text
+  );
+  return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists chat_messages_notify on chat_messages;
+create trigger chat_messages_notify after insert on chat_messages
+  for each row execute function autoappdev_messages_notify();
+
+drop trigger if exists inbox_messages_notify on inbox_messages;
+create trigger inbox_messages_notify after insert on inbox_messages
+  for each row execute function autoappdev_messages_notify();
+
+drop trigger if exists outbox_messages_notify on outbox_messages;
+create trigger outbox_messages_notify after insert on outbox_messages
+  for each row execute function autoappdev_messages_notify();
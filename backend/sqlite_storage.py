@@ -0,0 +1,558 @@
+import datetime
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Optional
+
+from .sqlite_worker import SqliteWorker
+from .storage import PipelineStatus, Storage
+
+
+# schema.sql translated to SQLite: jsonb -> JSON text, timestamptz -> ISO-8601 text (UTC).
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS app_config (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL,
+  updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chat_messages (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  role TEXT NOT NULL,
+  content TEXT NOT NULL,
+  created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS inbox_messages (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  role TEXT NOT NULL,
+  content TEXT NOT NULL,
+  created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox_messages (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  role TEXT NOT NULL,
+  content TEXT NOT NULL,
+  created_at TEXT NOT NULL,
+  ingest_key TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_messages_created_at_idx ON outbox_messages(created_at);
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  status TEXT NOT NULL,
+  pid INTEGER,
+  started_at TEXT NOT NULL,
+  stopped_at TEXT,
+  script TEXT NOT NULL,
+  cwd TEXT NOT NULL,
+  args TEXT NOT NULL DEFAULT '[]'
+);
+CREATE TABLE IF NOT EXISTS pipeline_state (
+  id INTEGER PRIMARY KEY,
+  state TEXT NOT NULL,
+  pid INTEGER,
+  run_id INTEGER,
+  started_at TEXT,
+  paused_at TEXT,
+  resumed_at TEXT,
+  stopped_at TEXT,
+  updated_at TEXT NOT NULL
+);
+INSERT OR IGNORE INTO pipeline_state(id, state, updated_at)
+  VALUES (1, 'stopped', strftime('%Y-%m-%dT%H:%M:%f000+00:00', 'now'));
+CREATE TABLE IF NOT EXISTS pipeline_scripts (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  title TEXT NOT NULL DEFAULT '',
+  script_text TEXT NOT NULL,
+  script_version INTEGER NOT NULL DEFAULT 1,
+  script_format TEXT NOT NULL DEFAULT 'aaps',
+  ir TEXT,
+  created_at TEXT NOT NULL,
+  updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pipeline_scripts_updated_at_idx ON pipeline_scripts(updated_at);
+CREATE TABLE IF NOT EXISTS action_definitions (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  title TEXT NOT NULL,
+  kind TEXT NOT NULL,
+  spec TEXT NOT NULL,
+  enabled INTEGER NOT NULL DEFAULT 1,
+  created_at TEXT NOT NULL,
+  updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS action_definitions_updated_at_idx ON action_definitions(updated_at);
+CREATE TABLE IF NOT EXISTS workspace_configs (
+  workspace TEXT PRIMARY KEY,
+  config TEXT NOT NULL,
+  updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS workspace_configs_updated_at_idx ON workspace_configs(updated_at);
+"""
+
+_SCRIPT_COLUMNS = "id, title, script_text, script_version, script_format, ir, created_at, updated_at"
+_ACTION_COLUMNS = "id, title, kind, spec, enabled, created_at, updated_at"
+_TS_COLUMNS = {"start": "started_at", "pause": "paused_at", "resume": "resumed_at", "stop": "stopped_at"}
+
+
+def is_sqlite_url(url: str) -> bool:
+    return str(url or "").strip().lower().startswith("sqlite:")
+
+
+def sqlite_path_from_url(url: str, runtime_dir: Path) -> Path:
+    """`sqlite:///relative/path.db`, `sqlite:////absolute/path.db`; bare `sqlite://` uses the runtime dir."""
+    rest = str(url or "").strip()[len("sqlite:") :]
+    rest = rest[3:] if rest.startswith("///") else rest.lstrip("/")
+    if not rest:
+        return runtime_dir / "autoappdev.sqlite3"
+    return Path(rest).expanduser()
+
+
+def _now() -> str:
+    # Same shape as asyncpg's timestamptz.isoformat(), fixed width so text order is time order.
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="microseconds")
+
+
+def _dump(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _load(raw: Any) -> Any:
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except Exception:
+        return raw
+
+
+def _script(row: sqlite3.Row) -> dict[str, Any]:
+    return {
+        "id": int(row["id"]),
+        "title": str(row["title"] or ""),
+        "script_text": str(row["script_text"] or ""),
+        "script_version": int(row["script_version"] or 1),
+        "script_format": str(row["script_format"] or "aaps"),
+        "ir": _load(row["ir"]),
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+def _action(row: sqlite3.Row) -> dict[str, Any]:
+    return {
+        "id": int(row["id"]),
+        "title": str(row["title"] or ""),
+        "kind": str(row["kind"] or ""),
+        "spec": _load(row["spec"]),
+        "enabled": bool(row["enabled"]),
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+class SqliteStorage(Storage):
+    """Storage backed by a local SQLite database (DATABASE_URL=sqlite:///path.db).
+
+    Same tables and return shapes as the Postgres path, with JSON columns
+    stored as text and timestamps as UTC ISO-8601 text. All queries run on
+    one dedicated thread (SqliteWorker, WAL journal), so the IOLoop never
+    blocks on disk and there is no row cap like the JSON fallback's.
+
+    The config cache is always on: the database is assumed to be written
+    by this process only (single-node), so set_config() is the only
+    invalidation needed.
+    """
+
+    def __init__(self, database_url: str, runtime_dir: Path):
+        super().__init__(database_url="", runtime_dir=runtime_dir)
+        self._database_url = database_url
+        self.db_path = sqlite_path_from_url(database_url, runtime_dir)
+        self._worker: SqliteWorker | None = None
+
+    async def start(self) -> None:
+        self._runtime_dir.mkdir(parents=True, exist_ok=True)
+        self._worker = SqliteWorker(self.db_path, name="storage")
+
+    def _db(self) -> SqliteWorker:
+        if self._worker is None:
+            raise RuntimeError("sqlite storage is not started")
+        return self._worker
+
+    def _config_cacheable(self) -> bool:
+        return self._worker is not None
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.close()
+            self._worker = None
+
+    async def ensure_schema(self, schema_sql: str) -> None:
+        # schema.sql is Postgres DDL; apply its SQLite translation instead.
+        def _apply(conn: sqlite3.Connection) -> None:
+            conn.executescript(_SCHEMA)
+            # Databases created before outbox ingest keys existed.
+            if "ingest_key" not in {r["name"] for r in conn.execute("PRAGMA table_info(outbox_messages)")}:
+                conn.execute("ALTER TABLE outbox_messages ADD COLUMN ingest_key TEXT")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS outbox_messages_ingest_key_idx ON outbox_messages(ingest_key)")
+
+        await self._db().run(_apply)
+
+    # Raw helpers take SQLite SQL with `?` placeholders and return plain dicts.
+
+    async def execute(self, sql: str, *args: Any) -> str:
+        def _run(conn: sqlite3.Connection) -> str:
+            with conn:
+                cur = conn.execute(sql, args)
+            return f"OK {cur.rowcount}"
+
+        return await self._db().run(_run)
+
+    async def fetch(self, sql: str, *args: Any) -> list[dict[str, Any]]:  # type: ignore[override]
+        return await self._db().run(lambda conn: [dict(r) for r in conn.execute(sql, args)])
+
+    async def fetchrow(self, sql: str, *args: Any) -> dict[str, Any] | None:  # type: ignore[override]
+        def _run(conn: sqlite3.Connection) -> dict[str, Any] | None:
+            row = conn.execute(sql, args).fetchone()
+            return dict(row) if row is not None else None
+
+        return await self._db().run(_run)
+
+    async def fetchval(self, sql: str, *args: Any) -> Any:
+        def _run(conn: sqlite3.Connection) -> Any:
+            row = conn.execute(sql, args).fetchone()
+            return row[0] if row is not None else None
+
+        return await self._db().run(_run)
+
+    async def get_server_time_iso(self) -> str:
+        await self.fetchval("select 1")
+        return _now()
+
+    async def get_config(self) -> dict[str, Any]:
+        cached = self._cached_config()
+        if cached is not None:
+            return cached
+        gen = self._config_gen
+        rows = await self.fetch("select key, value from app_config")
+        cfg = {r["key"]: _load(r["value"]) for r in rows}
+        self._store_config(gen, cfg)
+        return cfg
+
+    async def set_config(self, key: str, value: Any) -> None:
+        await self.execute(
+            "insert into app_config(key, value, updated_at) values(?, ?, ?) "
+            "on conflict(key) do update set value=excluded.value, updated_at=excluded.updated_at",
+            key,
+            _dump(value),
+            _now(),
+        )
+        self._invalidate_config()
+
+    async def get_workspace_config(self, workspace: str) -> dict[str, Any] | None:
+        ws = str(workspace or "").strip()
+        if not ws:
+            return None
+        row = await self.fetchrow("select workspace, config, updated_at from workspace_configs where workspace=?", ws)
+        if not row:
+            return None
+        return {"workspace": str(row["workspace"] or ""), "config": _load(row["config"]), "updated_at": row["updated_at"]}
+
+    async def upsert_workspace_config(self, workspace: str, config: dict[str, Any]) -> dict[str, Any]:
+        ws = str(workspace or "").strip()
+        if not ws:
+            raise ValueError("workspace is required")
+        now = _now()
+        await self.execute(
+            "insert into workspace_configs(workspace, config, updated_at) values(?, ?, ?) "
+            "on conflict(workspace) do update set config=excluded.config, updated_at=excluded.updated_at",
+            ws,
+            _dump(config),
+            now,
+        )
+        return {"workspace": ws, "config": config, "updated_at": now}
+
+    async def create_pipeline_script(
+        self,
+        *,
+        title: str,
+        script_text: str,
+        script_version: int = 1,
+        script_format: str = "aaps",
+        ir: Any = None,
+    ) -> dict[str, Any]:
+        now = _now()
+
+        def _run(conn: sqlite3.Connection) -> dict[str, Any]:
+            with conn:
+                cur = conn.execute(
+                    "insert into pipeline_scripts(title, script_text, script_version, script_format, ir, created_at, updated_at) "
+                    "values(?, ?, ?, ?, ?, ?, ?)",
+                    (title, script_text, int(script_version), str(script_format), _dump(ir), now, now),
+                )
+            row = conn.execute(f"select {_SCRIPT_COLUMNS} from pipeline_scripts where id=?", (cur.lastrowid,)).fetchone()
+            return _script(row)
+
+        return await self._db().run(_run)
+
+    async def get_pipeline_script(self, script_id: int) -> dict[str, Any] | None:
+        def _run(conn: sqlite3.Connection) -> dict[str, Any] | None:
+            row = conn.execute(f"select {_SCRIPT_COLUMNS} from pipeline_scripts where id=?", (int(script_id),)).fetchone()
+            return _script(row) if row is not None else None
+
+        return await self._db().run(_run)
+
+    async def list_pipeline_scripts(self, limit: int = 50) -> list[dict[str, Any]]:
+        lim = max(1, min(200, int(limit)))
+        rows = await self.fetch(
+            "select id, title, script_version, script_format, created_at, updated_at "
+            "from pipeline_scripts order by id desc limit ?",
+            lim,
+        )
+        items = [
+            {
+                "id": int(r["id"]),
+                "title": str(r["title"] or ""),
+                "script_version": int(r["script_version"] or 1),
+                "script_format": str(r["script_format"] or "aaps"),
+                "created_at": r["created_at"],
+                "updated_at": r["updated_at"],
+            }
+            for r in rows
+        ]
+        items.reverse()
+        return items
+
+    async def update_pipeline_script(
+        self,
+        script_id: int,
+        *,
+        title: str | None = None,
+        script_text: str | None = None,
+        script_version: int | None = None,
+        script_format: str | None = None,
+        ir: Any = None,
+        ir_set: bool = False,
+    ) -> dict[str, Any] | None:
+        def _run(conn: sqlite3.Connection) -> dict[str, Any] | None:
+            # Read-modify-write in one transaction on the worker thread.
+            with conn:
+                row = conn.execute(f"select {_SCRIPT_COLUMNS} from pipeline_scripts where id=?", (int(script_id),)).fetchone()
+                if row is None:
+                    return None
+                cur = _script(row)
+                conn.execute(
+                    "update pipeline_scripts set title=?, script_text=?, script_version=?, script_format=?, ir=?, updated_at=? "
+                    "where id=?",
+                    (
+                        str((cur["title"] if title is None else title) or ""),
+                        str((cur["script_text"] if script_text is None else script_text) or ""),
+                        int((cur["script_version"] if script_version is None else script_version) or 1),
+                        str((cur["script_format"] if script_format is None else script_format) or "aaps"),
+                        _dump(ir if ir_set else cur["ir"]),
+                        _now(),
+                        int(script_id),
+                    ),
+                )
+                row = conn.execute(f"select {_SCRIPT_COLUMNS} from pipeline_scripts where id=?", (int(script_id),)).fetchone()
+            return _script(row)
+
+        return await self._db().run(_run)
+
+    async def delete_pipeline_script(self, script_id: int) -> bool:
+        res = await self.execute("delete from pipeline_scripts where id=?", int(script_id))
+        return res == "OK 1"
+
+    async def create_action_definition(
+        self,
+        *,
+        title: str,
+        kind: str,
+        spec: Any,
+        enabled: bool = True,
+    ) -> dict[str, Any]:
+        now = _now()
+
+        def _run(conn: sqlite3.Connection) -> dict[str, Any]:
+            with conn:
+                cur = conn.execute(
+                    "insert into action_definitions(title, kind, spec, enabled, created_at, updated_at) values(?, ?, ?, ?, ?, ?)",
+                    (str(title or ""), str(kind or ""), _dump(spec), int(bool(enabled)), now, now),
+                )
+            row = conn.execute(f"select {_ACTION_COLUMNS} from action_definitions where id=?", (cur.lastrowid,)).fetchone()
+            return _action(row)
+
+        return await self._db().run(_run)
+
+    async def get_action_definition(self, action_id: int) -> dict[str, Any] | None:
+        def _run(conn: sqlite3.Connection) -> dict[str, Any] | None:
+            row = conn.execute(f"select {_ACTION_COLUMNS} from action_definitions where id=?", (int(action_id),)).fetchone()
+            return _action(row) if row is not None else None
+
+        return await self._db().run(_run)
+
+    async def list_action_definitions(self, limit: int = 50) -> list[dict[str, Any]]:
+        lim = max(1, min(200, int(limit)))
+        rows = await self.fetch(
+            "select id, title, kind, enabled, created_at, updated_at from action_definitions order by id desc limit ?",
+            lim,
+        )
+        items = [
+            {
+                "id": int(r["id"]),
+                "title": str(r["title"] or ""),
+                "kind": str(r["kind"] or ""),
+                "enabled": bool(r["enabled"]),
+                "created_at": r["created_at"],
+                "updated_at": r["updated_at"],
+            }
+            for r in rows
+        ]
+        items.reverse()
+        return items
+
+    async def update_action_definition(
+        self,
+        action_id: int,
+        *,
+        title: str | None = None,
+        spec: Any = None,
+        spec_set: bool = False,
+        enabled: bool | None = None,
+        kind: str | None = None,
+    ) -> dict[str, Any] | None:
+        def _run(conn: sqlite3.Connection) -> dict[str, Any] | None:
+            with conn:
+                row = conn.execute(f"select {_ACTION_COLUMNS} from action_definitions where id=?", (int(action_id),)).fetchone()
+                if row is None:
+                    return None
+                cur = _action(row)
+                conn.execute(
+                    "update action_definitions set title=?, kind=?, spec=?, enabled=?, updated_at=? where id=?",
+                    (
+                        cur["title"] if title is None else str(title),
+                        cur["kind"] if kind is None else str(kind),
+                        _dump(spec if spec_set else cur["spec"]),
+                        int(cur["enabled"] if enabled is None else bool(enabled)),
+                        _now(),
+                        int(action_id),
+                    ),
+                )
+                row = conn.execute(f"select {_ACTION_COLUMNS} from action_definitions where id=?", (int(action_id),)).fetchone()
+            return _action(row)
+
+        return await self._db().run(_run)
+
+    async def delete_action_definition(self, action_id: int) -> bool:
+        res = await self.execute("delete from action_definitions where id=?", int(action_id))
+        return res == "OK 1"
+
+    async def _add_message(self, table: str, role: str, content: str) -> None:
+        await self.execute(f"insert into {table}(role, content, created_at) values(?, ?, ?)", role, content, _now())
+
+    async def _list_messages(self, table: str, limit: int) -> list[dict[str, Any]]:
+        lim = max(1, min(500, int(limit)))
+        rows = await self.fetch(f"select id, role, content, created_at from {table} order by id desc limit ?", lim)
+        rows.reverse()
+        return rows
+
+    async def add_chat_message(self, role: str, content: str) -> None:
+        await self._add_message("chat_messages", role, content)
+
+    async def add_inbox_message(self, role: str, content: str) -> None:
+        await self._add_message("inbox_messages", role, content)
+
+    async def add_outbox_message(self, role: str, content: str) -> None:
+        await self._add_message("outbox_messages", role, content)
+
+    async def add_outbox_messages(self, items: list[tuple[str, str, str]]) -> set[str]:
+        if not items:
+            return set()
+        now = _now()
+
+        def _run(conn: sqlite3.Connection) -> set[str]:
+            inserted: set[str] = set()
+            with conn:
+                for role, content, key in items:
+                    cur = conn.execute(
+                        "insert into outbox_messages(role, content, created_at, ingest_key) values(?, ?, ?, ?) "
+                        "on conflict(ingest_key) do nothing",
+                        (role, content, now, key),
+                    )
+                    if cur.rowcount:
+                        inserted.add(key)
+            return inserted
+
+        return await self._db().run(_run)
+
+    async def list_chat_messages(self, limit: int = 50) -> list[dict[str, Any]]:
+        return await self._list_messages("chat_messages", limit)
+
+    async def list_inbox_messages(self, limit: int = 50) -> list[dict[str, Any]]:
+        return await self._list_messages("inbox_messages", limit)
+
+    async def list_outbox_messages(self, limit: int = 50) -> list[dict[str, Any]]:
+        return await self._list_messages("outbox_messages", limit)
+
+    async def create_run(self, script: str, cwd: str, args: list[str], pid: Optional[int]) -> int:
+        def _run(conn: sqlite3.Connection) -> int:
+            with conn:
+                cur = conn.execute(
+                    "insert into pipeline_runs(status, pid, started_at, script, cwd, args) values(?, ?, ?, ?, ?, ?)",
+                    ("running", pid, _now(), script, cwd, _dump(args)),
+                )
+            return int(cur.lastrowid)
+
+        return await self._db().run(_run)
+
+    async def set_run_status(self, run_id: int, status: str, pid: Optional[int] = None) -> None:
+        if status in ("stopped", "failed", "completed"):
+            await self.execute(
+                "update pipeline_runs set status=?, pid=?, stopped_at=? where id=?", status, pid, _now(), run_id
+            )
+        else:
+            await self.execute("update pipeline_runs set status=?, pid=? where id=?", status, pid, run_id)
+
+    async def get_latest_status(self) -> PipelineStatus:
+        row = await self.fetchrow("select id, status, pid from pipeline_runs order by id desc limit 1")
+        if not row:
+            return PipelineStatus(running=False, status="idle")
+        st = str(row["status"] or "idle")
+        return PipelineStatus(running=(st == "running"), pid=row["pid"], run_id=int(row["id"]), status=st)
+
+    async def get_pipeline_state(self) -> dict[str, Any]:
+        row = await self.fetchrow(
+            "select state, pid, run_id, started_at, paused_at, resumed_at, stopped_at, updated_at "
+            "from pipeline_state where id=1"
+        )
+        if not row:
+            return {"state": "stopped"}
+        row["state"] = str(row["state"])
+        return row
+
+    async def set_pipeline_state(
+        self,
+        *,
+        state: str,
+        pid: Optional[int],
+        run_id: Optional[int],
+        ts_kind: str,
+    ) -> None:
+        """Update the singleton pipeline_state row (id=1), with the same timestamp rules as Postgres."""
+        col = _TS_COLUMNS.get(ts_kind)
+        if col is None:
+            raise ValueError("invalid ts_kind")
+        # Columns cleared alongside the one being set.
+        cleared = {
+            "start": ("paused_at", "resumed_at", "stopped_at"),
+            "resume": ("stopped_at",),
+        }.get(ts_kind, ())
+        now = _now()
+        sets = ", ".join([f"{col}=excluded.{col}"] + [f"{c}=null" for c in cleared])
+        await self.execute(
+            f"insert into pipeline_state(id, state, pid, run_id, {col}, updated_at) values (1, ?, ?, ?, ?, ?) "
+            f"on conflict (id) do update set state=excluded.state, pid=excluded.pid, run_id=excluded.run_id, "
+            f"{sets}, updated_at=excluded.updated_at",
+            state,
+            pid,
+            run_id,
+            now,
+            now,
+        )
@@ -0,0 +1,67 @@
+import asyncio
+import concurrent.futures
+import sqlite3
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+
+def fts5_available() -> bool:
+    try:
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    return True
+
+
+class SqliteWorker:
+    """One SQLite connection owned by one dedicated thread.
+
+    sqlite3 connections must not be shared across threads, and running
+    queries inline would block the IOLoop, so callers submit functions that
+    receive the connection: `await worker.run(fn, *args)`. Calls are
+    serialized, which also serializes writers.
+    """
+
+    def __init__(self, path: Path, *, name: str = "sqlite"):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._conn: sqlite3.Connection | None = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn = conn
+        return self._conn
+
+    def _call(self, fn: Callable[..., T], *args: Any) -> T:
+        return fn(self._connection(), *args)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, *args)
+
+    def run_sync(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run on the worker thread and block for the result (startup/scripts only)."""
+        return self._executor.submit(self._call, fn, *args).result()
+
+    def close(self) -> None:
+        def _close(_conn: sqlite3.Connection) -> None:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        try:
+            self.run_sync(_close)
+        finally:
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,152 @@
+import copy
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+
+class StateWal:
+    """Fallback state store: an in-memory dict, a snapshot, and an append-only op log.
+
+    runtime/state.json is the snapshot (same shape as before, so existing
+    files load unchanged) and runtime/state.wal holds one JSON op per line
+    applied since. Every mutation is a single appended line; once the log
+    passes `compact_ops` lines or `compact_bytes`, the snapshot is rewritten
+    and the log truncated. Ops carry an increasing `seq` and the snapshot
+    records the last one it contains (`_wal_seq`), so ops left in the log by
+    a crash between those two steps are not applied twice. A torn last line
+    (crash mid-write) is skipped on replay and dropped by the compaction
+    that follows every load.
+
+    Ops:
+      {"op": "set", "key": k, "value": v}                  state[k] = v
+      {"op": "set_in", "key": k, "field": f, "value": v}   state[k][f] = v
+      {"op": "append", "key": k, "item": it, "cap": n}     state[k].append(it), keep last n
+      {"op": "put", "key": k, "item": it, "cap": n}        replace the list item with it["id"], else append
+      {"op": "delete", "key": k, "id": i}                  drop the list item with that id
+    """
+
+    def __init__(self, snapshot_path: Path, *, compact_ops: int = 1000, compact_bytes: int = 4 * 1024 * 1024, fsync: bool = False):
+        self.snapshot_path = snapshot_path
+        self.wal_path = snapshot_path.with_suffix(".wal")
+        self.compact_ops = max(1, int(compact_ops))
+        self.compact_bytes = max(1024, int(compact_bytes))
+        self.fsync = fsync
+        self.state: dict[str, Any] = {}
+        self._ops = 0
+        self._bytes = 0
+        self._seq = 0
+        self._loaded = False
+
+    def load(self) -> dict[str, Any]:
+        if self._loaded:
+            return self.state
+        state: Any = {}
+        try:
+            state = json.loads(self.snapshot_path.read_text("utf-8"))
+        except FileNotFoundError:
+            pass
+        except Exception:
+            state = {}
+        self.state = state if isinstance(state, dict) else {}
+        seq = self.state.pop("_wal_seq", 0)
+        self._seq = seq if isinstance(seq, int) else 0
+        try:
+            with self.wal_path.open("rb") as f:
+                for raw in f:
+                    try:
+                        op = json.loads(raw)
+                    except Exception:
+                        continue
+                    if not isinstance(op, dict):
+                        continue
+                    op_seq = op.get("seq")
+                    if isinstance(op_seq, int):
+                        if op_seq <= self._seq:
+                            # Already in the snapshot (crash after it was written, before the log was removed).
+                            continue
+                        self._seq = op_seq
+                    self._apply(op)
+            has_log = True
+        except FileNotFoundError:
+            has_log = False
+        self._loaded = True
+        if has_log:
+            # Fold the log into the snapshot: the next start is a single read, and a torn
+            # last line is gone before anything is appended after it.
+            self.compact()
+        return self.state
+
+    @property
+    def dirty(self) -> bool:
+        """True if the log holds ops not yet folded into the snapshot."""
+        return self._ops > 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Deep copy of a top-level value, safe for callers to keep or mutate."""
+        self.load()
+        return copy.deepcopy(self.state.get(key, default))
+
+    # --- mutation ----------------------------------------------------------
+
+    def _apply(self, op: dict[str, Any]) -> None:
+        kind = op.get("op")
+        key = str(op.get("key") or "")
+        st = self.state
+        if kind == "set":
+            st[key] = op.get("value")
+        elif kind == "set_in":
+            cur = st.get(key)
+            if not isinstance(cur, dict):
+                cur = st[key] = {}
+            cur[str(op.get("field"))] = op.get("value")
+        elif kind in ("append", "put", "delete"):
+            items = st.get(key)
+            if not isinstance(items, list):
+                items = st[key] = []
+            if kind == "delete":
+                st[key] = [it for it in items if not (isinstance(it, dict) and it.get("id") == op.get("id"))]
+                return
+            item = op.get("item")
+            if kind == "put" and isinstance(item, dict):
+                for i, it in enumerate(items):
+                    if isinstance(it, dict) and it.get("id") == item.get("id"):
+                        items[i] = item
+                        return
+            items.append(item)
+            cap = op.get("cap")
+            if isinstance(cap, int) and len(items) > cap:
+                del items[: len(items) - cap]
+
+    def apply(self, op: dict[str, Any]) -> None:
+        """Log one op (a single append) and apply it to the in-memory state."""
+        self.load()
+        op = {**op, "seq": self._seq + 1}
+        line = (json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        self.wal_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.wal_path.open("ab") as f:
+            f.write(line)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self._seq = op["seq"]
+        self._apply(copy.deepcopy(op))
+        self._ops += 1
+        self._bytes += len(line)
+        if self._ops >= self.compact_ops or self._bytes >= self.compact_bytes:
+            self.compact()
+
+    def compact(self) -> None:
+        """Write the current state as the snapshot and start an empty log."""
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.snapshot_path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({**self.state, "_wal_seq": self._seq}, f, ensure_ascii=False, separators=(",", ":"))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        tmp.replace(self.snapshot_path)
+        # Everything logged is in the snapshot now; if this unlink is lost, `seq` skips the ops on replay.
+        self.wal_path.unlink(missing_ok=True)
+        self._ops = 0
+        self._bytes = 0
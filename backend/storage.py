@@ -1,12 +1,25 @@
+import asyncio
+import copy
 import datetime
 import json
 import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 import asyncpg
 
+from .state_wal import StateWal
+
+
+# NOTIFY channels fed by the triggers in schema.sql.
+CONFIG_CHANNEL = "autoappdev_app_config"  # payload: the changed key
+PIPELINE_STATE_CHANNEL = "autoappdev_pipeline_state"  # payload: the pipeline_state row
+PIPELINE_RUNS_CHANNEL = "autoappdev_pipeline_runs"  # payload: {id, status, pid}
+MESSAGES_CHANNEL = "autoappdev_messages"  # payload: {table, id, role, content (first 1000 chars)}
+
+_PIPELINE_STATE_COLUMNS = "state, pid, run_id, started_at, paused_at, resumed_at, stopped_at, updated_at"
+
 
 @dataclass
 class PipelineStatus:
@@ -16,10 +29,55 @@ class PipelineStatus:
     status: str = "idle"
 
 
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    # Callers pass and expect Python objects for json/jsonb columns (as the
+    # SQLite and JSON fallback backends do), not pre-encoded strings.
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(typename, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+def _iso(v: Any) -> Any:
+    if v is None:
+        return None
+    if isinstance(v, str):
+        # NOTIFY payloads render timestamps in the sender's TimeZone; normalize to UTC like asyncpg rows.
+        try:
+            v = datetime.datetime.fromisoformat(v)
+        except ValueError:
+            return v
+    try:
+        if v.tzinfo is not None:
+            v = v.astimezone(datetime.timezone.utc)
+        return v.isoformat()
+    except Exception:
+        return str(v)
+
+
+def _pipeline_state_row(row: Any) -> dict[str, Any]:
+    return {
+        "state": str(row["state"]),
+        "pid": row["pid"],
+        "run_id": row["run_id"],
+        "started_at": _iso(row["started_at"]),
+        "paused_at": _iso(row["paused_at"]),
+        "resumed_at": _iso(row["resumed_at"]),
+        "stopped_at": _iso(row["stopped_at"]),
+        "updated_at": _iso(row["updated_at"]),
+    }
+
+
 class Storage:
     """
     Storage with Postgres-first behavior.
-    Falls back to a local JSON file if Postgres is unavailable.
+    Falls back to runtime/state.json plus an append-only op log
+    (runtime/state.wal, see StateWal) if Postgres is unavailable.
+
+    With Postgres, one dedicated connection LISTENs on the channels fed by
+    the schema.sql triggers and fans notifications out to subscribers
+    (`subscribe`). While it is up, config, the pipeline_state row and the
+    latest run are served from memory, kept current by those
+    notifications (from any process) and by this process's own writes;
+    while it is down every call queries.
     """
 
     def __init__(self, database_url: str, runtime_dir: Path):
@@ -28,18 +86,155 @@ class Storage:
         self._pool: Optional[asyncpg.Pool] = None
         self._database_error = ""
         self._state_path = runtime_dir / "state.json"
+        self._state = StateWal(
+            self._state_path,
+            fsync=os.environ.get("AUTOAPPDEV_STATE_FSYNC", "0").strip() == "1",
+        )
+        self._config_cache: dict[str, Any] | None = None
+        self._config_gen = 0
+        self._listen_conn: asyncpg.Connection | None = None
+        self._listen_task: asyncio.Task[None] | None = None
+        self._stopping = False
+        self._pipeline_state: dict[str, Any] | None = None
+        self._latest_run: dict[str, Any] | None = None
+        self._runs_gen = 0
+        self._pool_pids: set[int] = set()
+        self._channels: dict[str, list[Callable[[Any, bool], None]]] = {
+            CONFIG_CHANNEL: [lambda _key, _local: self._invalidate_config()],
+            PIPELINE_STATE_CHANNEL: [lambda row, _local: self._apply_pipeline_state(row)],
+            PIPELINE_RUNS_CHANNEL: [lambda run, _local: self._apply_run(run)],
+            MESSAGES_CHANNEL: [],
+        }
 
     async def start(self) -> None:
         self._runtime_dir.mkdir(parents=True, exist_ok=True)
         if not self._database_url:
+            self._state.load()
             return
         try:
-            self._pool = await asyncpg.create_pool(dsn=self._database_url, min_size=1, max_size=5, timeout=2.0)
+            self._pool = await asyncpg.create_pool(
+                dsn=self._database_url, min_size=1, max_size=5, timeout=2.0, init=self._init_pool_connection
+            )
         except Exception as e:
             self._pool = None
             self._database_error = (
                 f"failed to create Postgres pool (DATABASE_URL is set): {type(e).__name__}: {e}"
             )
+            return
+        if not await self._listen():
+            self._listen_task = asyncio.ensure_future(self._relisten())
+
+    # --- LISTEN/NOTIFY -----------------------------------------------------
+
+    async def _init_pool_connection(self, conn: asyncpg.Connection) -> None:
+        await _init_connection(conn)
+        # Notifications from these backends are this process's own writes. A closed
+        # connection's pid is dropped, since the server may hand it to another client.
+        pid = conn.get_server_pid()
+        self._pool_pids.add(pid)
+        conn.add_termination_listener(lambda _conn: self._pool_pids.discard(pid))
+
+    @property
+    def change_feed_live(self) -> bool:
+        return self._listen_conn is not None
+
+    def subscribe(self, channel: str, callback: Callable[[Any, bool], None]) -> None:
+        """Call `callback(payload, local)` for each NOTIFY on `channel` (one of the *_CHANNEL constants).
+
+        `local` is True when the change was written through this Storage.
+        Callbacks run on the IOLoop and must not block.
+        """
+        if channel not in self._channels:
+            raise ValueError(f"unknown channel: {channel}")
+        self._channels[channel].append(callback)
+
+    async def _listen(self) -> bool:
+        conn = None
+        try:
+            conn = await asyncpg.connect(dsn=self._database_url, timeout=2.0)
+            for channel in self._channels:
+                await conn.add_listener(channel, self._dispatch)
+        except Exception:
+            if conn is not None:
+                try:
+                    await conn.close()
+                except Exception:
+                    pass
+            return False
+        conn.add_termination_listener(self._on_listen_lost)
+        self._listen_conn = conn
+        return True
+
+    def _dispatch(self, _conn: Any, pid: int, channel: str, payload: str) -> None:
+        data: Any = payload
+        if channel != CONFIG_CHANNEL:
+            try:
+                data = json.loads(payload)
+            except Exception:
+                return
+        local = pid in self._pool_pids
+        for callback in self._channels.get(channel, ()):
+            try:
+                callback(data, local)
+            except Exception:
+                pass
+
+    def _on_listen_lost(self, _conn: Any) -> None:
+        self._listen_conn = None
+        # Notifications are lost while disconnected, so nothing cached can be trusted.
+        self._invalidate_config()
+        self._pipeline_state = None
+        self._latest_run = None
+        self._runs_gen += 1
+        if not self._stopping and self._listen_task is None:
+            self._listen_task = asyncio.ensure_future(self._relisten())
+
+    async def _relisten(self) -> None:
+        delay = 1.0
+        try:
+            while not self._stopping and self._listen_conn is None:
+                await asyncio.sleep(delay)
+                if await self._listen():
+                    return
+                delay = min(30.0, delay * 2)
+        finally:
+            self._listen_task = None
+
+    # --- config cache ------------------------------------------------------
+
+    def _config_cacheable(self) -> bool:
+        return self._listen_conn is not None
+
+    def _invalidate_config(self) -> None:
+        self._config_gen += 1
+        self._config_cache = None
+
+    def _cached_config(self) -> dict[str, Any] | None:
+        if self._config_cache is None or not self._config_cacheable():
+            return None
+        return dict(self._config_cache)
+
+    def _store_config(self, gen: int, cfg: dict[str, Any]) -> None:
+        # A change seen while the query was in flight makes its result stale.
+        if gen == self._config_gen and self._config_cacheable():
+            self._config_cache = dict(cfg)
+
+    # --- hot pipeline state ------------------------------------------------
+
+    def _apply_pipeline_state(self, row: dict[str, Any]) -> None:
+        ps = _pipeline_state_row(row)
+        cur = self._pipeline_state
+        # Notifications and RETURNING rows can arrive out of order; never go back in time.
+        if cur is not None and str(ps["updated_at"] or "") < str(cur["updated_at"] or ""):
+            return
+        self._pipeline_state = ps
+
+    def _apply_run(self, run: dict[str, Any]) -> None:
+        self._runs_gen += 1
+        cur = self._latest_run
+        # Without a known latest run, an update could be to an older one; leave it to the next query.
+        if cur is not None and int(run["id"]) >= int(cur["id"]):
+            self._latest_run = {"id": int(run["id"]), "status": str(run.get("status") or "idle"), "pid": run.get("pid")}
 
     @property
     def database_error(self) -> str:
@@ -79,35 +274,60 @@ class Storage:
             return str(v)
 
     async def stop(self) -> None:
+        self._stopping = True
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            self._listen_task = None
+        if self._listen_conn is not None:
+            conn, self._listen_conn = self._listen_conn, None
+            conn.remove_termination_listener(self._on_listen_lost)
+            try:
+                await conn.close()
+            except Exception:
+                pass
         if self._pool:
             await self._pool.close()
             self._pool = None
+        elif self._state.dirty:
+            self._state.compact()
 
     async def ensure_schema(self, schema_sql: str) -> None:
         if not self._pool:
             return
         await self.execute(schema_sql)
 
-    def _read_state(self) -> dict[str, Any]:
-        if not self._state_path.exists():
-            return {}
-        try:
-            return json.loads(self._state_path.read_text("utf-8"))
-        except Exception:
-            return {}
+    def _state_list(self, key: str) -> list[Any]:
+        """Live (uncopied) list from the fallback state; callers copy what they return."""
+        items = self._state.load().get(key)
+        return items if isinstance(items, list) else []
+
+    def _state_find(self, key: str, item_id: Any) -> dict[str, Any] | None:
+        for it in self._state_list(key):
+            if isinstance(it, dict) and it.get("id") == item_id:
+                return it
+        return None
 
-    def _write_state(self, obj: dict[str, Any]) -> None:
-        tmp = self._state_path.with_suffix(".tmp")
-        tmp.write_text(json.dumps(obj, ensure_ascii=False, indent=2), "utf-8")
-        tmp.replace(self._state_path)
+    def _state_next_id(self, key: str) -> int:
+        next_id = 1
+        for it in self._state_list(key):
+            if isinstance(it, dict) and isinstance(it.get("id"), int):
+                next_id = max(next_id, int(it.get("id")) + 1)
+        return next_id
 
     async def get_config(self) -> dict[str, Any]:
+        """All app_config values; the returned dict is a copy, its values are shared (read-only)."""
         if self._pool:
+            cached = self._cached_config()
+            if cached is not None:
+                return cached
+            gen = self._config_gen
             async with self._pool.acquire() as conn:
                 rows = await conn.fetch("select key, value from app_config")
-                return {r["key"]: r["value"] for r in rows}
-        st = self._read_state()
-        return st.get("config", {}) if isinstance(st.get("config", {}), dict) else {}
+            cfg = {r["key"]: r["value"] for r in rows}
+            self._store_config(gen, cfg)
+            return cfg
+        cfg = self._state.get("config", {})
+        return cfg if isinstance(cfg, dict) else {}
 
     async def set_config(self, key: str, value: Any) -> None:
         if self._pool:
@@ -118,11 +338,9 @@ class Storage:
                     key,
                     value,
                 )
+            self._invalidate_config()
             return
-        st = self._read_state()
-        st.setdefault("config", {})
-        st["config"][key] = value
-        self._write_state(st)
+        self._state.apply({"op": "set_in", "key": "config", "field": key, "value": value})
 
     async def get_workspace_config(self, workspace: str) -> dict[str, Any] | None:
         ws = str(workspace or "").strip()
@@ -141,11 +359,10 @@ class Storage:
                     "config": row["config"],
                     "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
                 }
-        st = self._read_state()
-        items = st.get("workspace_configs", {})
+        items = self._state.load().get("workspace_configs", {})
         if not isinstance(items, dict):
             return None
-        rec = items.get(ws)
+        rec = copy.deepcopy(items.get(ws))
         if not isinstance(rec, dict):
             return None
         return {
@@ -173,13 +390,8 @@ class Storage:
                     "config": row["config"],
                     "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
                 }
-        st = self._read_state()
-        st.setdefault("workspace_configs", {})
-        items = st["workspace_configs"] if isinstance(st.get("workspace_configs"), dict) else {}
         now = datetime.datetime.now(datetime.timezone.utc).isoformat()
-        items[ws] = {"config": config, "updated_at": now}
-        st["workspace_configs"] = items
-        self._write_state(st)
+        self._state.apply({"op": "set_in", "key": "workspace_configs", "field": ws, "value": {"config": config, "updated_at": now}})
         return {"workspace": ws, "config": config, "updated_at": now}
 
     async def create_pipeline_script(
@@ -215,13 +427,7 @@ class Storage:
                     "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
                 }
 
-        st = self._read_state()
-        st.setdefault("scripts", [])
-        items = st["scripts"] if isinstance(st.get("scripts"), list) else []
-        next_id = 1
-        for it in items:
-            if isinstance(it, dict) and isinstance(it.get("id"), int):
-                next_id = max(next_id, int(it.get("id")) + 1)
+        next_id = self._state_next_id("scripts")
         now = datetime.datetime.now(datetime.timezone.utc).isoformat()
         obj = {
             "id": next_id,
@@ -233,9 +439,7 @@ class Storage:
             "created_at": now,
             "updated_at": now,
         }
-        items.append(obj)
-        st["scripts"] = items[-200:]
-        self._write_state(st)
+        self._state.apply({"op": "append", "key": "scripts", "item": obj, "cap": 200})
         return obj
 
     async def get_pipeline_script(self, script_id: int) -> dict[str, Any] | None:
@@ -259,14 +463,7 @@ class Storage:
                     "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
                 }
 
-        st = self._read_state()
-        items = st.get("scripts", [])
-        if not isinstance(items, list):
-            return None
-        for it in items:
-            if isinstance(it, dict) and it.get("id") == script_id:
-                return it
-        return None
+        return copy.deepcopy(self._state_find("scripts", script_id))
 
     async def list_pipeline_scripts(self, limit: int = 50) -> list[dict[str, Any]]:
         lim = max(1, min(200, int(limit)))
@@ -291,12 +488,8 @@ class Storage:
                 items.reverse()
                 return items
 
-        st = self._read_state()
-        items = st.get("scripts", [])
-        if not isinstance(items, list):
-            return []
         # Return most-recent first, similar to DB list.
-        out = items[-lim:]
+        out = copy.deepcopy(self._state_list("scripts")[-lim:])
         out.reverse()
         return out
 
@@ -346,22 +539,19 @@ class Storage:
                     "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
                 }
 
-        st = self._read_state()
-        items = st.get("scripts", [])
-        if not isinstance(items, list):
+        if self._state_find("scripts", script_id) is None:
             return None
-        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
-        for it in items:
-            if isinstance(it, dict) and it.get("id") == script_id:
-                it["title"] = str(next_title or "")
-                it["script_text"] = str(next_text or "")
-                it["script_version"] = int(next_ver or 1)
-                it["script_format"] = str(next_fmt or "aaps")
-                it["ir"] = next_ir
-                it["updated_at"] = now
-                self._write_state(st)
-                return it
-        return None
+        obj = {
+            **cur,
+            "title": str(next_title or ""),
+            "script_text": str(next_text or ""),
+            "script_version": int(next_ver or 1),
+            "script_format": str(next_fmt or "aaps"),
+            "ir": next_ir,
+            "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        self._state.apply({"op": "put", "key": "scripts", "item": obj, "cap": 200})
+        return obj
 
     async def delete_pipeline_script(self, script_id: int) -> bool:
         if self._pool:
@@ -370,15 +560,10 @@ class Storage:
                 # res is like: "DELETE 1"
                 return "DELETE 1" in str(res)
 
-        st = self._read_state()
-        items = st.get("scripts", [])
-        if not isinstance(items, list):
+        if self._state_find("scripts", script_id) is None:
             return False
-        before = len(items)
-        items = [it for it in items if not (isinstance(it, dict) and it.get("id") == script_id)]
-        st["scripts"] = items
-        self._write_state(st)
-        return len(items) != before
+        self._state.apply({"op": "delete", "key": "scripts", "id": script_id})
+        return True
 
     async def create_action_definition(
         self,
@@ -409,13 +594,7 @@ class Storage:
                     "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
                 }
 
-        st = self._read_state()
-        st.setdefault("actions", [])
-        items = st["actions"] if isinstance(st.get("actions"), list) else []
-        next_id = 1
-        for it in items:
-            if isinstance(it, dict) and isinstance(it.get("id"), int):
-                next_id = max(next_id, int(it.get("id")) + 1)
+        next_id = self._state_next_id("actions")
         now = datetime.datetime.now(datetime.timezone.utc).isoformat()
         obj = {
             "id": next_id,
@@ -426,9 +605,7 @@ class Storage:
             "created_at": now,
             "updated_at": now,
         }
-        items.append(obj)
-        st["actions"] = items[-200:]
-        self._write_state(st)
+        self._state.apply({"op": "append", "key": "actions", "item": obj, "cap": 200})
         return obj
 
     async def get_action_definition(self, action_id: int) -> dict[str, Any] | None:
@@ -450,14 +627,7 @@ class Storage:
                     "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
                 }
 
-        st = self._read_state()
-        items = st.get("actions", [])
-        if not isinstance(items, list):
-            return None
-        for it in items:
-            if isinstance(it, dict) and it.get("id") == action_id:
-                return it
-        return None
+        return copy.deepcopy(self._state_find("actions", action_id))
 
     async def list_action_definitions(self, limit: int = 50) -> list[dict[str, Any]]:
         lim = max(1, min(200, int(limit)))
@@ -482,11 +652,7 @@ class Storage:
                 items.reverse()
                 return items
 
-        st = self._read_state()
-        items = st.get("actions", [])
-        if not isinstance(items, list):
-            return []
-        out = items[-lim:]
+        out = self._state_list("actions")[-lim:]
         out.reverse()
         return [
             {
@@ -543,27 +709,18 @@ class Storage:
                     "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
                 }
 
-        st = self._read_state()
-        items = st.get("actions", [])
-        if not isinstance(items, list):
+        if self._state_find("actions", action_id) is None:
             return None
-        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
-        out: dict[str, Any] | None = None
-        for it in items:
-            if not (isinstance(it, dict) and it.get("id") == action_id):
-                continue
-            it["title"] = next_title
-            it["kind"] = next_kind
-            it["spec"] = next_spec
-            it["enabled"] = next_enabled
-            it["updated_at"] = now
-            out = it
-            break
-        if out is None:
-            return None
-        st["actions"] = items[-200:]
-        self._write_state(st)
-        return out
+        obj = {
+            **cur,
+            "title": next_title,
+            "kind": next_kind,
+            "spec": next_spec,
+            "enabled": next_enabled,
+            "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        self._state.apply({"op": "put", "key": "actions", "item": obj, "cap": 200})
+        return obj
 
     async def delete_action_definition(self, action_id: int) -> bool:
         if self._pool:
@@ -571,15 +728,10 @@ class Storage:
                 res = await conn.execute("delete from action_definitions where id=$1", int(action_id))
                 return "DELETE 1" in str(res)
 
-        st = self._read_state()
-        items = st.get("actions", [])
-        if not isinstance(items, list):
+        if self._state_find("actions", action_id) is None:
             return False
-        before = len(items)
-        items = [it for it in items if not (isinstance(it, dict) and it.get("id") == action_id)]
-        st["actions"] = items
-        self._write_state(st)
-        return len(items) != before
+        self._state.apply({"op": "delete", "key": "actions", "id": action_id})
+        return True
 
     async def add_chat_message(self, role: str, content: str) -> None:
         if self._pool:
@@ -590,11 +742,7 @@ class Storage:
                     content,
                 )
             return
-        st = self._read_state()
-        st.setdefault("chat", [])
-        st["chat"].append({"role": role, "content": content})
-        st["chat"] = st["chat"][-200:]
-        self._write_state(st)
+        self._state.apply({"op": "append", "key": "chat", "item": {"role": role, "content": content}, "cap": 200})
 
     async def add_inbox_message(self, role: str, content: str) -> None:
         if self._pool:
@@ -605,11 +753,7 @@ class Storage:
                     content,
                 )
             return
-        st = self._read_state()
-        st.setdefault("inbox", [])
-        st["inbox"].append({"role": role, "content": content})
-        st["inbox"] = st["inbox"][-200:]
-        self._write_state(st)
+        self._state.apply({"op": "append", "key": "inbox", "item": {"role": role, "content": content}, "cap": 200})
 
     async def add_outbox_message(self, role: str, content: str) -> None:
         if self._pool:
@@ -620,11 +764,37 @@ class Storage:
                     content,
                 )
             return
-        st = self._read_state()
-        st.setdefault("outbox", [])
-        st["outbox"].append({"role": role, "content": content})
-        st["outbox"] = st["outbox"][-200:]
-        self._write_state(st)
+        self._state.apply({"op": "append", "key": "outbox", "item": {"role": role, "content": content}, "cap": 200})
+
+    async def add_outbox_messages(self, items: list[tuple[str, str, str]]) -> set[str]:
+        """Insert (role, content, ingest_key) rows in one statement; returns the keys actually inserted.
+
+        Rows whose ingest_key is already stored are skipped, so re-ingesting
+        a batch (e.g. after a crash before its files were moved) is a no-op.
+        """
+        if not items:
+            return set()
+        if self._pool:
+            async with self._pool.acquire() as conn:
+                rows = await conn.fetch(
+                    "insert into outbox_messages(role, content, ingest_key) "
+                    "select * from unnest($1::text[], $2::text[], $3::text[]) "
+                    "on conflict (ingest_key) do nothing returning ingest_key",
+                    [it[0] for it in items],
+                    [it[1] for it in items],
+                    [it[2] for it in items],
+                )
+            return {str(r["ingest_key"]) for r in rows}
+        seen = {it.get("ingest_key") for it in self._state_list("outbox") if isinstance(it, dict)}
+        inserted: set[str] = set()
+        for role, content, key in items:
+            if key in seen or key in inserted:
+                continue
+            # The key travels with the message so the check and the write are one log append.
+            item = {"role": role, "content": content, "ingest_key": key}
+            self._state.apply({"op": "append", "key": "outbox", "item": item, "cap": 200})
+            inserted.add(key)
+        return inserted
 
     async def list_chat_messages(self, limit: int = 50) -> list[dict[str, Any]]:
         lim = max(1, min(500, int(limit)))
@@ -645,11 +815,7 @@ class Storage:
                 ]
                 items.reverse()
                 return items
-        st = self._read_state()
-        chat = st.get("chat", [])
-        if not isinstance(chat, list):
-            return []
-        return chat[-lim:]
+        return copy.deepcopy(self._state_list("chat")[-lim:])
 
     async def list_inbox_messages(self, limit: int = 50) -> list[dict[str, Any]]:
         lim = max(1, min(500, int(limit)))
@@ -670,11 +836,7 @@ class Storage:
                 ]
                 items.reverse()
                 return items
-        st = self._read_state()
-        inbox = st.get("inbox", [])
-        if not isinstance(inbox, list):
-            return []
-        return inbox[-lim:]
+        return copy.deepcopy(self._state_list("inbox")[-lim:])
 
     async def list_outbox_messages(self, limit: int = 50) -> list[dict[str, Any]]:
         lim = max(1, min(500, int(limit)))
@@ -695,11 +857,10 @@ class Storage:
                 ]
                 items.reverse()
                 return items
-        st = self._read_state()
-        outbox = st.get("outbox", [])
-        if not isinstance(outbox, list):
-            return []
-        return outbox[-lim:]
+        return [
+            {k: v for k, v in it.items() if k != "ingest_key"} if isinstance(it, dict) else it
+            for it in copy.deepcopy(self._state_list("outbox")[-lim:])
+        ]
 
     async def create_run(self, script: str, cwd: str, args: list[str], pid: Optional[int]) -> int:
         if self._pool:
@@ -712,10 +873,14 @@ class Storage:
                     cwd,
                     args,
                 )
-                return int(row["id"])
-        st = self._read_state()
-        st["run"] = {"status": "running", "pid": pid, "script": script, "cwd": cwd, "args": args, "id": 1}
-        self._write_state(st)
+            run_id = int(row["id"])
+            if self.change_feed_live:
+                # A new serial id is the latest run.
+                self._runs_gen += 1
+                self._latest_run = {"id": run_id, "status": "running", "pid": pid}
+            return run_id
+        run = {"status": "running", "pid": pid, "script": script, "cwd": cwd, "args": args, "id": 1}
+        self._state.apply({"op": "set", "key": "run", "value": run})
         return 1
 
     async def set_run_status(self, run_id: int, status: str, pid: Optional[int] = None) -> None:
@@ -730,62 +895,50 @@ class Storage:
                     )
                 else:
                     await conn.execute("update pipeline_runs set status=$1, pid=$2 where id=$3", status, pid, run_id)
+            self._apply_run({"id": run_id, "status": status, "pid": pid})
             return
-        st = self._read_state()
-        run = st.get("run") if isinstance(st.get("run"), dict) else {}
-        if run.get("id") == run_id:
+        run = self._state.get("run")
+        if isinstance(run, dict) and run.get("id") == run_id:
             run["status"] = status
             run["pid"] = pid
-            st["run"] = run
-            self._write_state(st)
+            self._state.apply({"op": "set", "key": "run", "value": run})
 
     async def get_latest_status(self) -> PipelineStatus:
         if self._pool:
-            async with self._pool.acquire() as conn:
-                row = await conn.fetchrow(
-                    "select id, status, pid from pipeline_runs order by id desc limit 1"
-                )
+            run = self._latest_run if self.change_feed_live else None
+            if run is None:
+                gen = self._runs_gen
+                async with self._pool.acquire() as conn:
+                    row = await conn.fetchrow(
+                        "select id, status, pid from pipeline_runs order by id desc limit 1"
+                    )
                 if not row:
                     return PipelineStatus(running=False, status="idle")
-                st = str(row["status"] or "idle")
-                pid = row["pid"]
-                return PipelineStatus(running=(st == "running"), pid=pid, run_id=int(row["id"]), status=st)
-        st = self._read_state()
-        run = st.get("run") if isinstance(st.get("run"), dict) else {}
+                run = {"id": int(row["id"]), "status": str(row["status"] or "idle"), "pid": row["pid"]}
+                if gen == self._runs_gen and self.change_feed_live:
+                    self._latest_run = run
+            st = run["status"]
+            return PipelineStatus(running=(st == "running"), pid=run["pid"], run_id=run["id"], status=st)
+        run = self._state.get("run")
+        run = run if isinstance(run, dict) else {}
         status = str(run.get("status", "idle"))
         pid = run.get("pid")
         return PipelineStatus(running=(status == "running"), pid=pid, run_id=run.get("id"), status=status)
 
     async def get_pipeline_state(self) -> dict[str, Any]:
-        def iso(v: Any) -> Any:
-            if v is None:
-                return None
-            try:
-                return v.isoformat()
-            except Exception:
-                return str(v)
-
         if self._pool:
+            if self.change_feed_live and self._pipeline_state is not None:
+                return dict(self._pipeline_state)
             async with self._pool.acquire() as conn:
-                row = await conn.fetchrow(
-                    "select state, pid, run_id, started_at, paused_at, resumed_at, stopped_at, updated_at "
-                    "from pipeline_state where id=1"
-                )
-                if not row:
-                    return {"state": "stopped"}
-                return {
-                    "state": str(row["state"]),
-                    "pid": row["pid"],
-                    "run_id": row["run_id"],
-                    "started_at": iso(row["started_at"]),
-                    "paused_at": iso(row["paused_at"]),
-                    "resumed_at": iso(row["resumed_at"]),
-                    "stopped_at": iso(row["stopped_at"]),
-                    "updated_at": iso(row["updated_at"]),
-                }
-
-        st = self._read_state()
-        ps = st.get("pipeline_state") if isinstance(st.get("pipeline_state"), dict) else {}
+                row = await conn.fetchrow(f"select {_PIPELINE_STATE_COLUMNS} from pipeline_state where id=1")
+            if not row:
+                return {"state": "stopped"}
+            if self.change_feed_live:
+                self._apply_pipeline_state(row)
+            return _pipeline_state_row(row)
+
+        ps = self._state.get("pipeline_state")
+        ps = ps if isinstance(ps, dict) else {}
         return ps if ps else {"state": "stopped"}
 
     async def set_pipeline_state(
@@ -801,59 +954,50 @@ class Storage:
         ts_kind: start|pause|resume|stop
         """
         if not self._pool:
-            st = self._read_state()
-            st["pipeline_state"] = {
+            ps = {
                 "state": state,
                 "pid": pid,
                 "run_id": run_id,
                 "ts_kind": ts_kind,
             }
-            self._write_state(st)
+            self._state.apply({"op": "set", "key": "pipeline_state", "value": ps})
             return
 
+        if ts_kind == "start":
+            sql = (
+                "insert into pipeline_state(id, state, pid, run_id, started_at, paused_at, resumed_at, stopped_at, updated_at) "
+                "values (1, $1, $2, $3, now(), null, null, null, now()) "
+                "on conflict (id) do update set "
+                "state=$1, pid=$2, run_id=$3, started_at=now(), paused_at=null, resumed_at=null, stopped_at=null, updated_at=now()"
+            )
+        elif ts_kind == "pause":
+            sql = (
+                "insert into pipeline_state(id, state, pid, run_id, paused_at, updated_at) "
+                "values (1, $1, $2, $3, now(), now()) "
+                "on conflict (id) do update set "
+                "state=$1, pid=$2, run_id=$3, paused_at=now(), updated_at=now()"
+            )
+        elif ts_kind == "resume":
+            sql = (
+                "insert into pipeline_state(id, state, pid, run_id, resumed_at, stopped_at, updated_at) "
+                "values (1, $1, $2, $3, now(), null, now()) "
+                "on conflict (id) do update set "
+                "state=$1, pid=$2, run_id=$3, resumed_at=now(), stopped_at=null, updated_at=now()"
+            )
+        elif ts_kind == "stop":
+            sql = (
+                "insert into pipeline_state(id, state, pid, run_id, stopped_at, updated_at) "
+                "values (1, $1, $2, $3, now(), now()) "
+                "on conflict (id) do update set "
+                "state=$1, pid=$2, run_id=$3, stopped_at=now(), updated_at=now()"
+            )
+        else:
+            raise ValueError("invalid ts_kind")
         async with self._pool.acquire() as conn:
-            if ts_kind == "start":
-                await conn.execute(
-                    "insert into pipeline_state(id, state, pid, run_id, started_at, paused_at, resumed_at, stopped_at, updated_at) "
-                    "values (1, $1, $2, $3, now(), null, null, null, now()) "
-                    "on conflict (id) do update set "
-                    "state=$1, pid=$2, run_id=$3, started_at=now(), paused_at=null, resumed_at=null, stopped_at=null, updated_at=now()",
-                    state,
-                    pid,
-                    run_id,
-                )
-            elif ts_kind == "pause":
-                await conn.execute(
-                    "insert into pipeline_state(id, state, pid, run_id, paused_at, updated_at) "
-                    "values (1, $1, $2, $3, now(), now()) "
-                    "on conflict (id) do update set "
-                    "state=$1, pid=$2, run_id=$3, paused_at=now(), updated_at=now()",
-                    state,
-                    pid,
-                    run_id,
-                )
-            elif ts_kind == "resume":
-                await conn.execute(
-                    "insert into pipeline_state(id, state, pid, run_id, resumed_at, stopped_at, updated_at) "
-                    "values (1, $1, $2, $3, now(), null, now()) "
-                    "on conflict (id) do update set "
-                    "state=$1, pid=$2, run_id=$3, resumed_at=now(), stopped_at=null, updated_at=now()",
-                    state,
-                    pid,
-                    run_id,
-                )
-            elif ts_kind == "stop":
-                await conn.execute(
-                    "insert into pipeline_state(id, state, pid, run_id, stopped_at, updated_at) "
-                    "values (1, $1, $2, $3, now(), now()) "
-                    "on conflict (id) do update set "
-                    "state=$1, pid=$2, run_id=$3, stopped_at=now(), updated_at=now()",
-                    state,
-                    pid,
-                    run_id,
-                )
-            else:
-                raise ValueError("invalid ts_kind")
+            row = await conn.fetchrow(f"{sql} returning {_PIPELINE_STATE_COLUMNS}", state, pid, run_id)
+        if row is not None and self.change_feed_live:
+            # Read-your-writes without waiting for our own NOTIFY.
+            self._apply_pipeline_state(row)
 
 
 def safe_env(key: str, default: str = "") -> str:
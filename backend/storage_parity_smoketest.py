@@ -0,0 +1,267 @@
+"""Run the same Storage scenario against SQLite, the JSON fallback (and optionally Postgres) and compare.
+
+    python -m backend.storage_parity_smoketest              # SQLite + JSON fallback in a temp dir
+    python -m backend.storage_parity_smoketest --postgres   # also DATABASE_URL (use a scratch database)
+
+Each backend must pass the scenario's own checks, and with --postgres SQLite
+and Postgres must produce the same normalized results (ids and timestamps
+aside). The JSON fallback is checked against its own, reduced shapes (no
+message ids or pipeline timestamps, scripts listed newest first) and is
+additionally reloaded from its snapshot + log, including after a crash.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any
+
+from dotenv import load_dotenv
+
+from .sqlite_storage import SqliteStorage, is_sqlite_url
+from .storage import Storage
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+class _Trace:
+    def __init__(self, name: str, *, fallback: bool = False):
+        self.name = name
+        self.fallback = fallback
+        self.steps: list[tuple[str, Any]] = []
+
+    def check(self, label: str, value: Any, expected: Any = None, *, ok: bool | None = None) -> None:
+        passed = (value == expected) if ok is None else ok
+        if not passed:
+            raise AssertionError(f"{self.name}: {label}: got {value!r}, expected {expected!r}")
+        self.steps.append((label, _normalize(value)))
+
+
+def _normalize(value: Any) -> Any:
+    # Ids and timestamps legitimately differ between backends; keep only whether they are set.
+    if isinstance(value, dict):
+        return {
+            k: (v is not None) if (k == "id" or k.endswith("_at")) else _normalize(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+async def _scenario(storage: Storage, trace: _Trace) -> None:
+    tok = uuid.uuid4().hex[:8]
+
+    key = f"parity_{tok}"
+    value = {"a": [1, 2], "b": None, "s": "ünïcode"}
+    await storage.set_config(key, value)
+    trace.check("config.set", (await storage.get_config()).get(key), value)
+    await storage.set_config(key, 3)
+    trace.check("config.overwrite", (await storage.get_config()).get(key), 3)
+
+    ws = f"ws-{tok}"
+    trace.check("workspace.missing", await storage.get_workspace_config(ws + "-none"), None)
+    rec = await storage.upsert_workspace_config(ws, {"x": 1})
+    trace.check("workspace.upsert", rec["config"], {"x": 1})
+    await storage.upsert_workspace_config(ws, {"x": 2})
+    got = await storage.get_workspace_config(ws)
+    trace.check("workspace.get", got, ok=bool(got) and got["config"] == {"x": 2} and got["workspace"] == ws)
+
+    s1 = await storage.create_pipeline_script(title=f"{tok}-1", script_text="AAPS v1\n", ir={"steps": []})
+    s2 = await storage.create_pipeline_script(title=f"{tok}-2", script_text="AAPS v1\n# two\n")
+    trace.check("script.create", s1, ok=s1["ir"] == {"steps": []} and s1["script_version"] == 1 and s2["id"] > s1["id"])
+    trace.check("script.get", await storage.get_pipeline_script(s1["id"]), s1)
+    up = await storage.update_pipeline_script(s1["id"], title=f"{tok}-1b", ir={"steps": [1]}, ir_set=True)
+    trace.check(
+        "script.update",
+        up,
+        ok=bool(up) and up["title"] == f"{tok}-1b" and up["ir"] == {"steps": [1]} and up["script_text"] == "AAPS v1\n",
+    )
+    up = await storage.update_pipeline_script(s1["id"], script_version=2)
+    trace.check("script.update_keeps_ir", up, ok=bool(up) and up["ir"] == {"steps": [1]} and up["script_version"] == 2)
+    listed = [it["title"] for it in await storage.list_pipeline_scripts(limit=200) if it["title"].startswith(tok)]
+    order = [f"{tok}-1b", f"{tok}-2"]
+    trace.check("script.list_order", listed, order[::-1] if trace.fallback else order)
+    trace.check("script.delete", await storage.delete_pipeline_script(s2["id"]), True)
+    trace.check("script.delete_again", await storage.delete_pipeline_script(s2["id"]), False)
+    trace.check("script.get_deleted", await storage.get_pipeline_script(s2["id"]), None)
+    trace.check("script.update_missing", await storage.update_pipeline_script(s2["id"], title="x"), None)
+
+    a1 = await storage.create_action_definition(title=f"{tok}-a", kind="prompt", spec={"prompt": "hi"})
+    trace.check("action.create", a1, ok=a1["enabled"] is True and a1["spec"] == {"prompt": "hi"})
+    a1u = await storage.update_action_definition(a1["id"], enabled=False)
+    trace.check("action.update", a1u, ok=bool(a1u) and a1u["enabled"] is False and a1u["spec"] == {"prompt": "hi"})
+    a1u = await storage.update_action_definition(a1["id"], spec={"prompt": "bye"}, spec_set=True)
+    trace.check("action.update_spec", (a1u or {}).get("spec"), {"prompt": "bye"})
+    listed = [it for it in await storage.list_action_definitions(limit=200) if it["title"].startswith(tok)]
+    trace.check("action.list", listed, ok=len(listed) == 1 and "spec" not in listed[0] and listed[0]["enabled"] is False)
+    trace.check("action.delete", await storage.delete_action_definition(a1["id"]), True)
+    trace.check("action.get_deleted", await storage.get_action_definition(a1["id"]), None)
+
+    for kind in ("chat", "inbox", "outbox"):
+        add = getattr(storage, f"add_{kind}_message")
+        for i in range(3):
+            await add("user" if i % 2 == 0 else "assistant", f"{tok}-{kind}-{i}")
+        items = await getattr(storage, f"list_{kind}_messages")(limit=2)
+        trace.check(f"{kind}.list_tail", [(m["role"], m["content"]) for m in items], [("assistant", f"{tok}-{kind}-1"), ("user", f"{tok}-{kind}-2")])
+        if trace.fallback:
+            trace.check(f"{kind}.fields", sorted(items[-1]), ["content", "role"])
+        else:
+            trace.check(f"{kind}.fields", items[-1], ok=isinstance(items[-1]["id"], int) and bool(items[-1]["created_at"]))
+
+    batch = [("pipeline", f"{tok}-note-{i}", f"{tok}-{i}.md:hash") for i in range(3)]
+    inserted = await storage.add_outbox_messages(batch[:2])
+    trace.check("outbox.batch", sorted(inserted), [f"{tok}-0.md:hash", f"{tok}-1.md:hash"])
+    inserted = await storage.add_outbox_messages(batch)
+    trace.check("outbox.batch_idempotent", sorted(inserted), [f"{tok}-2.md:hash"])
+    items = await storage.list_outbox_messages(limit=3)
+    trace.check("outbox.batch_rows", [m["content"] for m in items], [f"{tok}-note-{i}" for i in range(3)])
+    trace.check("outbox.batch_fields", sorted(items[-1]), ["content", "role"] if trace.fallback else ["content", "created_at", "id", "role"])
+
+    rid = await storage.create_run(script="scripts/pipeline_demo.sh", cwd=str(REPO_ROOT), args=["--x"], pid=4242)
+    st = await storage.get_latest_status()
+    trace.check("run.latest", (st.running, st.pid, st.run_id == rid, st.status), (True, 4242, True, "running"))
+    await storage.set_run_status(rid, "stopped", pid=None)
+    st = await storage.get_latest_status()
+    trace.check("run.stopped", (st.running, st.pid, st.run_id == rid, st.status), (False, None, True, "stopped"))
+
+    await storage.set_pipeline_state(state="running", pid=4242, run_id=rid, ts_kind="start")
+    if trace.fallback:
+        # The fallback keeps only the last transition (state, pid, run_id, ts_kind).
+        ps = await storage.get_pipeline_state()
+        trace.check("state.start", (ps["state"], ps["pid"], ps["run_id"] == rid, ps["ts_kind"]), ("running", 4242, True, "start"))
+        await storage.set_pipeline_state(state="stopped", pid=None, run_id=rid, ts_kind="stop")
+        trace.check("state.stop", (await storage.get_pipeline_state())["state"], "stopped")
+        return
+    ps = await storage.get_pipeline_state()
+    trace.check("state.start", ps, ok=ps["state"] == "running" and bool(ps["started_at"]) and ps["paused_at"] is None)
+    await storage.set_pipeline_state(state="paused", pid=4242, run_id=rid, ts_kind="pause")
+    await storage.set_pipeline_state(state="running", pid=4242, run_id=rid, ts_kind="resume")
+    ps = await storage.get_pipeline_state()
+    trace.check("state.resume", ps, ok=bool(ps["paused_at"]) and bool(ps["resumed_at"]) and ps["stopped_at"] is None)
+    await storage.set_pipeline_state(state="stopped", pid=None, run_id=rid, ts_kind="stop")
+    ps = await storage.get_pipeline_state()
+    trace.check("state.stop", ps, ok=ps["state"] == "stopped" and bool(ps["stopped_at"]) and ps["pid"] is None)
+    await storage.set_pipeline_state(state="running", pid=1, run_id=rid, ts_kind="start")
+    ps = await storage.get_pipeline_state()
+    trace.check("state.restart_clears", ps, ok=ps["paused_at"] is None and ps["resumed_at"] is None and ps["stopped_at"] is None)
+    await storage.set_pipeline_state(state="stopped", pid=None, run_id=rid, ts_kind="stop")
+
+
+async def _snapshot(storage: Storage) -> dict[str, Any]:
+    return {
+        "config": await storage.get_config(),
+        "scripts": await storage.list_pipeline_scripts(limit=200),
+        "actions": await storage.list_action_definitions(limit=200),
+        "chat": await storage.list_chat_messages(limit=500),
+        "outbox": await storage.list_outbox_messages(limit=500),
+        "pipeline": await storage.get_pipeline_state(),
+    }
+
+
+async def _check_reload(runtime_dir: Path, trace: _Trace) -> None:
+    """Reopen the JSON fallback from disk: after a clean stop, after a crash mid-compaction, and after a torn write."""
+    storage = Storage(database_url="", runtime_dir=runtime_dir)
+    await storage.start()
+    before = await _snapshot(storage)
+    # Crash between writing the snapshot and removing the log: the logged ops must not apply twice.
+    await storage.add_chat_message("user", "reload-1")
+    wal = storage._state.wal_path
+    logged = wal.read_bytes()
+    storage._state.compact()
+    wal.write_bytes(logged)
+    storage = Storage(database_url="", runtime_dir=runtime_dir)
+    await storage.start()
+    after = await _snapshot(storage)
+    trace.check("reload.crash_after_compact", after["chat"], before["chat"] + [{"role": "user", "content": "reload-1"}])
+    # Torn last line: skipped, and later writes must survive it.
+    with wal.open("ab") as f:
+        f.write(b'{"op":"set","key":"config","va')
+    storage = Storage(database_url="", runtime_dir=runtime_dir)
+    await storage.start()
+    await storage.set_config("after_torn_write", 1)
+    storage = Storage(database_url="", runtime_dir=runtime_dir)
+    await storage.start()
+    trace.check("reload.torn_tail", (await storage.get_config()).get("after_torn_write"), 1)
+    await storage.stop()
+
+
+async def _run_backend(name: str, storage: Storage) -> _Trace:
+    fallback = type(storage) is Storage and not storage._database_url
+    trace = _Trace(name, fallback=fallback)
+    await storage.start()
+    try:
+        if storage.database_error:
+            raise RuntimeError(storage.database_error)
+        await storage.ensure_schema(Path(__file__).with_name("schema.sql").read_text("utf-8"))
+        await _scenario(storage, trace)
+        if fallback:
+            expected = await _snapshot(storage)
+    finally:
+        await storage.stop()
+    if fallback:
+        reopened = Storage(database_url="", runtime_dir=storage._runtime_dir)
+        await reopened.start()
+        trace.check("reload.clean", await _snapshot(reopened), expected)
+        await _check_reload(storage._runtime_dir, trace)
+    return trace
+
+
+async def _run() -> int:
+    load_dotenv(dotenv_path=REPO_ROOT / ".env", override=False)
+    traces: list[_Trace] = []
+    with tempfile.TemporaryDirectory(prefix="autoappdev-parity-") as tmp:
+        runtime_dir = Path(tmp)
+        targets: list[tuple[str, Storage]] = [
+            ("sqlite", SqliteStorage(f"sqlite:///{runtime_dir / 'parity.sqlite3'}", runtime_dir)),
+            ("json", Storage(database_url="", runtime_dir=runtime_dir / "json-fallback")),
+        ]
+        if "--postgres" in sys.argv[1:]:
+            dsn = os.getenv("DATABASE_URL", "").strip()
+            if not dsn or is_sqlite_url(dsn):
+                print("ERROR: --postgres needs DATABASE_URL set to a Postgres DSN", file=sys.stderr)
+                return 2
+            targets.append(("postgres", Storage(database_url=dsn, runtime_dir=runtime_dir)))
+        for name, storage in targets:
+            try:
+                traces.append(await _run_backend(name, storage))
+            except Exception as e:
+                print(f"ERROR: {name}: {type(e).__name__}: {e}", file=sys.stderr)
+                return 3
+            print(f"OK: {name} ({len(traces[-1].steps)} checks)")
+
+    # The JSON fallback has its own shapes; only the database backends are compared.
+    traces = [t for t in traces if not t.fallback]
+    base = traces[0]
+    for other in traces[1:]:
+        for (label, a), (_, b) in zip(base.steps, other.steps):
+            if a != b:
+                print(f"ERROR: {base.name} != {other.name} at {label}:\n  {a!r}\n  {b!r}", file=sys.stderr)
+                return 4
+        print(f"OK: {base.name} == {other.name}")
+    return 0
+
+
+def main() -> None:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        rc = loop.run_until_complete(_run())
+    finally:
+        try:
+            loop.stop()
+            loop.close()
+        except Exception:
+            pass
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(int(rc))
+
+
+if __name__ == "__main__":
+    main()
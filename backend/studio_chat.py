@@ -1,10 +1,13 @@
+import collections
 import datetime
 import json
+import os
 import re
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 from .codex_api import atomic_write_json, now_iso
+from .jsonl_tail import JsonlOffsetIndex, read_tail_lines
 
 
 def safe_session_id(raw: str) -> str:
@@ -12,6 +15,30 @@ def safe_session_id(raw: str) -> str:
     return s[:140]
 
 
+def _parse_message(raw: bytes) -> dict[str, Any] | None:
+    try:
+        obj = json.loads(raw)
+    except Exception:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+def _message_id(raw: bytes) -> str:
+    msg = _parse_message(raw)
+    return str(msg.get("id") or "") if msg else ""
+
+
+def render_message(msg: dict[str, Any], max_chars: int) -> str:
+    """One transcript line; long content keeps its head and tail around an omission marker."""
+    role = str(msg.get("role") or "system")
+    content = str(msg.get("content") or "")
+    if len(content) > max_chars:
+        head = max_chars * 2 // 3
+        tail = max_chars - head
+        content = f"{content[:head]}\n… [{len(content) - head - tail} chars omitted] …\n{content[-tail:]}"
+    return f"{role}: {content}"
+
+
 def normalize_mode(raw: Any) -> str:
     mode = str(raw or "notes").strip().lower().replace("-", "_")
     if mode in {"notes", "design", "loop", "autopilot_loop", "setup", "autopilot_setup"}:
@@ -19,10 +46,59 @@ def normalize_mode(raw: Any) -> str:
     return "notes"
 
 
+class _CachedSession:
+    __slots__ = ("meta", "dirty", "ring", "ring_complete", "rendered", "has_index")
+
+    def __init__(self, meta: dict[str, Any], has_index: bool):
+        self.meta = meta
+        self.dirty = False
+        # Newest messages, oldest first; None until first listed.
+        self.ring: collections.deque[dict[str, Any]] | None = None
+        # True when the ring holds every message in the session.
+        self.ring_complete = False
+        # Transcript lines for the ring's messages, rendered once as they arrive.
+        self.rendered: collections.deque[str] | None = None
+        self.has_index = has_index
+
+
 class StudioChatStore:
-    def __init__(self, *, root: Path):
+    """Studio chat sessions under runtime/studio-chats/<session-id>/.
+
+    Hot sessions are kept in an LRU cache with their metadata and a ring of
+    recent messages. Messages are appended to messages.jsonl immediately
+    (fsync'd when `fsync` is set); session.json is written behind, by
+    flush(), which the app runs on a timer and which also runs when a dirty
+    session is evicted.
+    """
+
+    def __init__(
+        self,
+        *,
+        root: Path,
+        max_sessions: int = 64,
+        ring_size: int = 200,
+        fsync: bool = False,
+        transcript_chars: int = 12_000,
+    ):
         self.root = root.resolve()
         self.root.mkdir(parents=True, exist_ok=True)
+        self.max_sessions = max(1, int(max_sessions))
+        self.ring_size = max(1, int(ring_size))
+        self.fsync = fsync
+        self.transcript_chars = max(1000, int(transcript_chars))
+        # No single message takes more than a third of the transcript budget.
+        self.message_chars = self.transcript_chars // 3
+        self._listeners: list[Callable[[str, dict[str, Any]], None]] = []
+        self._session_listeners: list[Callable[[dict[str, Any]], None]] = []
+        self._cache: "collections.OrderedDict[str, _CachedSession]" = collections.OrderedDict()
+
+    def add_listener(self, fn: Callable[[str, dict[str, Any]], None]) -> None:
+        """Register a callback invoked with (session_id, message) after every append."""
+        self._listeners.append(fn)
+
+    def add_session_listener(self, fn: Callable[[dict[str, Any]], None]) -> None:
+        """Register a callback invoked with the session metadata when a session is created."""
+        self._session_listeners.append(fn)
 
     def new_session_id(self, mode: str) -> str:
         ts = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
@@ -37,6 +113,76 @@ class StudioChatStore:
     def message_path(self, session_id: str) -> Path:
         return self.session_dir(session_id) / "messages.jsonl"
 
+    def message_index(self, session_id: str) -> JsonlOffsetIndex:
+        return JsonlOffsetIndex(self.message_path(session_id), self.session_dir(session_id) / "messages.idx")
+
+    # --- cache ---------------------------------------------------------------
+
+    def _cached(self, session_id: str, *, create: bool = False) -> _CachedSession | None:
+        sid = safe_session_id(session_id)
+        entry = self._cache.get(sid)
+        if entry is not None:
+            self._cache.move_to_end(sid)
+            return entry
+        sdir = self.session_dir(sid)
+        meta: Any = None
+        try:
+            meta = json.loads((sdir / "session.json").read_text("utf-8"))
+        except FileNotFoundError:
+            pass
+        except Exception:
+            meta = {}
+        if not isinstance(meta, dict):
+            if not create:
+                return None
+            meta = {}
+        entry = _CachedSession(meta, (sdir / "messages.idx").exists())
+        self._put(sid, entry)
+        return entry
+
+    def _put(self, sid: str, entry: _CachedSession) -> None:
+        self._cache[sid] = entry
+        self._cache.move_to_end(sid)
+        while len(self._cache) > self.max_sessions:
+            old_sid, old = self._cache.popitem(last=False)
+            if old.dirty:
+                self._write_meta(old_sid, old)
+
+    def _write_meta(self, sid: str, entry: _CachedSession) -> None:
+        path = self.session_dir(sid) / "session.json"
+        atomic_write_json(path, entry.meta)
+        entry.dirty = False
+        if self.fsync:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def flush(self) -> int:
+        """Write session.json for every session changed since the last flush."""
+        n = 0
+        for sid, entry in list(self._cache.items()):
+            if entry.dirty:
+                try:
+                    self._write_meta(sid, entry)
+                    n += 1
+                except Exception:
+                    pass
+        return n
+
+    def _ring(self, sid: str, entry: _CachedSession) -> collections.deque[dict[str, Any]]:
+        if entry.ring is None:
+            raw = read_tail_lines(self.message_path(sid), self.ring_size)
+            entry.ring = collections.deque((m for m in map(_parse_message, raw) if m is not None), maxlen=self.ring_size)
+            entry.ring_complete = len(raw) < self.ring_size
+            entry.rendered = collections.deque(
+                (render_message(m, self.message_chars) for m in entry.ring), maxlen=self.ring_size
+            )
+        return entry.ring
+
+    # --- sessions -------------------------------------------------------------
+
     def create_session(self, *, mode: str = "notes", title: str = "") -> dict[str, Any]:
         m = normalize_mode(mode)
         sid = self.new_session_id(m)
@@ -51,23 +197,34 @@ class StudioChatStore:
         }
         atomic_write_json(sdir / "session.json", session)
         self.message_path(sid).touch(exist_ok=True)
+        entry = _CachedSession(dict(session), False)
+        entry.ring = collections.deque(maxlen=self.ring_size)
+        entry.rendered = collections.deque(maxlen=self.ring_size)
+        entry.ring_complete = True
+        self._put(sid, entry)
+        for fn in self._session_listeners:
+            try:
+                fn(dict(session))
+            except Exception:
+                pass
         return session
 
     def get_or_create_session(self, *, session_id: str = "", mode: str = "notes") -> dict[str, Any]:
         sid = safe_session_id(session_id)
         if sid:
-            path = self.session_dir(sid) / "session.json"
-            if path.exists():
-                try:
-                    data = json.loads(path.read_text("utf-8"))
-                    if isinstance(data, dict):
-                        return data
-                except Exception:
-                    pass
+            entry = self._cached(sid)
+            if entry is not None and entry.meta:
+                return dict(entry.meta)
         return self.create_session(mode=mode)
 
+    def session_meta(self, session_id: str) -> dict[str, Any] | None:
+        """Current metadata of an existing session (including unflushed changes), or None."""
+        entry = self._cached(session_id)
+        return dict(entry.meta) if entry is not None and entry.meta else None
+
     def append_message(self, session_id: str, *, role: str, content: str, meta: dict[str, Any] | None = None) -> dict[str, Any]:
-        sdir = self.session_dir(session_id)
+        sid = safe_session_id(session_id)
+        sdir = self.session_dir(sid)
         sdir.mkdir(parents=True, exist_ok=True)
         msg = {
             "id": f"m{datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')}",
@@ -76,38 +233,86 @@ class StudioChatStore:
             "created_at": now_iso(),
             "meta": meta or {},
         }
-        with self.message_path(session_id).open("a", encoding="utf-8") as f:
-            f.write(json.dumps(msg, ensure_ascii=False, sort_keys=True) + "\n")
-        path = sdir / "session.json"
-        session = {}
-        if path.exists():
+        entry = self._cached(sid, create=True)
+        assert entry is not None
+        with self.message_path(sid).open("ab") as f:
+            offset = f.seek(0, 2)
+            f.write((json.dumps(msg, ensure_ascii=False, sort_keys=True) + "\n").encode("utf-8"))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        # The offset sidecar is created on first paging request and maintained from then on.
+        if entry.has_index:
+            self.message_index(sid).append(offset)
+        if entry.ring is not None:
+            if len(entry.ring) == entry.ring.maxlen:
+                entry.ring_complete = False
+            entry.ring.append(msg)
+            if entry.rendered is not None:
+                entry.rendered.append(render_message(msg, self.message_chars))
+        entry.meta["updated_at"] = msg["created_at"]
+        entry.dirty = True
+        for fn in self._listeners:
             try:
-                session = json.loads(path.read_text("utf-8"))
+                fn(sid, msg)
             except Exception:
-                session = {}
-        if isinstance(session, dict):
-            session["updated_at"] = now_iso()
-            atomic_write_json(path, session)
+                pass
         return msg
 
-    def list_messages(self, session_id: str, *, limit: int = 80) -> list[dict[str, Any]]:
-        path = self.message_path(session_id)
+    def list_messages(self, session_id: str, *, limit: int = 80, before: str = "") -> list[dict[str, Any]]:
+        """The last `limit` messages, oldest first, optionally only those older than message id `before`.
+
+        Only the tail of messages.jsonl is read. Paging with `before` uses the
+        messages.idx offset sidecar (built on first use) and a binary search
+        over message ids, which are timestamp-ordered.
+        """
+        n = max(1, min(limit, 300))
+        sid = safe_session_id(session_id)
+        entry = self._cached(sid)
+        if not before and entry is not None:
+            ring = self._ring(sid, entry)
+            if n <= len(ring) or entry.ring_complete:
+                return list(ring)[-n:]
+        path = self.message_path(sid)
         if not path.exists():
             return []
-        msgs: list[dict[str, Any]] = []
-        for line in path.read_text("utf-8", errors="replace").splitlines():
-            try:
-                obj = json.loads(line)
-            except Exception:
-                continue
-            if isinstance(obj, dict):
-                msgs.append(obj)
-        return msgs[-max(1, min(limit, 300)) :]
-
-    def transcript(self, session_id: str, *, limit: int = 24) -> str:
-        lines = []
-        for msg in self.list_messages(session_id, limit=limit):
-            role = str(msg.get("role") or "system")
-            content = str(msg.get("content") or "")
-            lines.append(f"{role}: {content}")
-        return "\n".join(lines)
+        if before:
+            index = self.message_index(sid)
+            count = index.sync()
+            if entry is not None:
+                entry.has_index = True
+            end = index.bisect(count, _message_id, before)
+            raw = index.read_lines(max(0, end - n), end)
+        else:
+            raw = read_tail_lines(path, n)
+        return [m for m in map(_parse_message, raw) if m is not None]
+
+    def transcript(self, session_id: str, *, limit: int = 24, max_chars: int | None = None) -> str:
+        """The last `limit` messages as "role: content" lines, within a character budget.
+
+        Newest messages are kept first; long messages are cut in the middle
+        and older ones that do not fit are replaced by a count. Lines are
+        rendered once per message and cached with the session.
+        """
+        budget = self.transcript_chars if max_chars is None else max(1, int(max_chars))
+        sid = safe_session_id(session_id)
+        entry = self._cached(sid)
+        if entry is not None:
+            self._ring(sid, entry)
+            lines = list(entry.rendered or ())[-limit:]
+        else:
+            lines = [render_message(m, self.message_chars) for m in self.list_messages(sid, limit=limit)]
+        out: list[str] = []
+        used = 0
+        for line in reversed(lines):
+            if used + len(line) + 1 > budget:
+                if not out:
+                    out.append(line[: budget - 1] + "…")
+                break
+            out.append(line)
+            used += len(line) + 1
+        out.reverse()
+        omitted = len(lines) - len(out)
+        if omitted:
+            out.insert(0, f"({omitted} earlier message{'s' if omitted != 1 else ''} omitted)")
+        return "\n".join(out)
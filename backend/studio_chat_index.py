@@ -0,0 +1,307 @@
+import asyncio
+import base64
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+from .log_search import match_expression
+from .sqlite_worker import SqliteWorker, fts5_available
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+  id TEXT PRIMARY KEY,
+  mode TEXT NOT NULL DEFAULT '',
+  title TEXT NOT NULL DEFAULT '',
+  created_at TEXT NOT NULL DEFAULT '',
+  updated_at TEXT NOT NULL DEFAULT '',
+  message_count INTEGER NOT NULL DEFAULT 0,
+  last_role TEXT NOT NULL DEFAULT '',
+  last_preview TEXT NOT NULL DEFAULT '',
+  ino INTEGER NOT NULL DEFAULT 0,
+  indexed_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS chat_sessions_updated ON chat_sessions(updated_at, id);
+CREATE INDEX IF NOT EXISTS chat_sessions_mode_updated ON chat_sessions(mode, updated_at, id);
+CREATE TABLE IF NOT EXISTS chat_messages (
+  id INTEGER PRIMARY KEY,
+  session_id TEXT NOT NULL,
+  msg_id TEXT NOT NULL,
+  role TEXT NOT NULL,
+  created_at TEXT NOT NULL,
+  content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chat_messages_session ON chat_messages(session_id, id);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chat_fts USING fts5(content, content='chat_messages', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS chat_messages_ai AFTER INSERT ON chat_messages BEGIN
+  INSERT INTO chat_fts(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS chat_messages_ad AFTER DELETE ON chat_messages BEGIN
+  INSERT INTO chat_fts(chat_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+_PREVIEW_CHARS = 200
+_SESSION_COLUMNS = ("id", "mode", "title", "created_at", "updated_at", "message_count", "last_role", "last_preview")
+
+
+class ChatIndexError(Exception):
+    def __init__(self, code: str, detail: str):
+        super().__init__(detail)
+        self.code = code
+        self.detail = detail
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"ok": False, "error": self.code, "detail": self.detail}
+
+
+def encode_cursor(updated_at: str, session_id: str) -> str:
+    raw = json.dumps([updated_at, session_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        updated_at, session_id = json.loads(raw)
+        return str(updated_at), str(session_id)
+    except Exception as exc:
+        raise ChatIndexError("invalid_cursor", "cursor is not one returned by this API") from exc
+
+
+def _read_meta(sdir: Path) -> dict[str, Any]:
+    try:
+        meta = json.loads((sdir / "session.json").read_text("utf-8"))
+    except Exception:
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+
+class StudioChatIndex:
+    """SQLite index of Studio chat sessions and their messages.
+
+    runtime/studio-chats/index.sqlite3 holds one row per session (mode,
+    title, timestamps, message count, last message preview) for keyset-paged
+    listing, plus the messages themselves behind an FTS5 table for search.
+    Sessions are marked dirty from the IOLoop; a flush re-reads each dirty
+    session's messages.jsonl from the last indexed byte offset on the
+    index's own thread.
+    """
+
+    def __init__(self, *, db_path: Path, root: Path):
+        self.db_path = db_path
+        self.root = root
+        self.available = False
+        self.searchable = False
+        self._worker: SqliteWorker | None = None
+        self._pending: dict[str, dict[str, Any] | None] = {}
+        self._flushing: asyncio.Future[Any] | None = None
+
+    def open(self) -> bool:
+        if os.environ.get("AUTOAPPDEV_STUDIO_CHAT_INDEX", "1").strip() == "0":
+            return False
+        fts = fts5_available()
+        worker = SqliteWorker(self.db_path, name="chat-index")
+        try:
+            worker.run_sync(lambda conn: conn.executescript(_SCHEMA + (_FTS_SCHEMA if fts else "")))
+        except Exception:
+            worker.close()
+            return False
+        self._worker = worker
+        self.available = True
+        self.searchable = fts
+        return True
+
+    # --- ingest ------------------------------------------------------------
+
+    def touch(self, session_id: str, meta: dict[str, Any] | None = None) -> None:
+        """Queue a session for (incremental) indexing; `meta` is its current in-memory metadata."""
+        if not self.available or not session_id:
+            return
+        if meta is not None or session_id not in self._pending:
+            self._pending[session_id] = dict(meta) if meta is not None else None
+
+    def _index_session(self, conn: sqlite3.Connection, sid: str, meta: dict[str, Any] | None) -> int:
+        sdir = self.root / sid
+        if meta is None:
+            meta = _read_meta(sdir)
+        path = sdir / "messages.jsonl"
+        try:
+            st = path.stat()
+        except OSError:
+            st = None
+        if not meta and st is None:
+            conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (sid,))
+            conn.execute("DELETE FROM chat_sessions WHERE id = ?", (sid,))
+            return 0
+        row = conn.execute(
+            "SELECT ino, indexed_bytes, message_count, last_role, last_preview, updated_at FROM chat_sessions WHERE id = ?",
+            (sid,),
+        ).fetchone()
+        offset, count = 0, 0
+        last_role, last_preview, updated = "", "", ""
+        if row is not None:
+            updated = row["updated_at"]
+            if st is not None and int(row["ino"]) == st.st_ino and st.st_size >= int(row["indexed_bytes"]):
+                offset, count = int(row["indexed_bytes"]), int(row["message_count"])
+                last_role, last_preview = row["last_role"], row["last_preview"]
+            else:
+                conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (sid,))
+        rows = []
+        if st is not None and st.st_size > offset:
+            with path.open("rb") as f:
+                f.seek(offset)
+                data = f.read(st.st_size - offset)
+            # Only index complete lines; a partial one is picked up next time.
+            end = data.rfind(b"\n") + 1
+            for raw in data[:end].split(b"\n"):
+                try:
+                    msg = json.loads(raw)
+                except Exception:
+                    continue
+                if not isinstance(msg, dict):
+                    continue
+                content = str(msg.get("content") or "")
+                rows.append((sid, str(msg.get("id") or ""), str(msg.get("role") or ""), str(msg.get("created_at") or ""), content))
+                last_role, last_preview = rows[-1][2], content[:_PREVIEW_CHARS]
+                updated = max(updated, rows[-1][3])
+            offset += end
+            count += len(rows)
+        if rows:
+            conn.executemany(
+                "INSERT INTO chat_messages(session_id, msg_id, role, created_at, content) VALUES (?, ?, ?, ?, ?)", rows
+            )
+        updated = max(updated, str(meta.get("updated_at") or ""), str(meta.get("created_at") or ""))
+        conn.execute(
+            "INSERT INTO chat_sessions(id, mode, title, created_at, updated_at, message_count, last_role, last_preview, ino, indexed_bytes) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET mode = excluded.mode, title = excluded.title, "
+            "created_at = excluded.created_at, updated_at = excluded.updated_at, message_count = excluded.message_count, "
+            "last_role = excluded.last_role, last_preview = excluded.last_preview, ino = excluded.ino, indexed_bytes = excluded.indexed_bytes",
+            (
+                sid,
+                str(meta.get("mode") or ""),
+                str(meta.get("title") or ""),
+                str(meta.get("created_at") or ""),
+                updated,
+                count,
+                last_role,
+                last_preview,
+                st.st_ino if st is not None else 0,
+                offset,
+            ),
+        )
+        return len(rows)
+
+    def _write(self, conn: sqlite3.Connection, sessions: dict[str, dict[str, Any] | None]) -> int:
+        n = 0
+        with conn:
+            for sid, meta in sessions.items():
+                n += self._index_session(conn, sid, meta)
+        return n
+
+    async def flush(self) -> int:
+        """Index queued sessions; concurrent callers share one write."""
+        if self._worker is None:
+            return 0
+        while self._flushing is not None:
+            await asyncio.shield(self._flushing)
+        if not self._pending:
+            return 0
+        sessions, self._pending = self._pending, {}
+        fut = asyncio.ensure_future(self._worker.run(self._write, sessions))
+        self._flushing = fut
+        try:
+            return await asyncio.shield(fut)
+        finally:
+            self._flushing = None
+
+    async def backfill(self) -> int:
+        """Index sessions changed while the backend was down (and drop deleted ones)."""
+        if self._worker is None:
+            return 0
+
+        def _known(conn: sqlite3.Connection) -> list[str]:
+            return [r["id"] for r in conn.execute("SELECT id FROM chat_sessions")]
+
+        on_disk = {e.name for e in os.scandir(self.root) if e.is_dir()} if self.root.exists() else set()
+        for sid in on_disk | set(await self._worker.run(_known)):
+            self._pending.setdefault(sid, None)
+        return await self.flush()
+
+    # --- query -------------------------------------------------------------
+
+    def _list(
+        self,
+        conn: sqlite3.Connection,
+        mode: str | None,
+        match: str | None,
+        cursor: tuple[str, str] | None,
+        limit: int,
+    ) -> list[dict[str, Any]]:
+        sql = f"SELECT {', '.join(_SESSION_COLUMNS)} FROM chat_sessions WHERE 1 = 1"
+        args: list[Any] = []
+        if mode:
+            sql += " AND mode = ?"
+            args.append(mode)
+        if cursor is not None:
+            sql += " AND (updated_at, id) < (?, ?)"
+            args.extend(cursor)
+        if match:
+            sql += (
+                " AND id IN (SELECT m.session_id FROM chat_fts JOIN chat_messages m ON m.id = chat_fts.rowid "
+                "WHERE chat_fts MATCH ?)"
+            )
+            args.append(match)
+        sql += " ORDER BY updated_at DESC, id DESC LIMIT ?"
+        args.append(limit)
+        try:
+            rows = conn.execute(sql, args).fetchall()
+        except sqlite3.OperationalError as exc:
+            raise ChatIndexError("invalid_query", str(exc)) from exc
+        out: list[dict[str, Any]] = []
+        for r in rows:
+            item = {k: r[k] for k in _SESSION_COLUMNS}
+            if match:
+                hit = conn.execute(
+                    "SELECT m.msg_id, m.role, snippet(chat_fts, 0, '[', ']', '…', 16) AS snippet "
+                    "FROM chat_fts JOIN chat_messages m ON m.id = chat_fts.rowid "
+                    "WHERE chat_fts MATCH ? AND m.session_id = ? ORDER BY rank LIMIT 1",
+                    (match, r["id"]),
+                ).fetchone()
+                if hit is not None:
+                    item["match"] = {"message_id": hit["msg_id"], "role": hit["role"], "snippet": hit["snippet"]}
+            out.append(item)
+        return out
+
+    async def list_sessions(
+        self, *, mode: str = "", q: str = "", cursor: str = "", limit: int = 50
+    ) -> dict[str, Any]:
+        if self._worker is None:
+            raise ChatIndexError("index_unavailable", "studio chat index is disabled")
+        match = None
+        if str(q or "").strip():
+            if not self.searchable:
+                raise ChatIndexError("search_unavailable", "SQLite lacks FTS5; chat search is unavailable")
+            match = match_expression(q)
+            if not match:
+                raise ChatIndexError("empty_query", "q has no searchable words")
+        after = decode_cursor(cursor) if cursor else None
+        lim = max(1, min(int(limit), 200))
+        await self.flush()
+        rows = await self._worker.run(self._list, mode or None, match, after, lim + 1)
+        next_cursor = None
+        if len(rows) > lim:
+            rows = rows[:lim]
+            next_cursor = encode_cursor(rows[-1]["updated_at"], rows[-1]["id"])
+        return {"sessions": rows, "next_cursor": next_cursor}
+
+    def close(self) -> None:
+        if self._worker is not None:
+            self._worker.close()
+            self._worker = None
+        self.available = False
@@ -422,6 +422,12 @@ let studioSessions = {};
 let previewCollapsed = {};
 let liveSyncBusy = false;
 let viewportFrame = 0;
+// While the /api/events stream is connected, polling only runs as a slow safety net.
+const LIVE_SYNC_FALLBACK_MS = 30000;
+let eventSource = null;
+let eventStreamLive = false;
+let lastFullSync = 0;
+const eventRefreshTimers = {};
 
 const BUILTIN_ACTION_ID_TO_STEP_TYPE = {
   // backend/builtin_actions.py (keep within JS safe integer range)
@@ -2862,17 +2868,20 @@ async function refreshHealth() {
   }
 }
 
+function renderPipelineStatus(st) {
+  const state = st.state || (st.running ? "running" : "idle");
+  const raw = String(state || "").toLowerCase();
+  const key = `ui.pipeline.${raw}`;
+  const label = t(key);
+  setBadge(els.pipelineStatus, pipelineVariant(raw), label === key ? raw : label, raw);
+  els.pipelinePid.textContent = st.pid ? String(st.pid) : "-";
+  updateActionButtons(state);
+}
+
 async function refreshStatus() {
   try {
     const data = await api("/api/pipeline/status");
-    const st = data.status || {};
-    const state = st.state || (st.running ? "running" : "idle");
-    const raw = String(state || "").toLowerCase();
-    const key = `ui.pipeline.${raw}`;
-    const label = t(key);
-    setBadge(els.pipelineStatus, pipelineVariant(raw), label === key ? raw : label, raw);
-    els.pipelinePid.textContent = st.pid ? String(st.pid) : "-";
-    updateActionButtons(state);
+    renderPipelineStatus(data.status || {});
   } catch {
     setBadge(els.pipelineStatus, "badge--unknown", t("ui.pipeline.unknown"));
     els.pipelinePid.textContent = "-";
@@ -3371,7 +3380,11 @@ async function liveSync({ force = false } = {}) {
   if (!force && document.hidden) {
     return;
   }
+  if (!force && eventStreamLive && Date.now() - lastFullSync < LIVE_SYNC_FALLBACK_MS) {
+    return;
+  }
   liveSyncBusy = true;
+  lastFullSync = Date.now();
   try {
     const jobs = [refreshHealth(), refreshStatus(), loadStudioAgentStatus()];
     if (els.tabLogs && !els.tabLogs.hidden) {
@@ -3390,6 +3403,84 @@ async function liveSync({ force = false } = {}) {
   }
 }
 
+function scheduleEventRefresh(key, fn, delayMs = 150) {
+  // Coalesce bursts of events (e.g. many job updates) into one refresh per view.
+  if (eventRefreshTimers[key]) {
+    return;
+  }
+  eventRefreshTimers[key] = window.setTimeout(() => {
+    eventRefreshTimers[key] = 0;
+    fn();
+  }, delayMs);
+}
+
+function onLogEvent(entry) {
+  const source = String((entry && entry.source) || "");
+  const id = Number(entry && entry.id);
+  if (!logInitialized[source] || !Number.isFinite(id) || id <= (logSince[source] || 0)) {
+    return;
+  }
+  logSince[source] = id;
+  const current = String((els.logSelect && els.logSelect.value) || "pipeline") === "backend" ? "backend" : "pipeline";
+  if (source !== current) {
+    return;
+  }
+  appendLogText(`${String((entry && entry.line) || "")}\n`);
+  if (logFollow) {
+    scrollLogsToBottom();
+  }
+}
+
+function parseEventData(ev) {
+  try {
+    return JSON.parse(ev.data || "{}");
+  } catch {
+    return {};
+  }
+}
+
+function startEventStream() {
+  if (!("EventSource" in window) || eventSource) {
+    return;
+  }
+  const base = (window.AutoAppDevApi && window.AutoAppDevApi.API_BASE_URL) || "";
+  // EventSource reconnects on its own and resumes with Last-Event-ID.
+  eventSource = new EventSource(`${base}/api/events`);
+  eventSource.addEventListener("open", () => {
+    eventStreamLive = true;
+  });
+  eventSource.addEventListener("error", () => {
+    eventStreamLive = false;
+  });
+  eventSource.addEventListener("resync", () => liveSync({ force: true }));
+  eventSource.addEventListener("pipeline", (ev) => {
+    const data = parseEventData(ev);
+    if (data.status) {
+      renderPipelineStatus(data.status);
+    }
+  });
+  eventSource.addEventListener("log", (ev) => onLogEvent(parseEventData(ev)));
+  eventSource.addEventListener("codex_job", () => {
+    scheduleEventRefresh("agent", loadStudioAgentStatus);
+    if (activeWorkspaceTab === "notes") {
+      scheduleEventRefresh("preview", () => loadStudioPreview(activeWorkspaceTab));
+    }
+  });
+  eventSource.addEventListener("studio_chat", (ev) => {
+    const data = parseEventData(ev);
+    if (String(data.session_id || "") === studioSessionId(activeWorkspaceTab)) {
+      scheduleEventRefresh("studio_chat", () => loadStudioChat(activeWorkspaceTab));
+    }
+  });
+  ["chat", "inbox", "outbox"].forEach((kind) =>
+    eventSource.addEventListener(kind, () => {
+      if (els.tabChat && !els.tabChat.hidden) {
+        scheduleEventRefresh("chat", loadChat);
+      }
+    }),
+  );
+}
+
 function bindViewportBehavior() {
   window.addEventListener("resize", () => {
     applyAllPreviewStates();
@@ -3447,6 +3538,7 @@ function boot() {
   updateActionsButtons();
   refreshActionsList({ keepSelection: true });
 
+  startEventStream();
   window.setInterval(() => liveSync(), 2500);
 }
 
@@ -2,7 +2,7 @@
    Normal refresh should fetch fresh shell assets. Cache is only an offline fallback.
 */
 
-const CACHE_NAME = "autoappdev-shell-v14";
+const CACHE_NAME = "autoappdev-shell-v15";
 const PRECACHE_URLS = [
   "./index.html",
   "./styles.css",